@@ -0,0 +1,67 @@
+# benchmarks/bench_almacen.py
+"""
+Consultas por cuenta y rango de fechas con `AlmacenOperaciones` (searchsorted, prefijos y
+árbol de segmentos) frente a las máscaras booleanas sobre el frame completo, con
+operaciones sintéticas (ver `bench_metricas.generar_operaciones`) repartidas en cuentas.
+
+Uso:  python benchmarks/bench_almacen.py [operaciones] [cuentas]
+"""
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.trade_store import AlmacenOperaciones
+from bench_metricas import generar_operaciones
+
+
+def por_consulta(funcion, repeticiones=20):
+    return min(timeit.repeat(funcion, number=repeticiones, repeat=3)) / repeticiones
+
+
+def main(filas, n_cuentas):
+    rng = np.random.default_rng(11)
+    df = generar_operaciones(filas)
+    cuentas = [f'APEX-{i:02d}' for i in range(n_cuentas)]
+    df['cuenta'] = rng.choice(cuentas, filas)
+
+    inicio = time.perf_counter()
+    almacen = AlmacenOperaciones.construir(df)
+    print(f"{filas} operaciones, {n_cuentas} cuentas: almacén construido en {time.perf_counter() - inicio:.3f} s")
+
+    cuenta = cuentas[0]
+    entrada = df['tiempo_de_entrada']
+    mitad = entrada.iloc[len(df) // 2]
+    desde, hasta = AlmacenOperaciones.semana(mitad)
+
+    def mascara():
+        return df[(df['cuenta'] == cuenta) & (entrada >= desde) & (entrada < hasta)]
+
+    def drawdown_mascara():
+        pnl = mascara()['ganancias'].cumsum()
+        return (pnl.cummax() - pnl).max()
+
+    if not np.isclose(mascara()['ganancias'].sum(), almacen.pnl(cuenta, desde, hasta)):
+        raise AssertionError("El PnL del rango no coincide.")
+    if not np.isclose(drawdown_mascara(), almacen.drawdown(cuenta, desde, hasta)):
+        raise AssertionError("El drawdown del rango no coincide.")
+
+    print(f"{'consulta (una semana de una cuenta)':>40} {'tiempo (us)':>12}")
+    for nombre, funcion in (
+        ('máscara: operaciones', mascara),
+        ('máscara: PnL', lambda: mascara()['ganancias'].sum()),
+        ('máscara: drawdown', drawdown_mascara),
+        ('almacén: operaciones', lambda: almacen.operaciones(cuenta, desde, hasta)),
+        ('almacén: PnL', lambda: almacen.pnl(cuenta, desde, hasta)),
+        ('almacén: drawdown', lambda: almacen.drawdown(cuenta, desde, hasta)),
+        ('almacén: drawdown de toda la cuenta', lambda: almacen.drawdown(cuenta)),
+    ):
+        print(f"{nombre:>40} {por_consulta(funcion) * 1e6:>12.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
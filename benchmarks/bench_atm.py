@@ -0,0 +1,81 @@
+# benchmarks/bench_atm.py
+"""
+`SimuladorATM.comparar` con las plantillas de `Plantillas/ATM/` y sus variantes
+(escalas × breakeven) sobre operaciones sintéticas (ver `bench_metricas.generar_operaciones`),
+frente a repetir cada tramo posición a posición en Python sobre una muestra.
+
+Uso:  python benchmarks/bench_atm.py [operaciones]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config_manager import ConfigManager
+from models.atm_simulator import SimuladorATM
+from bench_metricas import generar_operaciones
+
+ESCALAS = (0.5, 0.75, 1.0, 1.25, 1.5)
+ACTIVADORES_BREAKEVEN = (None, 0, 20, 40, 80)
+# Posiciones repetidas en Python (el bucle es el caso lento)
+MUESTRA_REFERENCIA = 2_000
+
+
+def tramo_python(a, f, x, objetivo, stop, activador_be, mas_be, trailing):
+    """
+    Referencia escalar de 'peor': el menor entre MAE, luego MFE, luego la salida real
+    y MFE, luego MAE, luego la salida real.
+    """
+    nivel = -stop
+    if f >= activador_be:
+        nivel = max(nivel, mas_be)
+    for activador, offset in trailing:
+        if f >= activador:
+            nivel = max(nivel, f - offset)
+    if a >= stop:
+        mae_primero = -stop
+    elif f >= objetivo:
+        mae_primero = objetivo
+    else:
+        mae_primero = nivel if x < nivel else x
+    if f >= objetivo:
+        mfe_primero = objetivo
+    else:
+        mfe_primero = nivel if -a <= nivel else x
+    return min(mae_primero, mfe_primero)
+
+
+def main(filas):
+    df = generar_operaciones(filas)
+    atms = {}
+    for atm in ConfigManager.cargar_plantillas_atm().values():
+        atms.update(SimuladorATM.variantes(atm, ESCALAS, ACTIVADORES_BREAKEVEN))
+    tramos = SimuladorATM.tramos(atms)
+
+    inicio = time.perf_counter()
+    tabla = SimuladorATM.comparar(df, atms)
+    t_vector = time.perf_counter() - inicio
+    print(f"{filas} operaciones, {len(atms)} variantes ({len(tramos['cantidad'])} tramos): {t_vector:.2f} s")
+    print(tabla.head(5).round(2).to_string())
+
+    posiciones = SimuladorATM.posiciones(df)
+    muestra = {k: v[:MUESTRA_REFERENCIA] for k, v in posiciones.items() if v is not None}
+    esperado, _ = SimuladorATM.resultados_tramos(muestra, tramos)
+    escala = np.where(tramos['moneda'], 1.0 / muestra['valor_tick'][:, None], 1.0)
+    inicio = time.perf_counter()
+    for i in range(len(muestra['mae'])):
+        for j in range(len(tramos['cantidad'])):
+            trailing = list(zip(tramos['trail_activador'][j], tramos['trail_offset'][j]))
+            valor = tramo_python(muestra['mae'][i], muestra['mfe'][i], muestra['salida'][i],
+                                 tramos['objetivo'][j] * escala[i, j], tramos['stop'][j] * escala[i, j],
+                                 tramos['be_activador'][j], tramos['be_mas'][j], trailing)
+            if not np.isclose(valor, esperado[i, j]):
+                raise AssertionError(f"El tramo {j} de la posición {i} no coincide.")
+    t_python = (time.perf_counter() - inicio) / len(muestra['mae']) * len(posiciones['mae'])
+    print(f"Python posición a posición: ~{t_python:.1f} s para todas las posiciones")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,106 @@
+# benchmarks/bench_barras.py
+"""
+`ReproductorBarras.reproducir` sobre un año de barras sintéticas de 1 minuto de MES y MNQ
+(paseo aleatorio, ~23 h por sesión) guardadas en una carpeta temporal, con operaciones
+sintéticas de varios minutos: importación a `.npy`, apertura mapeada y repetición
+(excursiones y equity), frente a recorrer las barras operación a operación en Python
+sobre una muestra.
+
+Uso:  python benchmarks/bench_barras.py [operaciones]
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.bar_store import AlmacenBarras
+from models.bar_replay import ReproductorBarras
+
+INSTRUMENTOS = {'MES': ('MES JUN25', 1.25), 'MNQ': ('MNQ JUN25', 0.50)}
+MUESTRA_REFERENCIA = 500
+
+
+def generar_barras(rng, simbolo, inicio='2024-01-01', dias=365):
+    """Barras de 1 minuto de lunes a viernes, de 17:01 del día anterior a 16:00."""
+    sesiones = pd.bdate_range(inicio, periods=int(dias * 5 / 7))
+    minutos = np.arange(1, 23 * 60 + 1) * np.timedelta64(1, 'm')
+    tiempos = ((sesiones - pd.Timedelta(hours=7)).to_numpy()[:, None] + minutos[None, :]).ravel()
+    cierre = 5000 + np.cumsum(rng.integers(-4, 5, len(tiempos))) * 0.25
+    apertura = np.r_[cierre[0], cierre[:-1]]
+    return pd.DataFrame({
+        'Time': tiempos, 'Open': apertura, 'Close': cierre,
+        'High': np.maximum(apertura, cierre) + rng.integers(0, 3, len(tiempos)) * 0.25,
+        'Low': np.minimum(apertura, cierre) - rng.integers(0, 3, len(tiempos)) * 0.25,
+    })
+
+
+def excursion_python(barras, entrada, salida, largo, precio):
+    """MAE / MFE en puntos de una operación recorriendo sus barras."""
+    i = int(np.searchsorted(barras['tiempo'], entrada))
+    mae = mfe = 0.0
+    while True:
+        favorable = barras['maximo'][i] - precio if largo else precio - barras['minimo'][i]
+        adversa = precio - barras['minimo'][i] if largo else barras['maximo'][i] - precio
+        mae, mfe = max(mae, adversa), max(mfe, favorable)
+        if barras['tiempo'][i] >= salida or i == len(barras['tiempo']) - 1:
+            return mae, mfe
+        i += 1
+
+
+def main(filas):
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as carpeta:
+        AlmacenBarras.RUTA_CACHE = os.path.join(carpeta, 'cache')
+        for simbolo in INSTRUMENTOS:
+            generar_barras(rng, simbolo).to_csv(os.path.join(carpeta, f'{simbolo}.csv'), index=False)
+
+        inicio = time.perf_counter()
+        almacenes = {s: AlmacenBarras.abrir(s, carpeta) for s in INSTRUMENTOS}
+        t_importar = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        almacenes = {s: AlmacenBarras.abrir(s, carpeta) for s in INSTRUMENTOS}
+        t_abrir = time.perf_counter() - inicio
+        print(f"{sum(len(a) for a in almacenes.values())} barras: importadas en {t_importar:.2f} s, "
+              f"abiertas (mapeadas) en {t_abrir * 1e3:.1f} ms")
+
+        tiempos = almacenes['MES'].tiempos
+        simbolos = rng.choice(list(INSTRUMENTOS), filas)
+        entrada = np.sort(rng.integers(tiempos[0], tiempos[-1] - 4 * 3600 * 10**9, filas))
+        salida = entrada + rng.integers(30, 90 * 60, filas) * 10**9
+        largo = rng.random(filas) < 0.5
+        precio = 5000 + rng.integers(-40, 40, filas) * 0.25
+        df = pd.DataFrame({
+            'instrumento': [INSTRUMENTOS[s][0] for s in simbolos],
+            'tiempo_de_entrada': entrada.astype('datetime64[ns]'),
+            'tiempo_de_salida': salida.astype('datetime64[ns]'),
+            'mercado_pos': np.where(largo, 'Long', 'Short'),
+            'cant': rng.integers(1, 4, filas),
+            'precio_de_entrada': precio, 'precio_de_salida': precio,
+            'tamano_tick': 0.25, 'valor_tick': [INSTRUMENTOS[s][1] for s in simbolos],
+            'ganancias': 0.0,
+        })
+
+        inicio = time.perf_counter()
+        resultado = ReproductorBarras.reproducir(df, almacenes)
+        t_vector = time.perf_counter() - inicio
+        print(f"{filas} operaciones: {t_vector * 1e3:.0f} ms "
+              f"({len(resultado['equity'])} instantes de equity)")
+
+        barras = {s: {c: np.asarray(v) for c, v in a.columnas.items()} for s, a in almacenes.items()}
+        usd_punto = df['valor_tick'].to_numpy() / 0.25 * df['cant'].to_numpy()
+        inicio = time.perf_counter()
+        for i in range(MUESTRA_REFERENCIA):
+            mae, mfe = excursion_python(barras[simbolos[i]], entrada[i], salida[i], largo[i], precio[i])
+            if not np.isclose(mae * usd_punto[i], resultado['excursion']['mae_barras'].iloc[i]) or \
+                    not np.isclose(mfe * usd_punto[i], resultado['excursion']['mfe_barras'].iloc[i]):
+                raise AssertionError(f"La excursión de la operación {i} no coincide.")
+        t_python = (time.perf_counter() - inicio) / MUESTRA_REFERENCIA * filas
+        print(f"Python operación a operación (solo excursiones): ~{t_python:.1f} s para todas las operaciones")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,61 @@
+# benchmarks/bench_brackets.py
+"""
+`BarridoBrackets.barrer` sobre la rejilla SL 20–120 × TP 20–360 ticks (paso 5) con
+operaciones sintéticas (ver `bench_metricas.generar_operaciones`), frente a repuntuar
+la historia par a par con pandas en un subconjunto de la rejilla.
+
+Uso:  python benchmarks/bench_brackets.py [operaciones] [paso]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.bracket_grid import BarridoBrackets
+from bench_metricas import generar_operaciones
+
+# Pares repuntuados uno a uno con pandas (el bucle es el caso lento)
+PARES_REFERENCIA = 20
+
+
+def repuntuar_par(df, sl, tp):
+    """Referencia: PnL con un solo par (stop antes que objetivo) y sus medidas."""
+    usd = df['valor_tick']
+    pnl = df['ganancias'].where(~(df['mfe'].abs() >= tp * usd), tp * usd)
+    pnl = pnl.where(~(df['mae'].abs() >= sl * usd), -sl * usd)
+    curva = pnl.cumsum()
+    perdido = -pnl[pnl < 0].sum()
+    return {
+        'expectativa': pnl.mean(),
+        'profit_factor': pnl[pnl > 0].sum() / perdido if perdido else 0,
+        'drawdown_max': (curva.cummax() - curva).max(),
+    }
+
+
+def main(filas, paso):
+    df = generar_operaciones(filas)
+    sl, tp = BarridoBrackets.rejilla(20, 120, paso), BarridoBrackets.rejilla(20, 360, paso)
+
+    inicio = time.perf_counter()
+    superficie = BarridoBrackets.barrer(df, sl, tp)
+    t_rejilla = time.perf_counter() - inicio
+    print(f"{filas} operaciones, {len(sl)} × {len(tp)} pares: {t_rejilla:.2f} s")
+
+    rng = np.random.default_rng(5)
+    pares = list(zip(rng.choice(sl, PARES_REFERENCIA), rng.choice(tp, PARES_REFERENCIA)))
+    inicio = time.perf_counter()
+    for s, t in pares:
+        esperado = repuntuar_par(df, s, t)
+        for medida, valor in esperado.items():
+            if not np.isclose(superficie[medida].at[s, t], valor):
+                raise AssertionError(f"{medida} no coincide en SL {s} / TP {t}.")
+    t_par = (time.perf_counter() - inicio) / len(pares)
+    print(f"pandas par a par: {t_par * 1000:.1f} ms por par (~{t_par * len(sl) * len(tp):.1f} s la rejilla)")
+    print(f"mejor expectativa: SL / TP {BarridoBrackets.mejor_par(superficie)}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 5)
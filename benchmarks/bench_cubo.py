@@ -0,0 +1,69 @@
+# benchmarks/bench_cubo.py
+"""
+Construcción de `CuboAgregados` sobre operaciones sintéticas (ver `bench_metricas.generar_operaciones`,
+repartidas en ~2 años de sesiones de 09:30 a 16:00, con cuentas y estrategias al azar) y tiempo
+por consulta frente al groupby equivalente sobre el frame.
+
+Uso:  python benchmarks/bench_cubo.py [operaciones]
+"""
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.aggregate_cube import CuboAgregados
+from bench_metricas import generar_operaciones
+
+CUENTAS = ['APEX-01', 'APEX-02', 'APEX-03', 'Sim101']
+ESTRATEGIAS = ['ATM 1 - 3', 'ATM 75 - 225', 'ATM 75 - 150', 'ATM_3T_RR1-3']
+SESIONES = 500
+
+
+def por_consulta(funcion, repeticiones=50):
+    return min(timeit.repeat(funcion, number=repeticiones, repeat=3)) / repeticiones
+
+
+def main(filas):
+    rng = np.random.default_rng(7)
+    df = generar_operaciones(filas)
+    df['cuenta'] = rng.choice(CUENTAS, filas)
+    df['estrategia'] = rng.choice(ESTRATEGIAS, filas)
+    df['instrumento'] = 'MES JUN25'
+    dias = pd.bdate_range('2024-06-03', periods=SESIONES).to_numpy()
+    segundos = rng.integers(9 * 3600 + 1800, 16 * 3600, filas)
+    df['tiempo_de_entrada'] = np.sort(rng.choice(dias, filas) + segundos.astype('timedelta64[s]'))
+
+    inicio = time.perf_counter()
+    cubo = CuboAgregados.construir(df)
+    print(f"{filas} operaciones -> {len(cubo)} celdas en {time.perf_counter() - inicio:.3f} s")
+
+    mayo = (df['tiempo_de_entrada'] >= '2025-05-01') & (df['tiempo_de_entrada'] < '2025-06-01')
+
+    def groupby():
+        corte = df[(df['estrategia'] == 'ATM 1 - 3') & mayo]
+        return (corte['ganancias'] > 0).groupby(corte['tiempo_de_entrada'].dt.hour).mean() * 100
+
+    def consulta():
+        return cubo.consultar('hora', estrategia='ATM 1 - 3', instrumento='MES',
+                              fecha=slice('2025-05-01', '2025-05-31'))['win_rate']
+
+    esperado, obtenido = groupby(), consulta()
+    if not np.allclose(esperado.to_numpy(), obtenido.to_numpy()):
+        raise AssertionError("El cubo y el groupby no coinciden en el win rate por hora de mayo.")
+
+    print(f"{'consulta':>36} {'tiempo (us)':>12}")
+    for nombre, funcion in (
+        ('groupby sobre el frame', groupby),
+        ('cubo: win rate por hora (mayo)', consulta),
+        ('cubo: totales de una cuenta', lambda: cubo.totales(cuenta='Sim101')),
+        ('cubo: PnL por cuenta y día', lambda: cubo.agregar(['cuenta', 'fecha'])),
+    ):
+        print(f"{nombre:>36} {por_consulta(funcion) * 1e6:>12.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
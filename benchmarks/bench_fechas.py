@@ -0,0 +1,48 @@
+# benchmarks/bench_fechas.py
+"""
+Compara `parsear_fecha_hora` (celda a celda) contra `parsear_fecha_hora_serie` (por columna)
+con fechas en el formato latino del NinjaTrader Grid ('9/04/2025 9:22:36 a m').
+
+Uso:  python benchmarks/bench_fechas.py [filas ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.data_utils import parsear_fecha_hora, parsear_fecha_hora_serie
+
+
+def generar_columna(filas: int, semilla: int = 42) -> pd.Series:
+    rng = np.random.default_rng(semilla)
+    segundos = np.sort(rng.integers(0, 365 * 24 * 3600, filas))
+    fechas = pd.Timestamp('2025-01-01') + pd.to_timedelta(segundos, unit='s')
+    texto = pd.Series(fechas.strftime('%d/%m/%Y %I:%M:%S %p'))
+    texto = texto.str.lstrip('0').str.replace('AM', 'a m').str.replace('PM', 'p m')
+    texto[rng.random(filas) < 0.001] = 'sin fecha'
+    return texto
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main(tamaños):
+    print(f"{'filas':>10} {'map (s)':>12} {'serie (s)':>12} {'recarga (s)':>12} {'speedup':>9}")
+    for filas in tamaños:
+        col = generar_columna(filas)
+        esperado, t_map = medir(lambda c: pd.to_datetime(c.map(parsear_fecha_hora), errors='coerce'), col)
+        obtenido, t_serie = medir(parsear_fecha_hora_serie, col)
+        _, t_recarga = medir(parsear_fecha_hora_serie, col)
+        if not esperado.equals(obtenido):
+            raise AssertionError(f"Resultados distintos con {filas} filas")
+        print(f"{filas:>10} {t_map:>12.3f} {t_serie:>12.3f} {t_recarga:>12.3f} {t_map / t_serie:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,72 @@
+# benchmarks/bench_limpieza_numerica.py
+"""
+Compara `limpiar_numerico` (celda a celda) contra `limpiar_numerico_serie` (por columna)
+sobre columnas sintéticas con el formato del NinjaTrader Grid. Antes comprueba los importes
+del export en inglés de `datos/ninjatrader_en.csv` ('($75.00)', '"$1,076.25"') con su perfil.
+
+Uso:  python benchmarks/bench_limpieza_numerica.py [filas ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.data_utils import limpiar_numerico, limpiar_numerico_serie, cargar_datos_csv, procesar_datos_base
+
+RUTA_EN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos', 'ninjatrader_en.csv')
+# Ganancias y MAE esperados de `RUTA_EN`
+GANANCIAS_EN = [-75.0, 223.75, 2693.75, -1075.0]
+MAE_EN = [75.0, 52.5, 387.5, 1076.25]
+
+
+def generar_columna(filas: int, semilla: int = 42) -> pd.Series:
+    """Valores tipo '$ 45,00', '-$ 1.055,00', '$ (12,50)', 'USD 3,75', vacíos y NaN."""
+    rng = np.random.default_rng(semilla)
+    # Ganancias en múltiplos del tick de MES ($1,25) por 1-5 contratos
+    montos = rng.integers(-300, 600, filas) * 1.25 * rng.integers(1, 6, filas)
+    texto = pd.Series(np.abs(montos)).map(
+        lambda v: f"{v:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    )
+    signo = np.where(montos < 0, '-$ ', '$ ')
+    col = pd.Series(signo, dtype=object) + texto
+    especiales = rng.random(filas)
+    col[especiales < 0.01] = '$ (12,50)'
+    col[(especiales >= 0.01) & (especiales < 0.02)] = 'USD 3,75'
+    col[(especiales >= 0.02) & (especiales < 0.025)] = ''
+    col[(especiales >= 0.025) & (especiales < 0.03)] = np.nan
+    return col
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def comprobar_perfil_en():
+    """Importes en inglés: negativos entre paréntesis y ',' de miles."""
+    df = procesar_datos_base(cargar_datos_csv(RUTA_EN))
+    if df.attrs.get('formato_exportacion') != 'ninjatrader_en':
+        raise AssertionError("El export en inglés no se detecta con su perfil.")
+    if df['ganancias'].tolist() != GANANCIAS_EN or df['mae'].tolist() != MAE_EN:
+        raise AssertionError(f"Importes en inglés mal convertidos: {df[['ganancias', 'mae']].values.tolist()}")
+    print(f"Perfil ninjatrader_en: {len(df)} operaciones con importes correctos")
+
+
+def main(tamaños):
+    comprobar_perfil_en()
+    print(f"{'filas':>10} {'apply (s)':>12} {'serie (s)':>12} {'speedup':>9}")
+    for filas in tamaños:
+        col = generar_columna(filas)
+        esperado, t_apply = medir(col.apply, limpiar_numerico)
+        obtenido, t_serie = medir(limpiar_numerico_serie, col)
+        if not np.array_equal(esperado.to_numpy(), obtenido.to_numpy()):
+            raise AssertionError(f"Resultados distintos con {filas} filas")
+        print(f"{filas:>10} {t_apply:>12.3f} {t_serie:>12.3f} {t_apply / t_serie:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
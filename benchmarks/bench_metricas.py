@@ -0,0 +1,137 @@
+# benchmarks/bench_metricas.py
+"""
+Compara la versión original de `TradeModel.calcular_metricas` (filtros y groupby de pandas
+repetidos, escribiendo columnas en el frame) contra el núcleo NumPy de una sola pasada,
+sobre operaciones sintéticas ya procesadas de una cuenta MES.
+
+Uso:  python benchmarks/bench_metricas.py [operaciones ...]
+"""
+import math
+import os
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.trade_model import TradeModel
+
+CONFIG = {
+    'DIAS_PRUEBA': 30,
+    'OBJETIVO_GANANCIA': 3000,
+    'DRAWDOWN_MAX': 2500,
+    'REGLAS': {
+        'HORARIO_INICIO': {'valor': '08:00'},
+        'HORARIO_FIN': {'valor': '15:00'},
+        'STOP_LOSS_OBLIGATORIO': {'valor': True},
+        'RATIO_SL_PIPS': {'valor': 40},
+    },
+}
+
+
+def calcular_metricas_original(df, fecha_inicio, config_cuenta) -> dict:
+    """Copia de la implementación anterior, como referencia de resultados y tiempos."""
+    fecha_hoy = datetime.now().date()
+    dias_transcurridos = (fecha_hoy - fecha_inicio).days + 1
+    dias_restantes = max(0, config_cuenta['DIAS_PRUEBA'] - dias_transcurridos)
+    pnl_actual = df['ganancias'].sum()
+    objetivo = config_cuenta.get('OBJETIVO_GANANCIA', 0)
+    progreso = (pnl_actual / objetivo) * 100 if objetivo else 0
+    pnl_acumulado = df['ganancias'].cumsum()
+    max_drawdown = (pnl_acumulado.cummax() - pnl_acumulado).max()
+    df['resultado'] = np.where(df['ganancias'] > 0, 1, 0)
+    wins = int(df['resultado'].sum())
+    losses = int(len(df) - wins)
+    win_rate = (wins / len(df)) * 100 if len(df) > 0 else 0
+    valor_tick = df['valor_tick'].iloc[0] if 'valor_tick' in df.columns else 1
+    avg_win_ticks = df[df['ganancias'] > 0]['ganancias'].mean() / valor_tick if wins > 0 else 0
+    avg_loss_ticks = df[df['ganancias'] < 0]['ganancias'].mean() / valor_tick if losses > 0 else 0
+    avg_rr = abs(avg_win_ticks / avg_loss_ticks) if avg_loss_ticks != 0 else 0
+    gross_profit = df[df['ganancias'] > 0]['ganancias'].sum()
+    gross_loss = abs(df[df['ganancias'] < 0]['ganancias'].sum())
+    profit_factor = gross_profit / gross_loss if gross_loss != 0 else 0
+    expectancy = (
+        (win_rate * avg_win_ticks) + ((100 - win_rate) * avg_loss_ticks)
+    ) / 100 if (wins + losses) > 0 else 0
+    daily_loss_ok = "OK"
+    if 'tiempo_de_entrada' in df.columns:
+        df['fecha'] = df['tiempo_de_entrada'].dt.date
+        df_diario = df.groupby('fecha')['ganancias'].sum()
+        if any(df_diario < -config_cuenta['DRAWDOWN_MAX']):
+            daily_loss_ok = "EXCEDIDO"
+    avg_mae = df['mae'].mean() if 'mae' in df.columns else 0
+    avg_mfe = df['mfe'].mean() if 'mfe' in df.columns else 0
+    avg_etd = df['etd'].mean() if 'etd' in df.columns else 0
+    daily_wins = df.groupby(df['tiempo_de_entrada'].dt.date)['resultado'].mean() * 100 if 'tiempo_de_entrada' in df.columns else pd.Series(dtype=float)
+    avg_daily_consistency = daily_wins.mean() if not daily_wins.empty else 0
+    df['loss_streak'] = (df['resultado'] == 0).astype(int).groupby(df['resultado'].eq(1).cumsum()).cumsum()
+    max_loss_streak = int(df['loss_streak'].max()) if 'loss_streak' in df.columns else 0
+    horario_inicio = config_cuenta['REGLAS']['HORARIO_INICIO']['valor']
+    horario_fin = config_cuenta['REGLAS']['HORARIO_FIN']['valor']
+    df['fuera_horario'] = ~df['hora_operacion'].between(horario_inicio, horario_fin)
+    fuera_horario_count = int(df['fuera_horario'].sum()) if 'fuera_horario' in df.columns else 0
+    sl_violations = 0
+    if config_cuenta['REGLAS']['STOP_LOSS_OBLIGATORIO']['valor'] and 'mae' in df.columns:
+        sl_ticks = config_cuenta['REGLAS']['RATIO_SL_PIPS']['valor']
+        sl_usd = sl_ticks * df['valor_tick']
+        sl_violations = int((df['mae'].abs() > sl_usd).sum())
+    return {
+        'current_pnl': pnl_actual, 'progress_to_target': progreso,
+        'days_elapsed': dias_transcurridos, 'days_remaining': dias_restantes,
+        'max_drawdown': max_drawdown, 'total_trades': len(df), 'wins': wins, 'losses': losses,
+        'win_rate': win_rate, 'avg_win_ticks': avg_win_ticks, 'avg_loss_ticks': avg_loss_ticks,
+        'avg_rr': avg_rr, 'profit_factor': profit_factor, 'expectancy': expectancy,
+        'daily_loss_status': daily_loss_ok, 'avg_mae': avg_mae, 'avg_mfe': avg_mfe, 'avg_etd': avg_etd,
+        'avg_daily_consistency': avg_daily_consistency, 'max_loss_streak': max_loss_streak,
+        'fuera_horario_count': fuera_horario_count, 'sl_violations': sl_violations
+    }
+
+
+def generar_operaciones(filas: int, semilla: int = 42) -> pd.DataFrame:
+    """Operaciones MES (tick $1,25) repartidas en ~20 por día, ordenadas por entrada."""
+    rng = np.random.default_rng(semilla)
+    ticks = rng.integers(-60, 90, filas)
+    ganancias = ticks * 1.25 * rng.integers(1, 4, filas)
+    segundos = np.sort(rng.integers(0, max(filas // 20, 1) * 86400, filas))
+    entrada = pd.Timestamp('2025-01-02') + pd.to_timedelta(segundos, unit='s')
+    df = pd.DataFrame({
+        'tiempo_de_entrada': entrada,
+        'ganancias': ganancias,
+        'valor_tick': np.full(filas, 1.25),
+        'mae': np.abs(rng.normal(60, 30, filas)).round(2),
+        'mfe': np.abs(rng.normal(80, 40, filas)).round(2),
+    })
+    df['etd'] = np.where(df['mfe'] > 0, df['mfe'] - df['ganancias'], 0)
+    df['hora_operacion'] = df['tiempo_de_entrada'].dt.strftime('%H:%M')
+    return df
+
+
+def iguales(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main(tamaños):
+    fecha_inicio = date(2025, 1, 2)
+    print(f"{'operaciones':>12} {'original (s)':>13} {'numpy (s)':>11} {'speedup':>9}")
+    for filas in tamaños:
+        df = generar_operaciones(filas)
+        esperado, t_original = medir(calcular_metricas_original, df.copy(), fecha_inicio, CONFIG)
+        obtenido, t_numpy = medir(TradeModel.calcular_metricas, df, fecha_inicio, CONFIG)
+        distintas = [k for k in esperado if not iguales(esperado[k], obtenido[k])]
+        if distintas:
+            raise AssertionError(f"Métricas distintas con {filas} operaciones: {distintas}")
+        print(f"{filas:>12} {t_original:>13.3f} {t_numpy:>11.3f} {t_original / t_numpy:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
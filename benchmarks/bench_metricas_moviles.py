@@ -0,0 +1,42 @@
+# benchmarks/bench_metricas_moviles.py
+"""
+Tiempo de `MetricasMoviles` sobre operaciones sintéticas (ver `bench_metricas.generar_operaciones`)
+para varias ventanas, y comprobación de la última ventana contra `TradeModel.calcular_metricas`.
+
+Uso:  python benchmarks/bench_metricas_moviles.py [operaciones]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.trade_model import TradeModel
+from models.rolling_metrics import MetricasMoviles
+from bench_metricas import CONFIG, generar_operaciones
+
+
+def main(filas):
+    df = generar_operaciones(filas)
+    print(f"{'ventana':>14} {'tiempo (s)':>11}")
+    for ventana in (20, 50, 500, 5000):
+        inicio = time.perf_counter()
+        moviles = MetricasMoviles.por_operaciones(df, ventana)
+        print(f"{ventana:>8} ops. {time.perf_counter() - inicio:>11.3f}")
+
+        esperado = TradeModel.calcular_metricas(df.iloc[-ventana:], date(2025, 1, 2), CONFIG)
+        ultima = moviles.iloc[-1]
+        for col in ('win_rate', 'profit_factor', 'expectancy', 'max_drawdown'):
+            if not np.isclose(ultima[col], esperado[col]):
+                raise AssertionError(f"{col} distinto en la ventana de {ventana}: {ultima[col]} != {esperado[col]}")
+
+    for ventana in (5, 20):
+        inicio = time.perf_counter()
+        MetricasMoviles.por_sesiones(df, ventana)
+        print(f"{ventana:>8} ses. {time.perf_counter() - inicio:>11.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
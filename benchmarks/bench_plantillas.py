@@ -0,0 +1,79 @@
+# benchmarks/bench_plantillas.py
+"""
+`EvaluadorPlantillas.evaluar` con N plantillas (variaciones de una plantilla base) sobre
+las M cuentas de operaciones sintéticas (ver `bench_metricas.generar_operaciones`), frente a
+`MotorReglas.evaluar_cuentas` plantilla a plantilla sobre unas pocas de ellas.
+
+Uso:  python benchmarks/bench_plantillas.py [operaciones] [plantillas] [cuentas]
+"""
+import copy
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config_manager import ConfigManager
+from models.rule_engine import MotorReglas
+from models.template_evaluator import EvaluadorPlantillas
+from utils.data_utils import aplicar_config_cuenta
+from bench_metricas import generar_operaciones
+
+# Plantillas comparadas contra el motor una a una (el bucle es el caso lento)
+PLANTILLAS_REFERENCIA = 5
+
+
+def generar_plantillas(n, semilla=3) -> dict:
+    """Variaciones de límites, SL / TP, horario y tamaño sobre una plantilla estándar."""
+    rng = np.random.default_rng(semilla)
+    base = ConfigManager.config_desde_plantilla({'size': 50000, 'reglas': {'drawdown_usd': 2500}})
+    plantillas = {}
+    for i in range(n):
+        config = copy.deepcopy(base)
+        reglas = config['REGLAS']
+        reglas['RATIO_SL_PIPS']['valor'] = int(rng.integers(5, 60))
+        reglas['RATIO_TP_PIPS']['valor'] = int(rng.integers(10, 120))
+        reglas['STOP_LOSS_OBLIGATORIO']['valor'] = bool(rng.integers(2))
+        reglas['HORARIO_INICIO']['valor'] = str(rng.choice(['08:00', '09:30', '10:00']))
+        reglas['PERDIDA_DIARIA_MAX']['valor'] = float(rng.integers(1, 6))
+        reglas['TRAILING_DRAWDOWN'] = {'nombre': 'Trailing', 'valor': float(rng.integers(1000, 5000))}
+        config['TAMAÑO_CUENTA'] = float(rng.choice([25000, 50000, 100000, 150000]))
+        config['TIPO_DRAWDOWN'] = str(rng.choice(['fin_dia', 'Diario']))
+        plantillas[f'Plantilla_{i:03d}'] = config
+    return plantillas
+
+
+def main(filas, n_plantillas, n_cuentas):
+    rng = np.random.default_rng(5)
+    df = generar_operaciones(filas)
+    df['cuenta'] = np.array([f'Cuenta_{i:02d}' for i in range(n_cuentas)])[rng.integers(0, n_cuentas, filas)]
+    df['pnl_neto'] = df['ganancias']
+    df['tiempo_de_salida'] = df['tiempo_de_entrada'] + pd.to_timedelta(rng.integers(30, 3600, filas), unit='s')
+    df['cant'] = rng.integers(1, 4, filas).astype(float)
+    df['instrumento'] = 'MES JUN25'
+    plantillas = generar_plantillas(n_plantillas)
+
+    inicio = time.perf_counter()
+    resultado = EvaluadorPlantillas.evaluar(df, plantillas)
+    t_lote = time.perf_counter() - inicio
+    pares = len(resultado['resumen'])
+    print(f"{filas} operaciones, {n_plantillas} plantillas × {n_cuentas} cuentas = {pares} pares: {t_lote:.3f} s")
+
+    inicio = time.perf_counter()
+    for nombre in list(plantillas)[:PLANTILLAS_REFERENCIA]:
+        config = plantillas[nombre]
+        _, esperado = MotorReglas.evaluar_cuentas(aplicar_config_cuenta(df, config), config)
+        obtenido = resultado['ok'].loc[nombre].stack()
+        esperado = esperado.set_index(['cuenta', 'clave'])['ok']
+        if not (obtenido.reindex(esperado.index) == esperado).all():
+            raise AssertionError(f"Resultado distinto del motor de reglas para {nombre}")
+    t_motor = (time.perf_counter() - inicio) / PLANTILLAS_REFERENCIA
+    print(f"MotorReglas plantilla a plantilla: {t_motor:.3f} s por plantilla "
+          f"(~{t_motor * n_plantillas:.1f} s para todas)")
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    main(*(argumentos + [200_000, 100, 10][len(argumentos):]))
@@ -0,0 +1,64 @@
+# benchmarks/bench_sesiones.py
+"""
+Día de sesión CME de cada operación con `CalendarioSesiones` (searchsorted sobre las
+aperturas persistidas) sobre entradas sintéticas repartidas las 24 horas, más el coste de
+obtener el calendario: construirlo, leerlo del `.npz` o tenerlo en memoria. Se comprueba
+contra la regla de 17:00 CT aplicada operación a operación en Python sobre una muestra.
+
+Uso:  python benchmarks/bench_sesiones.py [operaciones]
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.session_calendar import CalendarioSesiones, HORA_APERTURA, ZONA_SESION
+
+MUESTRA_REFERENCIA = 20_000
+
+
+def sesion_python(t):
+    """Regla de 17:00 CT sin festivos: desde las 17:00 cuenta el día siguiente; si cae en fin de semana, el viernes."""
+    dia = t.date() + timedelta(days=1 if t.hour >= HORA_APERTURA else 0)
+    if dia.weekday() >= 5:
+        dia -= timedelta(days=dia.weekday() - 4)
+    return dia
+
+
+def main(filas):
+    rng = np.random.default_rng(5)
+    inicio = np.datetime64('2021-01-04T00:00', 'ns')
+    tiempos = pd.Series(np.sort(inicio + rng.integers(0, 4 * 365 * 86_400, filas) * np.timedelta64(1, 's')))
+
+    CalendarioSesiones.limpiar()
+    t0 = time.perf_counter()
+    calendario = CalendarioSesiones.calendario()
+    t_construir = time.perf_counter() - t0
+    CalendarioSesiones._memoria.clear()
+    t0 = time.perf_counter()
+    CalendarioSesiones.calendario()
+    t_disco = time.perf_counter() - t0
+    print(f"Calendario '{CalendarioSesiones.fuente()}' ({len(calendario['dias'])} sesiones): "
+          f"construido {t_construir * 1e3:.1f} ms, leído del .npz {t_disco * 1e3:.1f} ms")
+
+    t0 = time.perf_counter()
+    sesiones = CalendarioSesiones.sesiones(tiempos, ZONA_SESION)
+    t_vector = time.perf_counter() - t0
+    print(f"{filas} operaciones: searchsorted {t_vector * 1e3:.1f} ms")
+
+    muestra = tiempos.iloc[:MUESTRA_REFERENCIA]
+    t0 = time.perf_counter()
+    esperado = [sesion_python(t) for t in muestra]
+    t_python = (time.perf_counter() - t0) / len(muestra) * filas
+    if CalendarioSesiones.fuente() == 'regla' and \
+            not np.array_equal(np.array(esperado, dtype='datetime64[D]'), sesiones[:MUESTRA_REFERENCIA]):
+        raise AssertionError("Las sesiones no coinciden con la regla de 17:00 CT.")
+    print(f"Python operación a operación: ~{t_python * 1e3:.0f} ms para todas las operaciones")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -8,6 +8,38 @@ class ConfigManager:
 
     RUTA_PLANTILLAS = os.path.join(os.path.dirname(__file__), "Plantillas")
     RUTA_EMPRESAS = os.path.join(os.path.dirname(__file__), "empresas.json")
+    RUTA_CONFIG = os.path.join(os.path.dirname(__file__), "jota_config.json")
+    RUTA_PLANTILLAS_ATM = os.path.join(RUTA_PLANTILLAS, "ATM")
+
+    # Reglas estándar esperadas con nombre legible (y ahora con emojis) y valor por defecto
+    REGLAS_ESTANDARD = {
+        'RATIO_SL_PIPS': ('🛡️ Stop Loss (pips)', 10),
+        'RATIO_TP_PIPS': ('🎯 Take Profit (pips)', 15),
+        'HORARIO_INICIO': ('🕒 Horario de Inicio', '08:00'),
+        'HORARIO_FIN': ('🕔 Horario de Cierre', '16:00'),
+        'STOP_LOSS_OBLIGATORIO': ('🛑 Stop Loss Obligatorio', False),
+        'PERDIDA_DIARIA_MAX': ('💥 Pérdida Diaria Máxima (%)', 5),
+        'PERDIDA_SEMANAL_MAX': ('🔻 Pérdida Semanal Máxima (%)', 10),
+        'PERDIDAS_CONSECUTIVAS_MAX': ('📉 Pérdidas Consecutivas Máx.', 7),
+        'DIAS_OPERANDO_MIN': ('📆 Mínimo de Días Operando', 5),
+        'GANANCIA_DIARIA_MAX_PORC': ('📈 Ganancia Diaria Máx. (%)', 70),
+        'MULTIPLICADOR_CONTRATOS_MAX': ('📊 Multiplicador de Contratos', 3),
+        'CONSISTENCIA': ('📌 Porcentaje de Consistencia (%)', 50),
+    }
+
+    # Claves sueltas de las plantillas -> clave de regla
+    MAPA_CLAVES = {
+        'porcentaje_consistencia': 'CONSISTENCIA',
+        'ganancia_diaria_maxima': 'GANANCIA_DIARIA_MAX_PORC',
+        'dias_minimos_operados': 'DIAS_OPERANDO_MIN',
+        'perdidas_consecutivas_maxima': 'PERDIDAS_CONSECUTIVAS_MAX',
+        'perdida_diaria_maxima': 'PERDIDA_DIARIA_MAX',
+        'perdida_semanal_maxima': 'PERDIDA_SEMANAL_MAX',
+        'contratos_maximos': 'MULTIPLICADOR_CONTRATOS_MAX',
+        'ratio_tp_pips': 'RATIO_TP_PIPS',
+        'ratio_sl_pips': 'RATIO_SL_PIPS',
+        'uso_stop_loss_obligatorio': 'STOP_LOSS_OBLIGATORIO',
+    }
 
     @staticmethod
     def listar_plantillas():
@@ -63,3 +95,102 @@ class ConfigManager:
         """
         with open(ConfigManager.RUTA_EMPRESAS, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4)
+
+    @staticmethod
+    def config_desde_plantilla(data):
+        """
+        Configuración de cuenta (formato de `plantillas_cuentas` en jota_config.json) a partir
+        del contenido de una plantilla de `Plantillas/`: las claves sueltas se pasan a su
+        regla y las reglas estándar que falten toman su valor por defecto.
+        No modifica `data`.
+        """
+        reglas_crudas = dict(data.get('reglas', {}))
+
+        # Horarios especiales
+        if 'horario_operacion' in reglas_crudas:
+            if 'inicio' in reglas_crudas['horario_operacion']:
+                reglas_crudas['HORARIO_INICIO'] = reglas_crudas['horario_operacion']['inicio']
+            if 'fin' in reglas_crudas['horario_operacion']:
+                reglas_crudas['HORARIO_FIN'] = reglas_crudas['horario_operacion']['fin']
+
+        for clave_origen, clave_destino in ConfigManager.MAPA_CLAVES.items():
+            if clave_origen in reglas_crudas and clave_destino not in reglas_crudas:
+                reglas_crudas[clave_destino] = reglas_crudas.pop(clave_origen)
+
+        # Reconstruir todas las reglas garantizadas
+        reglas = {}
+        for clave, (nombre_legible, valor_defecto) in ConfigManager.REGLAS_ESTANDARD.items():
+            valor = reglas_crudas.get(clave, valor_defecto)
+            if isinstance(valor, dict) and 'valor' in valor:
+                reglas[clave] = valor
+            else:
+                reglas[clave] = {'nombre': nombre_legible, 'valor': valor}
+
+        return {
+            'TAMAÑO_CUENTA': data.get('size', 0),
+            'OBJETIVO_GANANCIA': reglas_crudas.get('objetivo_usd', 0),
+            'OBJETIVO_PORC': reglas_crudas.get('objetivo_ganancia_pct', 0),
+            'DRAWDOWN_MAX': reglas_crudas.get('drawdown_usd', 0),
+            'DRAWDOWN_MAX_PORC': reglas_crudas.get('drawdown_maximo_pct', 0),
+            'UMBRAL_PAGO': reglas_crudas.get('umbral_pago', 0),
+            'PAGO_MAXIMO': reglas_crudas.get('pago_maximo', 0),
+            'DIAS_PRUEBA': reglas_crudas.get('dias_prueba', reglas_crudas.get('dias_minimos_operados', 0)),
+            'TIPO_DRAWDOWN': reglas_crudas.get('tipo_drawdown', 'Diario'),
+            'REGLAS': reglas
+        }
+
+    @staticmethod
+    def cargar_plantillas_cuentas():
+        """`plantillas_cuentas` de jota_config.json (nombre -> configuración de cuenta), {} si no existe."""
+        try:
+            with open(ConfigManager.RUTA_CONFIG, "r", encoding="utf-8") as f:
+                return json.load(f).get('plantillas_cuentas', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def zona_horaria():
+        """
+        `zona_horaria` de jota_config.json: zona IANA en la que el PC exporta los tiempos
+        (p.ej. "Europe/Madrid"). None si no está o es null (se usa la zona local del equipo).
+        """
+        try:
+            with open(ConfigManager.RUTA_CONFIG, "r", encoding="utf-8") as f:
+                return json.load(f).get('zona_horaria') or None
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def cargar_todas_las_plantillas():
+        """
+        Todas las plantillas disponibles como configuraciones de cuenta: las de `Plantillas/`
+        (por nombre de archivo, sin extensión) y las de `plantillas_cuentas` en jota_config.json.
+        Con el mismo nombre en ambos sitios prevalece la de jota_config.json.
+        """
+        plantillas = {}
+        for archivo in sorted(ConfigManager.listar_plantillas()):
+            data = ConfigManager.cargar_plantilla(archivo)
+            if data:
+                plantillas[os.path.splitext(archivo)[0]] = ConfigManager.config_desde_plantilla(data)
+        plantillas.update(ConfigManager.cargar_plantillas_cuentas())
+        return plantillas
+
+    @staticmethod
+    def cargar_plantillas_atm():
+        """
+        Plantillas ATM de `Plantillas/ATM/` (nombre -> dict JSON, ver `SimuladorATM`).
+        El nombre es el campo `nombre` o, si no lo tiene, el del archivo sin extensión.
+        """
+        if not os.path.isdir(ConfigManager.RUTA_PLANTILLAS_ATM):
+            return {}
+        plantillas = {}
+        for archivo in sorted(os.listdir(ConfigManager.RUTA_PLANTILLAS_ATM)):
+            if not archivo.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(ConfigManager.RUTA_PLANTILLAS_ATM, archivo), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                continue
+            plantillas[data.get('nombre') or os.path.splitext(archivo)[0]] = data
+        return plantillas
@@ -5,7 +5,6 @@
 import os
 import json
 from config_manager import ConfigManager   # Gestión de plantillas y empresas
-import csv
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
 from tkinter.font import Font
@@ -55,16 +54,34 @@ class StoppableThread(threading.Thread):
 
 # --- Funciones de procesamiento de datos y gráficos importadas ---
 from template_editor import TemplateEditor
-from utils.data_utils import cargar_datos_csv, procesar_datos, validar_numerico, validar_fecha
+from utils.data_utils import aplicar_config_cuenta
+from utils.validation_utils import validar_csv, CLAVE_CAMPOS
+from utils.batch_utils import cargar_operaciones_lote
+from utils.cache_utils import CacheManager
 from utils.plot_utils import (
     crear_figura_equity_drawdown,
     crear_histograma_ganancias,
     crear_grafico_rr,
     crear_graficos_timing,
-    crear_grafico_drawdown_diario
+    crear_grafico_drawdown_diario,
+    crear_grafico_metricas_moviles,
+    crear_grafico_exposicion,
+    crear_mapa_calor_brackets,
+    crear_grafico_equity_barras
 )
 from utils.report_utils import exportar_reporte_pdf
 from models.trade_model import TradeModel
+from models.rule_engine import MotorReglas
+from models.rolling_metrics import MetricasMoviles
+from models.monte_carlo import SimuladorMonteCarlo
+from models.position_exposure import ExposicionContratos
+from models.aggregate_cube import CuboAgregados
+from models.template_evaluator import EvaluadorPlantillas
+from models.bracket_grid import BarridoBrackets
+from models.atm_simulator import SimuladorATM
+from models.trade_store import AlmacenOperaciones
+from models.bar_store import AlmacenBarras
+from models.bar_replay import ReproductorBarras
 from models.contracts import ContratosManager
 from utils.constants import texto_ayuda
 
@@ -95,11 +112,52 @@ PARAMETROS_OPERATIVOS = {
     'TAKE_PROFIT_TICKS': 180
 }
 
+# Columnas de la tabla "Todas las Cuentas": (métrica, título, formato)
+COLUMNAS_TABLA_CUENTAS = [
+    ('current_pnl', 'PnL', '{:,.2f}'),
+    ('max_drawdown', 'Drawdown Máx.', '{:,.2f}'),
+    ('days_remaining', 'Días Restantes', '{}'),
+    ('total_trades', 'Operaciones', '{}'),
+    ('win_rate', 'Win Rate (%)', '{:.1f}'),
+    ('profit_factor', 'Profit Factor', '{:.2f}'),
+    ('daily_loss_status', 'Pérdida Diaria', '{}'),
+    ('reglas_fallidas', 'Reglas Incumplidas', '{}'),
+]
+
+# Ventanas de las métricas móviles de la pestaña de resumen
+VENTANA_MOVIL_OPERACIONES = 50
+VENTANA_MOVIL_SESIONES = 5
+
+# Simulación Monte Carlo: caminos y semilla fija (resultados reproducibles entre ejecuciones)
+CAMINOS_MONTE_CARLO = 100_000
+SEMILLA_MONTE_CARLO = 42
+
+# Rejilla del barrido SL/TP en ticks: (inicio, fin, paso)
+REJILLA_SL = (20, 120, 5)
+REJILLA_TP = (20, 360, 5)
+
+# Comparación de ATM: escalas aplicadas a cada plantilla de Plantillas/ATM y columnas de la tabla
+ESCALAS_ATM = (0.5, 0.75, 1.0, 1.25, 1.5)
+COLUMNAS_TABLA_ATM = [
+    ('puesto', 'Puesto', '{:.0f}'),
+    ('pnl_total', 'PnL', '{:,.2f}'),
+    ('expectativa', 'Expectativa', '{:,.2f}'),
+    ('win_rate', 'Win Rate (%)', '{:.1f}'),
+    ('profit_factor', 'Profit Factor', '{:.2f}'),
+    ('drawdown_max', 'Drawdown Máx.', '{:,.2f}'),
+    ('objetivo', 'Objetivo (%)', '{:.1f}'),
+    ('stop', 'Stop (%)', '{:.1f}'),
+    ('real', 'Salida Real (%)', '{:.1f}'),
+]
+
 # --- Clase principal de la aplicación (GUI + orquestación) ---
 class JotaCapitalTracker:
     def __init__(self, nombre_empresa=None):
         # Variables de estado internas
         self.df = None
+        self.df_base = None  # Frame independiente de la plantilla (ver procesar_datos_base)
+        self.cubo = None  # CuboAgregados de df_base, construido una vez por carga
+        self.almacen = None  # AlmacenOperaciones de df: cortes por cuenta y fechas sin máscaras
         self.metricas = {}
         self.threads = []  # Initialize threads as an empty list
         self.parametros_operativos = PARAMETROS_OPERATIVOS.copy()
@@ -292,130 +350,10 @@ class JotaCapitalTracker:
         try:
             data = ConfigManager.cargar_plantilla(os.path.basename(ruta_archivo))
 
-            reglas_crudas = data.get('reglas', {})
-
-            # Si no hay reglas, usar las reglas estándar
+            # Reglas estándar que falten en la plantilla: valores por defecto (ver ConfigManager)
             self.reglas_por_defecto = []
-
-
-            # Adaptar formato de reglas a estructura extendida
-            def adaptar_regla(clave, nombre_legible, valor_defecto):
-                valor_crudo = reglas_crudas.get(clave, valor_defecto)
-
-                # Si ya viene estructurado
-                if isinstance(valor_crudo, dict) and 'valor' in valor_crudo:
-                    valor = valor_crudo['valor']
-                else:
-                    valor = valor_crudo
-
-                # Convertir el tipo adecuadamente
-                if isinstance(valor, str):
-                    valor = valor.strip()
-                    if valor.lower() in ['true', 'false']:
-                        valor = valor.lower() == 'true'
-                    else:
-                        try:
-                            valor = int(valor) if valor.isdigit() else float(valor)
-                        except ValueError:
-                            pass  # mantener como string si no se puede convertir
-                    
-                # Detectar si vino por defecto
-                reglas = {}
-                self.reglas_por_defecto = []
-
-                for clave, (nombre_legible, valor_defecto) in REGLAS_ESTANDARD.items():
-                    valor_crudo = reglas_crudas.get(clave, valor_defecto)
-
-                    if isinstance(valor_crudo, dict) and 'valor' in valor_crudo:
-                        valor = valor_crudo['valor']
-                    else:
-                        valor = valor_crudo
-
-                    # Convertir tipo
-                    if isinstance(valor, str):
-                        valor = valor.strip()
-                        if valor.lower() in ['true', 'false']:
-                            valor = valor.lower() == 'true'
-                        else:
-                            try:
-                                valor = int(valor) if valor.isdigit() else float(valor)
-                            except ValueError:
-                                pass
-
-                    # Detectar si vino por defecto
-                    if clave not in reglas_crudas:
-                        self.reglas_por_defecto.append(clave)
-
-                    reglas[clave] = {
-                        'nombre': nombre_legible,
-                        'valor': valor
-                    }
-
-
-            # Reglas estándar esperadas con nombre legible (y ahora con emojis) y valor por defecto
-            REGLAS_ESTANDARD = {
-                'RATIO_SL_PIPS': ('🛡️ Stop Loss (pips)', 10),
-                'RATIO_TP_PIPS': ('🎯 Take Profit (pips)', 15),
-                'HORARIO_INICIO': ('🕒 Horario de Inicio', '08:00'),
-                'HORARIO_FIN': ('🕔 Horario de Cierre', '16:00'),
-                'STOP_LOSS_OBLIGATORIO': ('🛑 Stop Loss Obligatorio', False),
-                'PERDIDA_DIARIA_MAX': ('💥 Pérdida Diaria Máxima (%)', 5),
-                'PERDIDA_SEMANAL_MAX': ('🔻 Pérdida Semanal Máxima (%)', 10),
-                'PERDIDAS_CONSECUTIVAS_MAX': ('📉 Pérdidas Consecutivas Máx.', 7),
-                'DIAS_OPERANDO_MIN': ('📆 Mínimo de Días Operando', 5),
-                'GANANCIA_DIARIA_MAX_PORC': ('📈 Ganancia Diaria Máx. (%)', 70),
-                'MULTIPLICADOR_CONTRATOS_MAX': ('📊 Multiplicador de Contratos', 3),
-                'CONSISTENCIA': ('📌 Porcentaje de Consistencia (%)', 50),
-            }
-
-            # Inyectar claves huérfanas al bloque de reglas
-            mapa_claves = {
-                'porcentaje_consistencia': 'CONSISTENCIA',
-                'ganancia_diaria_maxima': 'GANANCIA_DIARIA_MAX_PORC',
-                'dias_minimos_operados': 'DIAS_OPERANDO_MIN',
-                'perdidas_consecutivas_maxima': 'PERDIDAS_CONSECUTIVAS_MAX',
-                'perdida_diaria_maxima': 'PERDIDA_DIARIA_MAX',
-                'perdida_semanal_maxima': 'PERDIDA_SEMANAL_MAX',
-                'contratos_maximos': 'MULTIPLICADOR_CONTRATOS_MAX',
-                'ratio_tp_pips': 'RATIO_TP_PIPS',
-                'ratio_sl_pips': 'RATIO_SL_PIPS',
-                'uso_stop_loss_obligatorio': 'STOP_LOSS_OBLIGATORIO',
-            }
-
-            # Horarios especiales
-            if 'horario_operacion' in reglas_crudas:
-                if 'inicio' in reglas_crudas['horario_operacion']:
-                    reglas_crudas['HORARIO_INICIO'] = reglas_crudas['horario_operacion']['inicio']
-                if 'fin' in reglas_crudas['horario_operacion']:
-                    reglas_crudas['HORARIO_FIN'] = reglas_crudas['horario_operacion']['fin']
-
-            for clave_origen, clave_destino in mapa_claves.items():
-                if clave_origen in reglas_crudas and clave_destino not in reglas_crudas:
-                    reglas_crudas[clave_destino] = reglas_crudas[clave_origen]
-                    del reglas_crudas[clave_origen]
-
-
-            # Reconstruir todas las reglas garantizadas
-            reglas = {}
-            for clave, (nombre_legible, valor_defecto) in REGLAS_ESTANDARD.items():
-                valor = reglas_crudas.get(clave, valor_defecto)
-                if isinstance(valor, dict) and 'valor' in valor:
-                    reglas[clave] = valor
-                else:
-                    reglas[clave] = {'nombre': nombre_legible, 'valor': valor}
-
-            self.config_cuenta = {
-                'TAMAÑO_CUENTA': data.get('size', 0),
-                'OBJETIVO_GANANCIA': reglas_crudas.get('objetivo_usd', 0),
-                'OBJETIVO_PORC': reglas_crudas.get('objetivo_ganancia_pct', 0),
-                'DRAWDOWN_MAX': reglas_crudas.get('drawdown_usd', 0),
-                'DRAWDOWN_MAX_PORC': reglas_crudas.get('drawdown_maximo_pct', 0),
-                'UMBRAL_PAGO': reglas_crudas.get('umbral_pago', 0),
-                'PAGO_MAXIMO': reglas_crudas.get('pago_maximo', 0),
-                'DIAS_PRUEBA': reglas_crudas.get('dias_prueba', reglas_crudas.get('dias_minimos_operados', 0)),
-                'TIPO_DRAWDOWN': reglas_crudas.get('tipo_drawdown', 'Diario'),
-                'REGLAS': reglas
-            }
+            self.config_cuenta = ConfigManager.config_desde_plantilla(data)
+            reglas = self.config_cuenta['REGLAS']
 
             # Guardar la plantilla en memoria
             if self.reglas_por_defecto:
@@ -430,6 +368,10 @@ class JotaCapitalTracker:
             self.cuenta_seleccionada = os.path.basename(ruta_archivo)
             self.var_cuenta.set(self.cuenta_seleccionada)
 
+            # Datos ya cargados: solo se recalculan las columnas que dependen de la plantilla
+            if self.df_base is not None:
+                self._aplicar_plantilla_a_datos()
+
             for param, var in self.entradas_parametros.items():
                 var.set(str(self.config_cuenta.get(param, '')))
 
@@ -454,12 +396,33 @@ class JotaCapitalTracker:
         btn_cargar = ttk.Button(control, text="📂 Cargar Operaciones", command=self.cargar_datos_operaciones)
         btn_cargar.pack(side=tk.LEFT, padx=5)
 
+        btn_cargar_carpeta = ttk.Button(control, text="🗂️ Cargar Carpeta", command=self.cargar_carpeta_operaciones)
+        btn_cargar_carpeta.pack(side=tk.LEFT, padx=5)
+
         btn_verificar = ttk.Button(control, text="✅ Verificar CSV", command=self.verificar_archivo_csv)
         btn_verificar.pack(side=tk.LEFT, padx=5)
 
         btn_analizar = ttk.Button(control, text="📊 Analizar Operaciones", command=self.analizar_operaciones)
         btn_analizar.pack(side=tk.LEFT, padx=5)
 
+        btn_cuentas = ttk.Button(control, text="🗂️ Todas las Cuentas", command=self.mostrar_resumen_cuentas)
+        btn_cuentas.pack(side=tk.LEFT, padx=5)
+
+        btn_monte_carlo = ttk.Button(control, text="🎲 Monte Carlo", command=self.simular_monte_carlo)
+        btn_monte_carlo.pack(side=tk.LEFT, padx=5)
+
+        btn_plantillas = ttk.Button(control, text="🧪 Comparar Plantillas", command=self.comparar_plantillas)
+        btn_plantillas.pack(side=tk.LEFT, padx=5)
+
+        btn_brackets = ttk.Button(control, text="🎯 Barrido SL/TP", command=self.barrer_brackets)
+        btn_brackets.pack(side=tk.LEFT, padx=5)
+
+        btn_atm = ttk.Button(control, text="🧩 Comparar ATM", command=self.comparar_atm)
+        btn_atm.pack(side=tk.LEFT, padx=5)
+
+        btn_barras = ttk.Button(control, text="📈 Equity con Barras", command=self.reproducir_barras)
+        btn_barras.pack(side=tk.LEFT, padx=5)
+
         btn_exportar = ttk.Button(control, text="📝 Exportar a PDF", command=self.exportar_reporte_pdf, style='Exito.TButton')
         btn_exportar.pack(side=tk.LEFT, padx=5)
 
@@ -492,9 +455,45 @@ class JotaCapitalTracker:
         self.subtabs.add(self.tab_metrica, text="📊 Métricas y R:R")
         self.subtabs.add(self.tab_timing, text="⏱️ Tiempo y Distribución")
 
+        # Tabla de todas las cuentas (ver mostrar_resumen_cuentas)
+        self.tab_cuentas = ttk.Frame(self.subtabs)
+        self.subtabs.add(self.tab_cuentas, text="🗂️ Todas las Cuentas")
+        self.tabla_cuentas = None
+        self.orden_cuentas = ('current_pnl', False)
+        self.arbol_cuentas = ttk.Treeview(
+            self.tab_cuentas, columns=[c for c, _, _ in COLUMNAS_TABLA_CUENTAS], show='tree headings'
+        )
+        self.arbol_cuentas.heading('#0', text="Cuenta")
+        self.arbol_cuentas.column('#0', width=220)
+        for col, titulo, _ in COLUMNAS_TABLA_CUENTAS:
+            self.arbol_cuentas.heading(col, text=titulo, command=lambda c=col: self._ordenar_tabla_cuentas(c))
+            self.arbol_cuentas.column(col, width=110, anchor=tk.E)
+        barra_cuentas = ttk.Scrollbar(self.tab_cuentas, orient=tk.VERTICAL, command=self.arbol_cuentas.yview)
+        self.arbol_cuentas.configure(yscrollcommand=barra_cuentas.set)
+        barra_cuentas.pack(side=tk.RIGHT, fill=tk.Y)
+        self.arbol_cuentas.pack(fill=tk.BOTH, expand=True)
+        self.arbol_cuentas.bind('<Double-1>', self._analizar_cuenta_de_tabla)
+
+        # Matriz plantillas × cuentas (ver comparar_plantillas)
+        self.tab_plantillas = ttk.Frame(self.subtabs)
+        self.subtabs.add(self.tab_plantillas, text="🧪 Plantillas")
+
+        # Superficies del barrido SL/TP (ver barrer_brackets)
+        self.tab_brackets = ttk.Frame(self.subtabs)
+        self.subtabs.add(self.tab_brackets, text="🎯 SL/TP")
+
+        # Ranking de plantillas ATM (ver comparar_atm)
+        self.tab_atm = ttk.Frame(self.subtabs)
+        self.subtabs.add(self.tab_atm, text="🧩 ATM")
+
+        # Equity minuto a minuto sobre barras OHLC (ver reproducir_barras)
+        self.tab_barras = ttk.Frame(self.subtabs)
+        self.subtabs.add(self.tab_barras, text="📈 Barras")
+
     def verificar_archivo_csv(self):
         """
-        Verifica la integridad de un CSV antes de cargarlo (idéntico al original :contentReference[oaicite:21]{index=21}).
+        Verifica la integridad de un CSV antes de cargarlo: una sola lectura por bloques
+        (`validar_csv`) con conteo de errores por columna, filas y valores de ejemplo.
         """
         ruta = filedialog.askopenfilename(
             filetypes=[('Archivos CSV', '*.csv'), ('Todos', '*.*')],
@@ -503,33 +502,25 @@ class JotaCapitalTracker:
         if not ruta:
             return
         try:
-            with open(ruta, 'r', encoding='utf-8', errors='ignore') as f:
-                muestra = f.read(2048)
-            delim = csv.Sniffer().sniff(muestra, delimiters=",;").delimiter
-            df = pd.read_csv(ruta, sep=delim, encoding='latin1', engine='python')
-            df = df.loc[:, ~df.columns.str.match(r'^Unnamed')]
-            df = cargar_datos_csv(ruta)
-            df = procesar_datos(df, self.config_cuenta)
-
-            faltantes = [c for c in ['cuenta', 'ganancias', 'precio_de_entrada', 'precio_de_salida', 'mercado_pos'] if c not in df.columns]
-            if faltantes:
-                messagebox.showerror("Error", f"Columnas faltantes: {', '.join(faltantes)}")
+            resultado = validar_csv(ruta)
+            if resultado['faltantes']:
+                messagebox.showerror("Error", f"Columnas faltantes: {', '.join(resultado['faltantes'])}")
                 return
 
             errores = []
-            for col in ['ganancias', 'precio_de_entrada', 'precio_de_salida']:
-                cnt = df[col].apply(lambda x: validar_numerico(x)).sum()
-                if cnt:
-                    errores.append(f"{col}: {cnt} errores de conversión")
-            for col in ['tiempo_de_entrada', 'tiempo_de_salida']:
-                if col in df.columns:
-                    cnt = df[col].apply(lambda x: validar_fecha(x)).sum()
-                    if cnt:
-                        errores.append(f"{col}: {cnt} errores de fecha")
+            for col, error in resultado['errores'].items():
+                ejemplos = ", ".join(
+                    f"fila {fila}: {valor!r}" for fila, valor in zip(error['filas'], error['muestras'])
+                )
+                tipo = "líneas con campos de más" if col == CLAVE_CAMPOS else "errores de conversión"
+                errores.append(f"{col}: {error['conteo']} {tipo} ({ejemplos})")
             if errores:
-                messagebox.showwarning("Advertencia", "Inconsistencias:\n\n" + "\n".join(errores))
+                messagebox.showwarning(
+                    "Advertencia",
+                    f"Inconsistencias en {resultado['filas']} filas:\n\n" + "\n".join(errores)
+                )
             else:
-                messagebox.showinfo("Éxito", "El archivo es válido y puede cargarse.")
+                messagebox.showinfo("Éxito", f"El archivo es válido y puede cargarse ({resultado['filas']} filas).")
         except Exception as e:
             messagebox.showerror("Error", f"Error verificando archivo:\n{e}")
 
@@ -545,28 +536,63 @@ class JotaCapitalTracker:
             if self.raiz:
                 self.raiz.update()
 
-            df_crudo = cargar_datos_csv(ruta)
-            df_proc = procesar_datos(df_crudo, self.config_cuenta)
-            self.df = df_proc.copy()
+            self.df_base = CacheManager.cargar_base(ruta)
+            self._aplicar_plantilla_a_datos()
             self.nombre_archivo_csv = os.path.basename(ruta)
+            self._actualizar_tras_carga()
+        except Exception as e:
+            self.var_estado.set(f"Error cargando datos: {e}")
+            self.df = None
+            self.df_base = None
+            self.cubo = None
+            self.almacen = None
 
-            if 'cuenta' in self.df.columns:
-                cuentas = sorted(self.df['cuenta'].dropna().unique())
-                self.combo_cuenta_analisis.config(values=cuentas)
-                if cuentas:
-                    self.var_cuenta_analisis.set(cuentas[0])
-
-            if 'tiempo_de_entrada' in self.df.columns and not self.df['tiempo_de_entrada'].isnull().all():
-                fecha_min = self.df['tiempo_de_entrada'].min().date()
-                self.var_fecha.set(fecha_min.strftime('%Y-%m-%d'))
-            else:
-                self.var_fecha.set(datetime.now().strftime('%Y-%m-%d'))
+    def cargar_carpeta_operaciones(self):
+        """
+        Carga todos los CSV de una carpeta (p.ej. `Operaciones/`) en paralelo y
+        elimina las operaciones repetidas entre exportaciones.
+        """
+        carpeta = filedialog.askdirectory(title="Seleccionar carpeta de operaciones")
+        if not carpeta:
+            return
+        try:
+            self.var_estado.set("Cargando carpeta…")
+            if self.raiz:
+                self.raiz.update()
 
-            self.var_estado.set(f"Cargado {self.nombre_archivo_csv}: {len(self.df)} operaciones.")
-            self.notebook.select(1)
+            self.df_base = cargar_operaciones_lote(carpeta)
+            self._aplicar_plantilla_a_datos()
+            self.nombre_archivo_csv = os.path.basename(carpeta)
+            self._actualizar_tras_carga()
         except Exception as e:
             self.var_estado.set(f"Error cargando datos: {e}")
             self.df = None
+            self.df_base = None
+            self.cubo = None
+            self.almacen = None
+
+    def _aplicar_plantilla_a_datos(self):
+        """Recalcula las columnas de la plantilla sobre df_base y reordena el almacén de operaciones."""
+        self.df = aplicar_config_cuenta(self.df_base, self.config_cuenta)
+        self.almacen = AlmacenOperaciones.construir(self.df)
+
+    def _actualizar_tras_carga(self):
+        """Refresca cubo de agregados, combo de cuentas, fecha de inicio y barra de estado tras cargar datos."""
+        self.cubo = CuboAgregados.construir(self.df_base)
+        if 'cuenta' in self.df.columns:
+            cuentas = sorted(self.df['cuenta'].dropna().unique())
+            self.combo_cuenta_analisis.config(values=cuentas)
+            if cuentas:
+                self.var_cuenta_analisis.set(cuentas[0])
+
+        if 'tiempo_de_entrada' in self.df.columns and not self.df['tiempo_de_entrada'].isnull().all():
+            fecha_min = self.almacen.primera_entrada().date()
+            self.var_fecha.set(fecha_min.strftime('%Y-%m-%d'))
+        else:
+            self.var_fecha.set(datetime.now().strftime('%Y-%m-%d'))
+
+        self.var_estado.set(f"Cargado {self.nombre_archivo_csv}: {len(self.df)} operaciones.")
+        self.notebook.select(1)
 
     def analizar_operaciones(self):
         """
@@ -581,12 +607,12 @@ class JotaCapitalTracker:
             return
         try:
             if 'tiempo_de_entrada' in self.df.columns:
-                self.fecha_inicio = self.df['tiempo_de_entrada'].min().date()
+                self.fecha_inicio = self.almacen.primera_entrada().date()
                 self.var_fecha.set(self.fecha_inicio.strftime('%Y-%m-%d'))
             else:
                 self.fecha_inicio = datetime.now().date()
 
-            df_cuenta = self.df[self.df['cuenta'] == cuenta].copy()
+            df_cuenta = self.almacen.operaciones(cuenta).copy()
             if df_cuenta.empty:
                 messagebox.showwarning("Advertencia", f"No hay operaciones para {cuenta}.")
                 return
@@ -602,9 +628,18 @@ class JotaCapitalTracker:
 
             # Gráficos Resumen
             fig1 = crear_figura_equity_drawdown(df_cuenta, self.config_cuenta, self.colores)
-            fig2 = crear_grafico_drawdown_diario(df_cuenta, self.colores)
+            cubo_cuenta = self.cubo.seleccionar(cuenta=cuenta) if self.cubo is not None else None
+            fig2 = crear_grafico_drawdown_diario(df_cuenta, self.colores, cubo_cuenta)
             self._embeder_figura(self.tab_resumen, fig1)
             self._embeder_figura(self.tab_resumen, fig2)
+            fig_moviles_ops = crear_grafico_metricas_moviles(
+                MetricasMoviles.por_operaciones(df_cuenta, VENTANA_MOVIL_OPERACIONES), self.colores,
+                f"📉 Últimas {VENTANA_MOVIL_OPERACIONES} operaciones")
+            fig_moviles_ses = crear_grafico_metricas_moviles(
+                MetricasMoviles.por_sesiones(df_cuenta, VENTANA_MOVIL_SESIONES), self.colores,
+                f"📉 Últimas {VENTANA_MOVIL_SESIONES} sesiones")
+            self._embeder_figura(self.tab_resumen, fig_moviles_ops)
+            self._embeder_figura(self.tab_resumen, fig_moviles_ses)
 
             # Gráficos Métricas
             fig3 = crear_histograma_ganancias(df_cuenta, self.colores)
@@ -613,15 +648,244 @@ class JotaCapitalTracker:
             self._embeder_figura(self.tab_metrica, fig4)
 
             # Gráficos Timing
-            figs_timing = crear_graficos_timing(df_cuenta, self.colores)
+            figs_timing = crear_graficos_timing(df_cuenta, self.colores, cubo_cuenta)
             for f in figs_timing:
                 self._embeder_figura(self.tab_timing, f)
+            fig_exposicion = crear_grafico_exposicion(
+                ExposicionContratos.linea_tiempo(df_cuenta), ExposicionContratos.limite(self.config_cuenta),
+                self.colores)
+            self._embeder_figura(self.tab_timing, fig_exposicion)
 
             self.var_estado.set(f"Análisis listo: {self.metricas['progress_to_target']:.1f}% al objetivo.")
             self._mostrar_estado_reglas(df_cuenta)
         except Exception as e:
             messagebox.showerror("Error", f"Error al analizar:\n{e}")
 
+    def mostrar_resumen_cuentas(self):
+        """Calcula métricas y reglas de todas las cuentas en una pasada y las lista en una tabla ordenable."""
+        if self.df is None:
+            messagebox.showwarning("Advertencia", "No se han cargado datos.")
+            return
+        try:
+            self.tabla_cuentas, _ = MotorReglas.evaluar_cuentas(self.df, self.config_cuenta)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al calcular las cuentas:\n{e}")
+            return
+        self._llenar_tabla_cuentas()
+        self.subtabs.select(self.tab_cuentas)
+        self.var_estado.set(f"Resumen listo: {len(self.tabla_cuentas)} cuentas.")
+
+    def simular_monte_carlo(self):
+        """Probabilidades de objetivo, umbral de pago y ruptura en los días restantes de la cuenta seleccionada."""
+        if self.df is None:
+            messagebox.showwarning("Advertencia", "No se han cargado datos.")
+            return
+        cuenta = self.var_cuenta_analisis.get()
+        if not cuenta:
+            messagebox.showwarning("Advertencia", "Seleccione una cuenta.")
+            return
+        df_cuenta = self.almacen.operaciones(cuenta)
+        fecha_inicio = self.fecha_inicio or self.almacen.primera_entrada(cuenta).date()
+        self.var_estado.set("Simulando Monte Carlo...")
+        self.raiz.update_idletasks()
+        try:
+            r = SimuladorMonteCarlo.simular_cuenta(df_cuenta, self.config_cuenta, fecha_inicio,
+                                                  caminos=CAMINOS_MONTE_CARLO, semilla=SEMILLA_MONTE_CARLO)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error en la simulación:\n{e}")
+            return
+
+        def porcentaje(p):
+            return "N/D" if p is None else f"{p * 100:.1f}%"
+
+        messagebox.showinfo(
+            "Simulación Monte Carlo",
+            f"Cuenta: {cuenta}\n"
+            f"{r['caminos']:,} caminos de {r['dias']} sesiones (remuestreo por {r['modo']})\n\n"
+            f"🎯 Alcanza el objetivo: {porcentaje(r['prob_objetivo'])}\n"
+            f"📤 Alcanza el umbral de pago: {porcentaje(r['prob_umbral_pago'])}\n"
+            f"💥 Rompe la cuenta: {porcentaje(r['prob_ruptura'])}\n\n"
+            f"PnL final (p5 / p50 / p95): {r['pnl_final_p5']:,.2f} / {r['pnl_final_p50']:,.2f} / {r['pnl_final_p95']:,.2f}"
+        )
+        self.var_estado.set(f"Monte Carlo listo: {porcentaje(r['prob_objetivo'])} al objetivo.")
+
+    def comparar_plantillas(self):
+        """Evalúa todas las plantillas guardadas sobre todas las cuentas cargadas y muestra qué pares pasan."""
+        if self.df_base is None:
+            messagebox.showwarning("Advertencia", "No se han cargado datos.")
+            return
+        plantillas = ConfigManager.cargar_todas_las_plantillas()
+        if not plantillas:
+            messagebox.showwarning("Advertencia", "No hay plantillas guardadas.")
+            return
+        try:
+            resultado = EvaluadorPlantillas.evaluar(self.df_base, plantillas)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al evaluar las plantillas:\n{e}")
+            return
+
+        resumen, matriz = resultado['resumen'], resultado['matriz']
+
+        def celda(plantilla, cuenta):
+            fila = resumen.loc[(plantilla, cuenta)]
+            if fila['pasa']:
+                return "✅ Pasa"
+            motivos = []
+            if fila['reglas_fallidas']:
+                motivos.append(f"{fila['reglas_fallidas']} reglas")
+            if fila['drawdown_excedido']:
+                motivos.append("drawdown")
+            return "❌ " + (", ".join(motivos) or "objetivo")
+
+        for w in self.tab_plantillas.winfo_children():
+            w.destroy()
+        cuentas = list(matriz.columns)
+        arbol = ttk.Treeview(self.tab_plantillas, columns=cuentas, show='tree headings')
+        arbol.heading('#0', text="Plantilla")
+        arbol.column('#0', width=260)
+        for cuenta in cuentas:
+            arbol.heading(cuenta, text=cuenta)
+            arbol.column(cuenta, width=170, anchor=tk.CENTER)
+        for plantilla in matriz.index:
+            arbol.insert('', tk.END, text=plantilla, values=[celda(plantilla, c) for c in cuentas])
+        barra = ttk.Scrollbar(self.tab_plantillas, orient=tk.VERTICAL, command=arbol.yview)
+        arbol.configure(yscrollcommand=barra.set)
+        barra.pack(side=tk.RIGHT, fill=tk.Y)
+        arbol.pack(fill=tk.BOTH, expand=True)
+        self.subtabs.select(self.tab_plantillas)
+        self.var_estado.set(f"Plantillas evaluadas: {int(matriz.values.sum())} de {matriz.size} pares pasan.")
+
+    def barrer_brackets(self):
+        """Vuelve a puntuar las operaciones de la cuenta seleccionada con la rejilla de SL/TP y grafica las superficies."""
+        if self.df is None:
+            messagebox.showwarning("Advertencia", "No se han cargado datos.")
+            return
+        cuenta = self.var_cuenta_analisis.get()
+        if not cuenta:
+            messagebox.showwarning("Advertencia", "Seleccione una cuenta.")
+            return
+        df_cuenta = self.almacen.operaciones(cuenta)
+        self.var_estado.set("Barriendo SL/TP...")
+        self.raiz.update_idletasks()
+        try:
+            superficie = BarridoBrackets.barrer(df_cuenta, BarridoBrackets.rejilla(*REJILLA_SL),
+                                                BarridoBrackets.rejilla(*REJILLA_TP))
+        except Exception as e:
+            messagebox.showerror("Error", f"Error en el barrido de SL/TP:\n{e}")
+            return
+
+        reglas = self.config_cuenta.get('REGLAS', {})
+        actual = (reglas.get('RATIO_SL_PIPS', {}).get('valor'), reglas.get('RATIO_TP_PIPS', {}).get('valor'))
+        actual = actual if all(isinstance(v, (int, float)) and v > 0 for v in actual) else None
+
+        for w in self.tab_brackets.winfo_children():
+            w.destroy()
+        for medida in ('expectativa', 'profit_factor', 'drawdown_max'):
+            self._embeder_figura(self.tab_brackets, crear_mapa_calor_brackets(superficie, self.colores, medida, actual))
+        self.subtabs.select(self.tab_brackets)
+        sl, tp = BarridoBrackets.mejor_par(superficie)
+        self.var_estado.set(
+            f"Barrido SL/TP listo: mejor expectativa con SL {sl:g} / TP {tp:g} ticks "
+            f"({superficie['expectativa'].at[sl, tp]:,.2f} USD por operación)."
+        )
+
+    def comparar_atm(self):
+        """Repite las posiciones de la cuenta seleccionada con cada plantilla ATM (y sus escalas) y las ordena por PnL."""
+        if self.df is None:
+            messagebox.showwarning("Advertencia", "No se han cargado datos.")
+            return
+        cuenta = self.var_cuenta_analisis.get()
+        if not cuenta:
+            messagebox.showwarning("Advertencia", "Seleccione una cuenta.")
+            return
+        plantillas = ConfigManager.cargar_plantillas_atm()
+        if not plantillas:
+            messagebox.showwarning("Advertencia", "No hay plantillas ATM en Plantillas/ATM.")
+            return
+        atms = {}
+        for atm in plantillas.values():
+            atms.update(SimuladorATM.variantes(atm, escalas=ESCALAS_ATM))
+        try:
+            tabla = SimuladorATM.comparar(self.almacen.operaciones(cuenta), atms)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al simular las ATM:\n{e}")
+            return
+
+        for w in self.tab_atm.winfo_children():
+            w.destroy()
+        arbol = ttk.Treeview(self.tab_atm, columns=[c for c, _, _ in COLUMNAS_TABLA_ATM], show='tree headings')
+        arbol.heading('#0', text="ATM")
+        arbol.column('#0', width=240)
+        for col, titulo, _ in COLUMNAS_TABLA_ATM:
+            arbol.heading(col, text=titulo)
+            arbol.column(col, width=110, anchor=tk.E)
+        for nombre, fila in tabla.iterrows():
+            valores = ["" if pd.isna(fila[col]) else formato.format(fila[col]) for col, _, formato in COLUMNAS_TABLA_ATM]
+            arbol.insert('', tk.END, text=nombre, values=valores)
+        barra = ttk.Scrollbar(self.tab_atm, orient=tk.VERTICAL, command=arbol.yview)
+        arbol.configure(yscrollcommand=barra.set)
+        barra.pack(side=tk.RIGHT, fill=tk.Y)
+        arbol.pack(fill=tk.BOTH, expand=True)
+        self.subtabs.select(self.tab_atm)
+        self.var_estado.set(f"ATM comparadas: {len(atms)} variantes sobre {int(tabla['posiciones'].iloc[0])} posiciones.")
+
+    def reproducir_barras(self):
+        """Repite las operaciones de la cuenta seleccionada sobre las barras de Barras/ y grafica su equity intradía."""
+        if self.df is None:
+            messagebox.showwarning("Advertencia", "No se han cargado datos.")
+            return
+        cuenta = self.var_cuenta_analisis.get()
+        if not cuenta:
+            messagebox.showwarning("Advertencia", "Seleccione una cuenta.")
+            return
+        df_cuenta = self.almacen.operaciones(cuenta)
+        self.var_estado.set("Cargando barras...")
+        self.raiz.update_idletasks()
+        try:
+            almacenes = ReproductorBarras.almacenes(df_cuenta)
+            if not almacenes:
+                messagebox.showwarning("Advertencia", f"No hay barras en {AlmacenBarras.RUTA_BARRAS} "
+                                                      f"para los instrumentos de la cuenta.")
+                return
+            resultado = ReproductorBarras.reproducir(df_cuenta, almacenes)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al repetir las operaciones sobre barras:\n{e}")
+            return
+
+        for w in self.tab_barras.winfo_children():
+            w.destroy()
+        self._embeder_figura(self.tab_barras, crear_grafico_equity_barras(resultado['equity'], self.colores))
+        self.subtabs.select(self.tab_barras)
+        excursion = resultado['excursion']
+        cubiertas = excursion['mae_barras'].notna()
+        self.var_estado.set(
+            f"Barras ({', '.join(almacenes)}): {int(cubiertas.sum())} de {len(excursion)} operaciones cubiertas, "
+            f"drawdown intradía máx. {resultado['equity']['drawdown'].max():,.2f} USD."
+        )
+
+    def _llenar_tabla_cuentas(self):
+        """Vuelca `self.tabla_cuentas` en el Treeview con el orden actual."""
+        self.arbol_cuentas.delete(*self.arbol_cuentas.get_children())
+        if self.tabla_cuentas is None:
+            return
+        col, ascendente = self.orden_cuentas
+        for cuenta, fila in self.tabla_cuentas.sort_values(col, ascending=ascendente).iterrows():
+            valores = [formato.format(fila[c]) for c, _, formato in COLUMNAS_TABLA_CUENTAS]
+            self.arbol_cuentas.insert('', tk.END, text=cuenta, values=valores)
+
+    def _ordenar_tabla_cuentas(self, col):
+        """Ordena por `col`; un segundo clic en la misma columna invierte el orden."""
+        actual, ascendente = self.orden_cuentas
+        self.orden_cuentas = (col, not ascendente if col == actual else False)
+        self._llenar_tabla_cuentas()
+
+    def _analizar_cuenta_de_tabla(self, _evento):
+        """Doble clic en una fila: abre el análisis detallado de esa cuenta."""
+        seleccion = self.arbol_cuentas.focus()
+        if seleccion:
+            self.var_cuenta_analisis.set(self.arbol_cuentas.item(seleccion, 'text'))
+            self.analizar_operaciones()
+
     def _embeder_figura(self, marco, figura):
         """Crea y empaqueta FigureCanvasTkAgg para la figura dada."""
         canvas = tk.Canvas(marco, bg=self.colores['claro'])
@@ -639,146 +903,40 @@ class JotaCapitalTracker:
 
     def _mostrar_estado_reglas(self, df_cuenta):
         """
-        Despliega el estado de cada regla (fatal/crítico/importante/operativa) en la pestaña Configuración,
-        tal cual estaba en el original :contentReference[oaicite:24]{index=24}.
+        Despliega el estado de cada regla (fatal/crítico/importante/operativa) en la pestaña Configuración.
+        Los valores y el cumplimiento los calcula `MotorReglas`; aquí solo se pintan.
         """
-        for w in self.marco_estado.winfo_children():
+        for w in self.marco_estado_reglas.winfo_children():
             w.destroy()
 
-        reglas = self.config_cuenta.get('REGLAS', {})
-        if not reglas:
-            ttk.Label(self.marco_estado, text="⚠️ No hay reglas definidas.").pack(pady=20)
+        resultados = MotorReglas.evaluar(df_cuenta, self.config_cuenta, metricas=self.metricas,
+                                         fecha_inicio=self.fecha_inicio)
+        if not resultados:
+            ttk.Label(self.marco_estado_reglas, text="⚠️ No hay reglas definidas.").pack(pady=20)
             return
 
         categorias = {
-            'fatal':     ttk.LabelFrame(self.marco_estado, text="💀 Reglas Fatales", padding=10),
-            'critico':   ttk.LabelFrame(self.marco_estado, text="🚨 Reglas Críticas", padding=10),
-            'importante':ttk.LabelFrame(self.marco_estado, text="⚠️ Reglas Importantes", padding=10),
-            'operativa': ttk.LabelFrame(self.marco_estado, text="📊 Reglas Operativas", padding=10)
+            'fatal':     ttk.LabelFrame(self.marco_estado_reglas, text="💀 Reglas Fatales", padding=10),
+            'critico':   ttk.LabelFrame(self.marco_estado_reglas, text="🚨 Reglas Críticas", padding=10),
+            'importante':ttk.LabelFrame(self.marco_estado_reglas, text="⚠️ Reglas Importantes", padding=10),
+            'operativa': ttk.LabelFrame(self.marco_estado_reglas, text="📊 Reglas Operativas", padding=10)
         }
         for cat in categorias.values():
             cat.pack(fill=tk.X, padx=10, pady=5)
 
-        reglas_por_categoria = {
-            'fatal':     ['TRAILING_DRAWDOWN', 'LIMITE_CONTRATOS', 'OVERNIGHT_POSITIONS'],
-            'critico':   ['PERDIDA_DIARIA_MAX', 'PERDIDA_SEMANAL_MAX', 'PERDIDAS_CONSECUTIVAS_MAX'],
-            'importante':['STOP_LOSS_OBLIGATORIO', 'RATIO_SL_PIPS', 'RATIO_TP_PIPS', 'HORARIO_INICIO', 'HORARIO_FIN'],
-            'operativa': ['DIAS_OPERANDO_MIN', 'GANANCIA_DIARIA_MAX_PORC', 'MULTIPLICADOR_CONTRATOS_MAX', 'CONSISTENCIA']
-        }
-
-        for categoria, claves in reglas_por_categoria.items():
-            marco_cat = categorias[categoria]
-            for clave in claves:
-                if clave not in reglas:
-                    reglas[clave] = {'nombre': clave, 'valor': 0}
-
-                nombre_leg = reglas[clave].get('nombre', clave)
-                limite = reglas[clave].get('valor', 0)
-                try:
-                    valor_real = self._calcular_valor_real(clave, df_cuenta) if not df_cuenta.empty else None
-                except:
-                    valor_real = None
-
-                estado_ok = True
-                mensaje = ""
-                if valor_real is not None:
-                    if categoria == 'fatal':
-                        if clave == 'TRAILING_DRAWDOWN':
-                            balance_min = self.config_cuenta['TAMAÑO_CUENTA'] - limite
-                            if df_cuenta['pnl_acum'].min() < balance_min:
-                                estado_ok = False
-                                mensaje = f"Balance bajo mínimo: {df_cuenta['pnl_acum'].min():.2f}"
-                        elif clave == 'LIMITE_CONTRATOS':
-                            max_c = df_cuenta['parametros_operativos'].apply(lambda x: x['VALOR_PUNTO']).sum()
-                            if max_c > limite:
-                                estado_ok = False
-                                mensaje = f"Exceso contratos totales: {max_c}"
-                        elif clave == 'OVERNIGHT_POSITIONS':
-                            conteo = df_cuenta[df_cuenta['hora_operacion'] < '09:30'].shape[0]
-                            if conteo > 0:
-                                estado_ok = False
-                                mensaje = f"Posiciones Overnight: {conteo}"
-                    elif categoria == 'critico':
-                        if valor_real > limite:
-                            estado_ok = False
-                            mensaje = f"Excedido: {valor_real}"
-                    elif categoria == 'importante':
-                        if clave in ['STOP_LOSS_OBLIGATORIO', 'RATIO_SL_PIPS', 'RATIO_TP_PIPS']:
-                            if valor_real > 0:
-                                estado_ok = False
-                                mensaje = f"{valor_real} violaciones"
-                        elif clave in ['HORARIO_INICIO', 'HORARIO_FIN']:
-                            if valor_real > 0:
-                                estado_ok = False
-                                mensaje = f"{valor_real} ops fuera de horario"
-                    elif categoria == 'operativa':
-                        if clave == 'DIAS_OPERANDO_MIN':
-                            if valor_real < limite:
-                                estado_ok = False
-                                mensaje = f"{valor_real}/{limite} días"
-                        elif valor_real > limite:
-                            estado_ok = False
-                            mensaje = f"{valor_real} > {limite}"
-
-                marco_linea = ttk.Frame(marco_cat)
-                marco_linea.pack(fill=tk.X, pady=2)
-                color = self.colores['exito'] if estado_ok else self.colores['peligro']
-                icono = "✅" if estado_ok else "❌"
-                texto = f"{icono} {nombre_leg}"
-                if valor_real is not None:
-                    texto += f": {valor_real}"
-                texto += f" (Límite: {limite})"
-                lbl = ttk.Label(marco_linea, text=texto, foreground=color)
-                lbl.pack(side=tk.LEFT)
-                if mensaje:
-                    ttk.Label(marco_linea, text=f"⚠️ {mensaje}", foreground=self.colores['peligro']).pack(side=tk.LEFT, padx=(10,0))
-
-    def _calcular_valor_real(self, clave, df):
-        """
-        Calcula el valor real de la regla `clave` basándose en el DataFrame de operaciones.
-        Copiado textualmente de `jota_capital_tracker.py` :contentReference[oaicite:25]{index=25}.
-        """
-        try:
-            if clave == 'PERDIDA_DIARIA_MAX':
-                diario = df.groupby(df['tiempo_de_entrada'].dt.date)['ganancias'].sum()
-                return abs(diario.min()) if not diario.empty else 0
-            if clave == 'PERDIDA_SEMANAL_MAX':
-                semanal = df.resample('W', on='tiempo_de_entrada')['ganancias'].sum()
-                return abs(semanal.min()) if not semanal.empty else 0
-            if clave == 'PERDIDAS_CONSECUTIVAS_MAX':
-                return df['loss_streak'].max() if 'loss_streak' in df.columns else 0
-            if clave == 'GANANCIA_DIARIA_MAX_PORC':
-                diario = df.groupby(df['tiempo_de_entrada'].dt.date)['ganancias'].sum()
-                base = self.config_cuenta.get('TAMAÑO_CUENTA', 1)
-                return (diario.max() / base) * 100 if not diario.empty and base else 0
-            if clave == 'CONSISTENCIA':
-                wins_dia = df.groupby(df['tiempo_de_entrada'].dt.date)['resultado'].mean() * 100
-                return wins_dia.mean() if not wins_dia.empty else 0
-            if clave == 'STOP_LOSS_OBLIGATORIO':
-                return self.metricas.get('sl_violations', 0)
-            if clave == 'DIAS_OPERANDO_MIN':
-                return df['tiempo_de_entrada'].dt.date.nunique() if 'tiempo_de_entrada' in df.columns else 0
-            if clave == 'RATIO_SL_PIPS':
-                if 'sl_deviation' in df.columns:
-                    return int((df['sl_deviation'] > 0.25).sum())
-            if clave == 'RATIO_TP_PIPS':
-                if 'tp_deviation' in df.columns:
-                    return int((df['tp_deviation'] > 0.25).sum())
-            if clave in ('HORARIO_INICIO', 'HORARIO_FIN'):
-                return int(self.metricas.get('fuera_horario_count', 0))
-            if clave == 'MULTIPLICADOR_CONTRATOS_MAX':
-                return df['parametros_operativos'].apply(lambda x: x['VALOR_PUNTO']).max() if 'parametros_operativos' in df.columns else 0
-            if clave == 'TRAILING_DRAWDOWN':
-                return df['pnl_acum'].min() if 'pnl_acum' in df.columns else 0
-            if clave == 'LIMITE_CONTRATOS':
-                return df['parametros_operativos'].apply(lambda x: x['VALOR_PUNTO']).sum() if 'parametros_operativos' in df.columns else 0
-            if clave == 'OVERNIGHT_POSITIONS':
-                if 'hora_operacion' in df.columns:
-                    return int((df['hora_operacion'] < '09:30').sum())
-                return 0
-        except Exception:
-            return 0
-        return 0
+        for r in resultados:
+            marco_linea = ttk.Frame(categorias[r['categoria']])
+            marco_linea.pack(fill=tk.X, pady=2)
+            color = self.colores['exito'] if r['ok'] else self.colores['peligro']
+            icono = "✅" if r['ok'] else "❌"
+            texto = f"{icono} {r['nombre']}"
+            if r['valor'] is not None:
+                texto += f": {r['valor']}"
+            texto += f" (Límite: {r['limite']})"
+            lbl = ttk.Label(marco_linea, text=texto, foreground=color)
+            lbl.pack(side=tk.LEFT)
+            if r['mensaje']:
+                ttk.Label(marco_linea, text=f"⚠️ {r['mensaje']}", foreground=self.colores['peligro']).pack(side=tk.LEFT, padx=(10,0))
 
     def exportar_reporte_pdf(self):
         """
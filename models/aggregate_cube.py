@@ -0,0 +1,255 @@
+# models/aggregate_cube.py
+import numpy as np
+import pandas as pd
+
+DIMENSIONES = ('cuenta', 'instrumento', 'estrategia', 'fecha', 'hora', 'dia_semana')
+# Las celdas se guardan ordenadas por fecha: un rango de fechas es un tramo contiguo
+_ORDEN_CELDAS = ('fecha', 'cuenta', 'instrumento', 'estrategia', 'hora', 'dia_semana')
+# Medidas sumables celda a celda, salvo `perdida_max` (se combina con máximo)
+MEDIDAS = ('operaciones', 'wins', 'pnl', 'pnl_cuadrados', 'ganado', 'perdido',
+           'suma_mae', 'n_mae', 'suma_mfe', 'n_mfe', 'perdida_max')
+
+
+class CuboAgregados:
+    """
+    Cubo de agregados de las operaciones, construido una vez por carga, para responder
+    cortes y consolidaciones ("win rate por hora de ATM 1 - 3 en MES en mayo") sin volver
+    a agrupar el frame de operaciones.
+
+    Dimensiones (`DIMENSIONES`): cuenta, instrumento (símbolo, sin el vencimiento:
+    'MES JUN25' -> 'MES'), estrategia, fecha de la sesión (`sesion`, o día de `tiempo_de_entrada`),
+    hora (bucket de `minutos_bucket` minutos, 'HH:MM') y día de la semana (0 = lunes).
+    Medidas por celda (`MEDIDAS`): operaciones, wins, suma de PnL y de su cuadrado,
+    ganado / perdido, sumas y conteos de MAE y MFE, y la mayor pérdida de una operación.
+
+    El cubo es disperso: solo se guardan las celdas con operaciones, como coordenadas
+    (un código entero por dimensión) más un array por medida. El día de la semana depende
+    de la fecha, así que no multiplica las celdas. Cortar es una máscara sobre las celdas y
+    consolidar un `bincount` sobre ellas: el coste depende del número de celdas, no de operaciones.
+    """
+
+    def __init__(self, valores, coordenadas, medidas, busqueda=None):
+        self.valores = valores          # dimensión -> pd.Index de valores distintos (ordenados)
+        self.coordenadas = coordenadas  # dimensión -> código por celda
+        self.medidas = medidas          # medida -> valor por celda
+        # dimensión -> (valores como array NumPy, {valor: código}), compartido entre cortes
+        self.busqueda = busqueda if busqueda is not None else {
+            d: (np.asarray(v), {valor: codigo for codigo, valor in enumerate(np.asarray(v).tolist())})
+            for d, v in valores.items()
+        }
+
+    def __len__(self):
+        return len(self.medidas['operaciones'])
+
+    @staticmethod
+    def _dimensiones(df, minutos_bucket):
+        """Valores por fila de cada dimensión (None si el frame no trae la columna de origen)."""
+        columnas = {'cuenta': None, 'instrumento': None, 'estrategia': None,
+                    'fecha': None, 'hora': None, 'dia_semana': None}
+        # Sin valor en cuenta / estrategia -> '' (mantiene los valores ordenables)
+        if 'cuenta' in df.columns:
+            columnas['cuenta'] = df['cuenta'].astype(object).where(df['cuenta'].notna(), '')
+        if 'instrumento' in df.columns:
+            codigos, unicos = pd.factorize(df['instrumento'])
+            simbolos = np.array([str(i).split()[0] if str(i).split() else '' for i in unicos] + [''], dtype=object)
+            columnas['instrumento'] = simbolos[codigos]
+        if 'estrategia' in df.columns:
+            columnas['estrategia'] = df['estrategia'].astype(object).where(df['estrategia'].notna(), '')
+        if 'tiempo_de_entrada' in df.columns:
+            entrada = df['tiempo_de_entrada'].to_numpy(dtype='datetime64[ns]')
+            dia = entrada.astype('datetime64[D]')
+            sesion = df['sesion'].to_numpy().astype('datetime64[D]') if 'sesion' in df.columns else dia
+            columnas['fecha'] = sesion.astype(np.int64)
+            minuto = (entrada - dia).astype('timedelta64[m]').astype(np.int64)
+            columnas['hora'] = minuto // minutos_bucket * minutos_bucket
+            # 1970-01-01 fue jueves: (dias + 3) % 7 da 0 = lunes
+            columnas['dia_semana'] = (sesion.astype(np.int64) + 3) % 7
+        return columnas
+
+    @classmethod
+    def construir(cls, df, minutos_bucket=60) -> 'CuboAgregados':
+        """
+        Cubo de un frame de `procesar_datos` / `procesar_datos_base` (no depende de la
+        plantilla). `minutos_bucket` fija el ancho del bucket de hora (1 = minuto a minuto).
+        """
+        if not 1 <= minutos_bucket <= 1440:
+            raise ValueError("El bucket de hora debe estar entre 1 y 1440 minutos.")
+        if df.empty:
+            raise ValueError("No hay operaciones para construir el cubo.")
+        n = len(df)
+        valores, codigos = {}, {}
+        for dimension, columna in cls._dimensiones(df, minutos_bucket).items():
+            if columna is None:
+                codigos[dimension], unicos = np.zeros(n, dtype=np.int64), pd.Index([None])
+            else:
+                codigos[dimension], unicos = pd.factorize(columna, sort=True)
+            valores[dimension] = pd.Index(unicos, name=dimension)
+        if valores['fecha'][0] is not None:
+            valores['fecha'] = pd.DatetimeIndex(valores['fecha'].to_numpy().astype('datetime64[D]'), name='fecha')
+        if valores['hora'][0] is not None:
+            valores['hora'] = pd.Index([f"{m // 60:02d}:{m % 60:02d}" for m in valores['hora']], name='hora')
+
+        # Una clave entera por combinación de dimensiones -> celdas ocupadas
+        forma = tuple(len(valores[d]) for d in _ORDEN_CELDAS)
+        clave = np.ravel_multi_index(tuple(codigos[d] for d in _ORDEN_CELDAS), forma)
+        claves, celda = np.unique(clave, return_inverse=True)
+        coordenadas = dict(zip(_ORDEN_CELDAS, np.unravel_index(claves, forma)))
+        return cls(valores, coordenadas, cls._medidas_celdas(df, celda, len(claves)))
+
+    @staticmethod
+    def _medidas_celdas(df, celda, n_celdas) -> dict:
+        """Medidas de cada celda a partir de las operaciones y su código de celda."""
+        g = df['ganancias'].to_numpy(dtype=np.float64)
+
+        def suma(pesos):
+            return np.bincount(celda, weights=pesos, minlength=n_celdas)
+
+        medidas = {
+            'operaciones': np.bincount(celda, minlength=n_celdas),
+            'wins': np.bincount(celda, weights=g > 0, minlength=n_celdas).astype(np.int64),
+            'pnl': suma(g),
+            'pnl_cuadrados': suma(g * g),
+            'ganado': suma(np.where(g > 0, g, 0.0)),
+            'perdido': suma(np.where(g < 0, g, 0.0)),
+        }
+        for col in ('mae', 'mfe'):
+            x = df[col].to_numpy(dtype=np.float64) if col in df.columns else np.full(len(g), np.nan)
+            validos = ~np.isnan(x)
+            medidas[f'suma_{col}'] = suma(np.where(validos, np.abs(x), 0.0))
+            medidas[f'n_{col}'] = np.bincount(celda, weights=validos, minlength=n_celdas).astype(np.int64)
+        perdida_max = np.zeros(n_celdas)
+        np.maximum.at(perdida_max, celda, np.maximum(-g, 0.0))
+        medidas['perdida_max'] = perdida_max
+        return medidas
+
+    @staticmethod
+    def _dia(valor, fin=False):
+        """
+        Fecha de un filtro como datetime64[D]. Con `fin=True`, el primer día tras el periodo
+        indicado: '2025-05' -> 2025-06-01, '2025-05-31' -> 2025-06-01.
+        """
+        dia = np.datetime64(valor) if isinstance(valor, str) else np.datetime64(pd.Timestamp(valor).date())
+        return (dia + 1).astype('datetime64[D]') if fin else dia.astype('datetime64[D]')
+
+    def _rango_filtro(self, dimension, filtro):
+        """[primer, último + 1) código de un slice inclusivo sobre los valores ordenados."""
+        valores, _ = self.busqueda[dimension]
+        if dimension == 'fecha':
+            desde = 0 if filtro.start is None else np.searchsorted(valores, self._dia(filtro.start))
+            hasta = len(valores) if filtro.stop is None else np.searchsorted(valores, self._dia(filtro.stop, fin=True))
+        else:
+            desde = 0 if filtro.start is None else np.searchsorted(valores, filtro.start, side='left')
+            hasta = len(valores) if filtro.stop is None else np.searchsorted(valores, filtro.stop, side='right')
+        return desde, hasta
+
+    def _codigos_filtro(self, dimension, filtro):
+        """Códigos de `dimension` que cumplen el filtro: un valor o una lista de valores."""
+        valores, codigos = self.busqueda[dimension]
+        buscados = filtro if isinstance(filtro, (list, tuple, set, np.ndarray, pd.Index, pd.Series)) else [filtro]
+        if dimension == 'fecha':
+            dias = np.array([self._dia(valor) for valor in buscados], dtype='datetime64[D]')
+            posiciones = np.minimum(np.searchsorted(valores, dias), len(valores) - 1)
+            return posiciones[valores[posiciones] == dias]
+        return [codigos[valor] for valor in buscados if valor in codigos]
+
+    def seleccionar(self, **filtros) -> 'CuboAgregados':
+        """
+        Corte del cubo: solo las celdas que cumplen todos los filtros, uno por dimensión.
+        Cada filtro es un valor, una lista de valores o un slice inclusivo sobre los valores
+        ordenados: `fecha=slice('2025-05-01', '2025-05-31')`, `hora=slice('09:00', '11:00')`.
+        """
+        desconocidas = [d for d in filtros if d not in DIMENSIONES]
+        if desconocidas:
+            raise ValueError(f"Dimensión desconocida: {', '.join(desconocidas)} (use {', '.join(DIMENSIONES)}).")
+        coordenadas, medidas = self.coordenadas, self.medidas
+        filtros = dict(filtros)
+        if isinstance(filtros.get('fecha'), slice):
+            # Celdas ordenadas por fecha: el rango es un tramo contiguo (vistas, sin copiar)
+            desde, hasta = self._rango_filtro('fecha', filtros.pop('fecha'))
+            tramo = slice(*np.searchsorted(coordenadas['fecha'], [desde, hasta]))
+            coordenadas = {d: c[tramo] for d, c in coordenadas.items()}
+            medidas = {m: v[tramo] for m, v in medidas.items()}
+
+        if filtros:
+            mascara = np.ones(len(medidas['operaciones']), dtype=bool)
+            for dimension, filtro in filtros.items():
+                coordenada = coordenadas[dimension]
+                if isinstance(filtro, slice):
+                    desde, hasta = self._rango_filtro(dimension, filtro)
+                    mascara &= (coordenada >= desde) & (coordenada < hasta)
+                else:
+                    permitidos = np.zeros(len(self.valores[dimension]), dtype=bool)
+                    permitidos[self._codigos_filtro(dimension, filtro)] = True
+                    mascara &= permitidos[coordenada]
+            seleccion = np.flatnonzero(mascara)
+            coordenadas = {d: c[seleccion] for d, c in coordenadas.items()}
+            medidas = {m: v[seleccion] for m, v in medidas.items()}
+        return CuboAgregados(self.valores, coordenadas, medidas, self.busqueda)
+
+    def agregar(self, por=()) -> pd.DataFrame:
+        """
+        Consolida las celdas por las dimensiones `por` (una o varias; vacío = total).
+        Devuelve un DataFrame indexado por esas dimensiones (solo combinaciones con
+        operaciones) con las medidas y las métricas derivadas de `derivadas`.
+        """
+        por = (por,) if isinstance(por, str) else tuple(por)
+        desconocidas = [d for d in por if d not in DIMENSIONES]
+        if desconocidas:
+            raise ValueError(f"Dimensión desconocida: {', '.join(desconocidas)} (use {', '.join(DIMENSIONES)}).")
+
+        if por:
+            forma = tuple(len(self.valores[d]) for d in por)
+            clave = np.ravel_multi_index(tuple(self.coordenadas[d] for d in por), forma)
+            claves, grupo = np.unique(clave, return_inverse=True)
+            if len(por) == 1:
+                indice = self.valores[por[0]][claves]
+            else:
+                indice = pd.MultiIndex.from_arrays(
+                    [self.valores[d][c] for d, c in zip(por, np.unravel_index(claves, forma))], names=list(por))
+        else:
+            grupo, claves = np.zeros(len(self), dtype=np.int64), np.zeros(1 if len(self) else 0)
+            indice = pd.RangeIndex(len(claves))
+
+        tabla = {}
+        for medida, valores in self.medidas.items():
+            if medida == 'perdida_max':
+                maximos = np.zeros(len(claves))
+                np.maximum.at(maximos, grupo, valores)
+                tabla[medida] = maximos
+            else:
+                sumas = np.bincount(grupo, weights=valores, minlength=len(claves))
+                tabla[medida] = sumas.astype(np.int64) if valores.dtype.kind == 'i' else sumas
+        return pd.DataFrame(self.derivadas(tabla), index=indice)
+
+    def totales(self, **filtros) -> dict:
+        """
+        Medidas y métricas derivadas del corte completo como escalares, sin construir
+        DataFrames (la consulta más barata: para reglas y encabezados).
+        """
+        cubo = self.seleccionar(**filtros) if filtros else self
+        tabla = {m: (v.max(initial=0.0) if m == 'perdida_max' else v.sum()) for m, v in cubo.medidas.items()}
+        return {clave: valor.item() for clave, valor in self.derivadas(
+            {m: np.atleast_1d(v) for m, v in tabla.items()}).items()}
+
+    def consultar(self, por=(), **filtros) -> pd.DataFrame:
+        """`seleccionar(**filtros)` y `agregar(por)` en una llamada."""
+        return self.seleccionar(**filtros).agregar(por)
+
+    @staticmethod
+    def derivadas(medidas) -> dict:
+        """
+        Medidas (arrays) más las métricas derivadas: win_rate (%), pnl_medio, desviacion
+        (del PnL por operación, poblacional), profit_factor (0 sin pérdidas, como
+        `calcular_metricas`), mae_medio y mfe_medio.
+        """
+        tabla = dict(medidas)
+        n = tabla['operaciones'].astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tabla['win_rate'] = np.where(n > 0, tabla['wins'] / n * 100, 0.0)
+            tabla['pnl_medio'] = np.where(n > 0, tabla['pnl'] / n, np.nan)
+            varianza = tabla['pnl_cuadrados'] / n - tabla['pnl_medio'] ** 2
+            tabla['desviacion'] = np.where(n > 0, np.sqrt(np.maximum(varianza, 0.0)), np.nan)
+            tabla['profit_factor'] = np.where(tabla['perdido'] < 0, tabla['ganado'] / np.abs(tabla['perdido']), 0.0)
+            tabla['mae_medio'] = np.where(tabla['n_mae'] > 0, tabla['suma_mae'] / tabla['n_mae'], np.nan)
+            tabla['mfe_medio'] = np.where(tabla['n_mfe'] > 0, tabla['suma_mfe'] / tabla['n_mfe'], np.nan)
+        return tabla
@@ -0,0 +1,308 @@
+# models/atm_simulator.py
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from models.bracket_grid import ORDENES
+
+# Columnas que identifican una misma entrada repartida en varias filas (una por objetivo)
+CLAVE_POSICION = ('cuenta', 'instrumento', 'mercado_pos', 'tiempo_de_entrada', 'precio_de_entrada')
+SALIDAS = ('objetivo', 'stop', 'real')
+# Celdas (posiciones × tramos) por bloque: los arrays intermedios caben en caché
+CELDAS_POR_BLOQUE = 200_000
+
+
+class SimuladorATM:
+    """
+    Repite la historia de operaciones con otras estrategias ATM (varios objetivos, stop,
+    breakeven y trailing por objetivo), a partir de plantillas JSON como las de `Plantillas/ATM/`:
+
+        {"nombre": "...", "tipo": "moneda" | "ticks", "stop": 75,
+         "objetivos": [{"cantidad": 1, "ganancia": 75, "stop": 75,
+                        "breakeven": {"activador": 60, "mas": 4},
+                        "trailing": [{"activador": 90, "offset": 40}, ...]}, ...]}
+
+    `ganancia` y `stop` (por objetivo o global) van en USD por contrato con `tipo` "moneda" y
+    en ticks con "ticks"; breakeven y trailing siempre en ticks, como la estrategia de stop de NT8.
+
+    Cada posición (filas con la misma entrada, ver `CLAVE_POSICION`) se reconstruye con su
+    MAE / MFE máximos por contrato y la salida del último tramo en cerrarse. Dentro de ese
+    recorrido el orden no se conoce, así que cada tramo se repite con los dos órdenes (MAE y
+    luego MFE, o MFE y luego MAE; al final la salida real) y se acota:
+    - 'peor': el menor de los dos resultados, tramo a tramo
+    - 'mejor': el mayor de los dos resultados, tramo a tramo
+    Ninguno de los dos órdenes es siempre el peor: con breakeven o trailing, llegar antes al
+    MFE sube el stop y puede sacar el tramo con menos de lo que daría tocar antes el MAE.
+    Cada tramo sale por su objetivo, por su stop vigente (inicial, breakeven o trailing, que
+    solo suben con el máximo favorable alcanzado) o, si no toca ninguno, con la salida real.
+
+    Todos los tramos de todas las variantes se evalúan juntos como arrays (posiciones × tramos),
+    por bloques de posiciones de `CELDAS_POR_BLOQUE` celdas, y se suman por variante con un
+    producto de matrices.
+    """
+
+    @staticmethod
+    def posiciones(df, excursion_por_contrato=False) -> dict:
+        """
+        Por posición, en orden de entrada: 'mae', 'mfe' y 'salida' (ticks por contrato),
+        'valor_tick', 'ganancias' (USD reales de todas sus filas), 'contratos' y 'entrada'.
+        El MAE / MFE del export es el de cada fila completa (`excursion_por_contrato=True`
+        si viene por contrato).
+        """
+        faltantes = [c for c in ('ganancias', 'mae', 'mfe') if c not in df.columns]
+        if faltantes:
+            raise ValueError(f"Columnas requeridas faltantes: {', '.join(faltantes)}")
+        if df.empty:
+            raise ValueError("No hay operaciones para simular.")
+        n = len(df)
+        g = df['ganancias'].to_numpy(dtype=np.float64)
+        valor_tick = df['valor_tick'].to_numpy(dtype=np.float64) if 'valor_tick' in df.columns else np.ones(n)
+        cant = df['cant'].abs().to_numpy(dtype=np.float64) if 'cant' in df.columns else np.ones(n)
+        cant = np.where(cant > 0, cant, 1.0)
+        tick_fila = np.where(valor_tick > 0, valor_tick, 1.0)
+        excursion = tick_fila if excursion_por_contrato else tick_fila * cant
+        mae = np.abs(df['mae'].to_numpy(dtype=np.float64)) / excursion
+        mfe = np.abs(df['mfe'].to_numpy(dtype=np.float64)) / excursion
+        salida = g / (tick_fila * cant)
+
+        columnas = [c for c in CLAVE_POSICION if c in df.columns]
+        if 'tiempo_de_entrada' in columnas:
+            codigos = df.groupby(columnas, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+            k = int(codigos.max()) + 1
+        else:
+            codigos, k = np.arange(n), n
+
+        # Orden cronológico de las posiciones (primera entrada de cada una)
+        primera = np.full(k, n)
+        np.minimum.at(primera, codigos, np.arange(n))
+        if 'tiempo_de_entrada' in df.columns:
+            entrada = df['tiempo_de_entrada'].to_numpy(dtype='datetime64[ns]')
+            orden_pos = np.lexsort((primera, entrada[primera]))
+        else:
+            entrada, orden_pos = None, np.argsort(primera, kind='stable')
+        rango = np.empty(k, dtype=np.int64)
+        rango[orden_pos] = np.arange(k)
+        codigos = rango[codigos]
+
+        # Tramo que se cierra el último: su salida es la última conocida de la posición
+        cierre = (df['tiempo_de_salida'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+                  if 'tiempo_de_salida' in df.columns else np.arange(n))
+        orden = np.lexsort((cierre, codigos))
+        ultima = orden[np.append(codigos[orden][1:] != codigos[orden][:-1], True)]
+
+        mae_pos, mfe_pos = np.zeros(k), np.zeros(k)
+        np.maximum.at(mae_pos, codigos, mae)
+        np.maximum.at(mfe_pos, codigos, mfe)
+        salida_pos = salida[ultima]
+        return {
+            # El recorrido conocido cubre la salida: MFE >= salida >= -MAE
+            'mae': np.maximum(mae_pos, -salida_pos),
+            'mfe': np.maximum(mfe_pos, salida_pos),
+            'salida': salida_pos,
+            'valor_tick': tick_fila[ultima],
+            'ganancias': np.bincount(codigos, weights=g, minlength=k),
+            'contratos': np.bincount(codigos, weights=cant, minlength=k),
+            'entrada': entrada[ultima] if entrada is not None else None,
+        }
+
+    @staticmethod
+    def tramos(atms) -> dict:
+        """
+        Tramos (objetivos) de todas las plantillas ATM `atms` (nombre -> dict JSON) aplanados
+        en arrays: 'variante' (posición en `atms`), 'cantidad', 'objetivo' y 'stop' (inf si no
+        hay), 'moneda' (objetivo / stop en USD por contrato), 'be_activador' (inf sin breakeven),
+        'be_mas' y los pasos de trailing como matrices (tramos × pasos, activador inf de relleno).
+        """
+        filas = []
+        for v, (nombre, atm) in enumerate(atms.items()):
+            objetivos = atm.get('objetivos') or []
+            if not objetivos:
+                raise ValueError(f"La ATM '{nombre}' no tiene objetivos.")
+            tipo = atm.get('tipo', 'ticks')
+            if tipo not in ('ticks', 'moneda'):
+                raise ValueError(f"Tipo de parámetro desconocido en '{nombre}': {tipo} (use ticks o moneda).")
+            for objetivo in objetivos:
+                if not objetivo.get('cantidad', 0) > 0:
+                    raise ValueError(f"Cada objetivo de '{nombre}' necesita una cantidad positiva.")
+                breakeven = objetivo.get('breakeven') or {}
+                filas.append({
+                    'variante': v,
+                    'cantidad': float(objetivo['cantidad']),
+                    'objetivo': float(objetivo.get('ganancia') or np.inf),
+                    'stop': float(objetivo.get('stop', atm.get('stop')) or np.inf),
+                    'moneda': tipo == 'moneda',
+                    'be_activador': float(breakeven['activador']) if breakeven else np.inf,
+                    'be_mas': float(breakeven.get('mas', 0)) if breakeven else 0.0,
+                    'trailing': [(float(p['activador']), float(p['offset'])) for p in objetivo.get('trailing') or []],
+                })
+
+        pasos = max(1, max(len(f['trailing']) for f in filas))
+        activador = np.full((len(filas), pasos), np.inf)
+        offset = np.zeros((len(filas), pasos))
+        for i, f in enumerate(filas):
+            for j, (a, o) in enumerate(f['trailing']):
+                activador[i, j], offset[i, j] = a, o
+        r = {clave: np.array([f[clave] for f in filas]) for clave in
+             ('variante', 'cantidad', 'objetivo', 'stop', 'moneda', 'be_activador', 'be_mas')}
+        r.update(trail_activador=activador, trail_offset=offset, variantes=list(atms))
+        return r
+
+    @staticmethod
+    def nivel_stop(maximo, tramos, stop_inicial) -> np.ndarray:
+        """
+        Stop vigente (ticks desde la entrada) tras alcanzar `maximo` ticks a favor (posiciones × tramos):
+        el mayor entre el stop inicial, el breakeven activado y cada paso de trailing activado
+        (máximo - offset, siguiendo al precio tick a tick).
+        """
+        nivel = np.where(maximo >= tramos['be_activador'], tramos['be_mas'], -np.inf)
+        np.maximum(nivel, -stop_inicial, out=nivel)
+        # Un paso por vez sobre (posiciones × tramos): evita el array de tres ejes con los pocos pasos de una ATM
+        for activador, offset in zip(tramos['trail_activador'].T, tramos['trail_offset'].T):
+            np.maximum(nivel, np.where(maximo >= activador, maximo - offset, -np.inf), out=nivel)
+        return nivel
+
+    @classmethod
+    def resultados_tramos(cls, posiciones, tramos, orden='peor', deslizamiento=0.0) -> tuple:
+        """
+        Resultado en ticks por contrato de cada tramo en cada posición (posiciones × tramos)
+        y cómo sale (0 objetivo, 1 stop, 2 salida real): el menor ('peor') o el mayor ('mejor')
+        de los dos órdenes posibles de MAE y MFE. Los stops se llenan `deslizamiento` ticks
+        peor; los objetivos, en su precio.
+        """
+        if orden not in ORDENES:
+            raise ValueError(f"Orden desconocido: {orden} (use {' o '.join(ORDENES)}).")
+        a, f, x = (posiciones[k][:, None] for k in ('mae', 'mfe', 'salida'))
+        # Objetivo y stop en USD -> ticks con el valor del tick de cada posición
+        escala = np.where(tramos['moneda'], 1.0 / posiciones['valor_tick'][:, None], 1.0)
+        objetivo, stop = tramos['objetivo'] * escala, tramos['stop'] * escala
+
+        toca_objetivo = f >= objetivo
+        nivel_maximo = cls.nivel_stop(np.broadcast_to(f, toca_objetivo.shape), tramos, stop)
+
+        # MAE primero: antes del MFE el stop es el inicial; después, el vigente en el máximo
+        stop_inicial = a >= stop
+        sale_objetivo = ~stop_inicial & toca_objetivo
+        sale_stop = stop_inicial | (~sale_objetivo & (x < nivel_maximo))
+        nivel = np.where(stop_inicial, -stop, nivel_maximo)
+        resultado = np.where(sale_objetivo, objetivo, np.where(sale_stop, nivel - deslizamiento, x))
+        salida = np.where(sale_objetivo, 0, np.where(sale_stop, 1, 2))
+
+        # MFE primero: el objetivo llega antes y, si no, el MAE toca el stop ya subido
+        sale_stop = ~toca_objetivo & (-a <= nivel_maximo)
+        otro = np.where(toca_objetivo, objetivo, np.where(sale_stop, nivel_maximo - deslizamiento, x))
+        usar_otro = otro < resultado if orden == 'peor' else otro > resultado
+        resultado = np.where(usar_otro, otro, resultado)
+        salida = np.where(usar_otro, np.where(toca_objetivo, 0, np.where(sale_stop, 1, 2)), salida)
+        return resultado, salida
+
+    @classmethod
+    def simular(cls, df, atms, orden='peor', deslizamiento=0.0, excursion_por_contrato=False) -> dict:
+        """
+        PnL (USD) de cada posición de `df` con cada plantilla de `atms` (nombre -> dict JSON).
+        Devuelve 'pnl' (DataFrame posiciones × variantes), 'real' (PnL real por posición) y
+        'salidas' (DataFrame variantes × SALIDAS con la fracción de contratos que sale de cada forma).
+        """
+        if not atms:
+            raise ValueError("No hay plantillas ATM para simular.")
+        p = cls.posiciones(df, excursion_por_contrato)
+        t = cls.tramos(atms)
+        n, n_tramos = len(p['mae']), len(t['cantidad'])
+
+        # Tramos -> variantes: cada tramo aporta su cantidad a su variante
+        pesos = np.zeros((n_tramos, len(t['variantes'])))
+        pesos[np.arange(n_tramos), t['variante']] = t['cantidad']
+        pnl = np.empty((n, len(t['variantes'])))
+        por_tramo = np.zeros((len(SALIDAS), n_tramos))
+        por_bloque = max(1, CELDAS_POR_BLOQUE // n_tramos)
+        for inicio in range(0, n, por_bloque):
+            bloque = {k: v[inicio:inicio + por_bloque] for k, v in p.items() if k in ('mae', 'mfe', 'salida', 'valor_tick')}
+            ticks, salida = cls.resultados_tramos(bloque, t, orden, deslizamiento)
+            pnl[inicio:inicio + por_bloque] = (ticks * bloque['valor_tick'][:, None]) @ pesos
+            for s in range(len(SALIDAS)):
+                por_tramo[s] += (salida == s).sum(axis=0)
+        por_salida = (por_tramo @ pesos).T
+        indice = pd.DatetimeIndex(p['entrada'], name='entrada') if p['entrada'] is not None else None
+        return {
+            'pnl': pd.DataFrame(pnl, index=indice, columns=t['variantes']),
+            'real': pd.Series(p['ganancias'], index=indice, name='real'),
+            'salidas': pd.DataFrame(por_salida / por_salida.sum(axis=1, keepdims=True),
+                                    index=t['variantes'], columns=SALIDAS),
+        }
+
+    @staticmethod
+    def medidas(pnl) -> pd.DataFrame:
+        """Por columna de `pnl` (posiciones × variantes): las medidas de la tabla comparativa."""
+        valores = pnl.to_numpy(dtype=np.float64)
+        n = len(valores)
+        ganado = np.where(valores > 0, valores, 0.0).sum(axis=0)
+        perdido = -np.where(valores < 0, valores, 0.0).sum(axis=0)
+        curva = np.cumsum(valores, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.DataFrame({
+                'posiciones': n,
+                'pnl_total': curva[-1] if n else 0.0,
+                'expectativa': valores.mean(axis=0) if n else np.nan,
+                'win_rate': (valores > 0).mean(axis=0) * 100 if n else np.nan,
+                'profit_factor': np.where(perdido != 0, ganado / perdido, 0.0),
+                'drawdown_max': (np.maximum.accumulate(curva, axis=0) - curva).max(axis=0) if n else np.nan,
+            }, index=pnl.columns)
+
+    @classmethod
+    def comparar(cls, df, atms, orden='peor', deslizamiento=0.0, por='pnl_total', incluir_real=True,
+                 excursion_por_contrato=False) -> pd.DataFrame:
+        """
+        Tabla de las plantillas ATM ordenada por `por` (de mayor a menor; drawdown de menor a mayor),
+        con 'puesto', las medidas de `medidas` y la fracción de contratos que sale por objetivo,
+        stop o salida real. Con `incluir_real` añade la fila 'Real' con lo que se operó.
+        `orden` 'peor' / 'mejor' acota cada tramo por abajo / por arriba entre los dos órdenes
+        de MAE y MFE (ver `resultados_tramos`), así que el PnL de cada posición y el total con
+        'peor' nunca superan los de 'mejor'; el drawdown no se acota, sale de esa secuencia.
+        """
+        r = cls.simular(df, atms, orden, deslizamiento, excursion_por_contrato)
+        tabla = cls.medidas(r['pnl']).join(r['salidas'] * 100)
+        if incluir_real:
+            tabla.loc['Real'] = cls.medidas(r['real'].to_frame()).iloc[0]
+            tabla['posiciones'] = tabla['posiciones'].astype(int)
+        tabla = tabla.sort_values(por, ascending=(por == 'drawdown_max'), kind='stable')
+        tabla.insert(0, 'puesto', np.arange(1, len(tabla) + 1))
+        tabla.index.name = 'atm'
+        return tabla
+
+    @staticmethod
+    def variantes(atm, escalas=(1.0,), activadores_breakeven=(None,)) -> dict:
+        """
+        Variantes de una plantilla ATM (nombre -> dict JSON): cada `escala` multiplica objetivos,
+        stops, breakeven y trailing; cada activador de breakeven lo sustituye en todos los
+        objetivos (None = el de la plantilla, 0 = sin breakeven).
+        """
+        nombre = atm.get('nombre', 'ATM')
+        resultado = {}
+        for escala, activador in itertools.product(escalas, activadores_breakeven):
+            variante = {
+                'nombre': nombre,
+                'tipo': atm.get('tipo', 'ticks'),
+                'stop': atm['stop'] * escala if atm.get('stop') else atm.get('stop'),
+                'objetivos': [],
+            }
+            for objetivo in atm.get('objetivos', []):
+                nuevo = dict(objetivo)
+                for clave in ('ganancia', 'stop'):
+                    if objetivo.get(clave):
+                        nuevo[clave] = objetivo[clave] * escala
+                breakeven = objetivo.get('breakeven') or {}
+                if activador == 0 or (activador is None and not breakeven):
+                    nuevo.pop('breakeven', None)
+                else:
+                    nuevo['breakeven'] = {
+                        'activador': breakeven['activador'] * escala if activador is None else activador,
+                        'mas': breakeven.get('mas', 0) * escala,
+                    }
+                nuevo['trailing'] = [{'activador': p['activador'] * escala, 'offset': p['offset'] * escala}
+                                     for p in objetivo.get('trailing') or []]
+                variante['objetivos'].append(nuevo)
+            etiqueta = nombre if escala == 1 else f"{nombre} ×{escala:g}"
+            if activador is not None:
+                etiqueta += " sin BE" if activador == 0 else f" BE{activador:g}"
+            resultado[etiqueta] = variante
+        return resultado
@@ -0,0 +1,183 @@
+# models/bar_replay.py
+import numpy as np
+import pandas as pd
+
+from models.bar_store import AlmacenBarras
+
+COLUMNAS_EQUITY = ('realizado', 'abierto', 'equity', 'drawdown', 'abiertas')
+
+
+class ReproductorBarras:
+    """
+    Repite las operaciones sobre barras OHLC (`AlmacenBarras`) para ver lo que el export
+    resume en un número por operación: el MAE / MFE real dentro de cada operación y la
+    equity de la cuenta minuto a minuto, con las posiciones abiertas valoradas a mercado.
+
+    Entrada y salida se alinean a las barras con `searchsorted` sobre los tiempos (cierre
+    de cada barra): una operación se valora al cierre de cada barra que cierra entre su
+    entrada y su salida, y su excursión son los máximos / mínimos de esas barras más la de
+    la salida. Con barras de 1 minuto la excursión es una cota (la barra de entrada y la de
+    salida incluyen precios de fuera de la operación); con ticks es la exacta.
+
+    Todas las operaciones de un símbolo se expanden a pares (operación, barra) con
+    `repeat` + `arange` y se reducen por operación con `reduceat`. La equity es una suma
+    acumulada de eventos: cada marca aporta la diferencia con la marca anterior de su
+    operación y la salida retira la última y suma el PnL realizado, así que operaciones
+    solapadas o de símbolos con barras distintas se suman sin rellenar una rejilla común.
+    """
+
+    @staticmethod
+    def simbolos(df) -> pd.Series:
+        """Símbolo de cada operación ('MES JUN25' -> 'MES')."""
+        return df['instrumento'].astype(str).str.split().str[0].str.upper()
+
+    @classmethod
+    def almacenes(cls, df, ruta_barras=None) -> dict:
+        """Símbolo -> `AlmacenBarras` de los símbolos de `df` que tienen barras."""
+        almacenes = {}
+        for simbolo in cls.simbolos(df).unique():
+            almacen = AlmacenBarras.abrir(simbolo, ruta_barras)
+            if almacen is not None and len(almacen):
+                almacenes[simbolo] = almacen
+        return almacenes
+
+    @staticmethod
+    def alinear(tiempos, entrada, salida) -> tuple:
+        """
+        Por operación (tiempos en ns): primera barra que cierra en o después de la entrada y
+        barra de la salida (la primera que cierra en o después de ella, acotada a la última).
+        """
+        inicio = np.searchsorted(tiempos, entrada, side='left')
+        fin = np.minimum(np.searchsorted(tiempos, salida, side='left'), len(tiempos) - 1)
+        return inicio, fin
+
+    @staticmethod
+    def _operaciones(df) -> dict:
+        """Arrays por operación: tiempos en ns, dirección (+1 / -1), precios y USD por punto de precio."""
+        n = len(df)
+        cant = np.abs(df['cant'].to_numpy(dtype=np.float64)) if 'cant' in df.columns else np.ones(n)
+        cant = np.where(cant > 0, cant, 1.0)
+        tamano = df['tamano_tick'].to_numpy(dtype=np.float64) if 'tamano_tick' in df.columns else np.ones(n)
+        valor_tick = df['valor_tick'].to_numpy(dtype=np.float64) if 'valor_tick' in df.columns else np.ones(n)
+        corto = df['mercado_pos'].astype(str).str.strip().str.lower().isin(('short', 'corto')).to_numpy()
+        return {
+            'entrada': df['tiempo_de_entrada'].to_numpy(dtype='datetime64[ns]').astype(np.int64),
+            'salida': df['tiempo_de_salida'].to_numpy(dtype='datetime64[ns]').astype(np.int64),
+            'direccion': np.where(corto, -1.0, 1.0),
+            'precio_entrada': df['precio_de_entrada'].to_numpy(dtype=np.float64),
+            'precio_salida': df['precio_de_salida'].to_numpy(dtype=np.float64),
+            'usd_punto': valor_tick / tamano * cant,
+            'ganancias': df['ganancias'].to_numpy(dtype=np.float64),
+        }
+
+    @staticmethod
+    def _expandir(inicio, largo) -> tuple:
+        """Índices de barra de los pares (operación, barra) y posición del primer par de cada operación."""
+        primeros = np.cumsum(largo) - largo
+        return np.repeat(inicio - primeros, largo) + np.arange(largo.sum()), primeros
+
+    @classmethod
+    def _reproducir_simbolo(cls, operaciones, almacen) -> dict:
+        """Excursiones por operación y eventos de equity de las operaciones de un símbolo."""
+        tiempos = almacen.tiempos
+        n = len(operaciones['entrada'])
+        inicio, fin = cls.alinear(tiempos, operaciones['entrada'], operaciones['salida'])
+        # Cubierta: hay barras desde antes de la entrada hasta la salida
+        cubierta = (inicio < len(tiempos)) & (tiempos[0] <= operaciones['entrada']) & \
+                   (operaciones['salida'] <= tiempos[-1])
+        d, pe = operaciones['direccion'], operaciones['precio_entrada']
+        cerrado = d * (operaciones['precio_salida'] - pe)
+
+        # Excursión: barras [inicio, fin] de las operaciones cubiertas
+        largo = np.where(cubierta, fin - inicio + 1, 0)
+        barra, primeros = cls._expandir(inicio, largo)
+        mae, mfe = np.full(n, np.nan), np.full(n, np.nan)
+        if len(barra):
+            dp, pep = np.repeat(d, largo), np.repeat(pe, largo)
+            maximo, minimo = almacen.columnas['maximo'][barra], almacen.columnas['minimo'][barra]
+            favorable = np.where(dp > 0, maximo - pep, pep - minimo)
+            adversa = np.where(dp > 0, pep - minimo, maximo - pep)
+            con_barras = largo > 0
+            mfe[con_barras] = np.maximum.reduceat(favorable, primeros[con_barras])
+            mae[con_barras] = np.maximum.reduceat(adversa, primeros[con_barras])
+        mfe = np.maximum(np.maximum(mfe, cerrado), 0.0) * operaciones['usd_punto']
+        mae = np.maximum(np.maximum(mae, -cerrado), 0.0) * operaciones['usd_punto']
+        mae[~cubierta], mfe[~cubierta] = np.nan, np.nan
+
+        # Marcas a mercado: barras [inicio, fin) (las que cierran antes de la salida)
+        marcas = np.where(cubierta, fin - inicio, 0)
+        barra, primeros = cls._expandir(inicio, marcas)
+        abierto = np.repeat(d * operaciones['usd_punto'], marcas) * \
+            (almacen.columnas['cierre'][barra] - np.repeat(pe, marcas))
+        delta = abierto.copy()
+        delta[1:] -= abierto[:-1]
+        con_marcas = marcas > 0
+        delta[primeros[con_marcas]] = abierto[primeros[con_marcas]]
+        ultima = np.zeros(n)
+        ultima[con_marcas] = abierto[primeros[con_marcas] + marcas[con_marcas] - 1]
+        return {
+            'mae': mae, 'mfe': mfe, 'barras': np.where(cubierta, fin - inicio + 1, 0),
+            'tiempo_marcas': np.asarray(tiempos[barra], dtype=np.int64), 'delta_marcas': delta,
+            'cierre_abierto': -ultima,
+        }
+
+    @classmethod
+    def reproducir(cls, df, almacenes=None, ruta_barras=None) -> dict:
+        """
+        Repite las operaciones de `df` sobre sus barras. Devuelve 'excursion' (DataFrame con
+        el índice de `df`: 'mae_barras' / 'mfe_barras' en USD de la posición completa, como el
+        export, y 'barras' recorridas; NaN sin barras que cubran la operación) y 'equity'
+        (ver `equity`).
+        """
+        faltantes = [c for c in ('instrumento', 'tiempo_de_entrada', 'tiempo_de_salida', 'mercado_pos',
+                                 'precio_de_entrada', 'precio_de_salida', 'ganancias') if c not in df.columns]
+        if faltantes:
+            raise ValueError(f"Columnas requeridas faltantes para repetir sobre barras: {', '.join(faltantes)}")
+        almacenes = cls.almacenes(df, ruta_barras) if almacenes is None else almacenes
+        operaciones = cls._operaciones(df)
+        n = len(df)
+        excursion = {'mae_barras': np.full(n, np.nan), 'mfe_barras': np.full(n, np.nan),
+                     'barras': np.zeros(n, dtype=np.int64)}
+        # Eventos de equity: (tiempo, delta realizado, delta abierto, delta posiciones abiertas)
+        eventos = [
+            (operaciones['entrada'], np.zeros(n), np.zeros(n), np.ones(n)),
+            (operaciones['salida'], operaciones['ganancias'], np.zeros(n), -np.ones(n)),
+        ]
+        simbolos = cls.simbolos(df).to_numpy()
+        for simbolo, almacen in almacenes.items():
+            filas = np.flatnonzero(simbolos == simbolo)
+            if not len(filas):
+                continue
+            r = cls._reproducir_simbolo({k: v[filas] for k, v in operaciones.items()}, almacen)
+            excursion['mae_barras'][filas] = r['mae']
+            excursion['mfe_barras'][filas] = r['mfe']
+            excursion['barras'][filas] = r['barras']
+            ceros = np.zeros(len(r['tiempo_marcas']))
+            eventos.append((r['tiempo_marcas'], ceros, r['delta_marcas'], ceros))
+            eventos.append((operaciones['salida'][filas], np.zeros(len(filas)), r['cierre_abierto'],
+                            np.zeros(len(filas))))
+        return {
+            'excursion': pd.DataFrame(excursion, index=df.index),
+            'equity': cls.equity(*(np.concatenate(columna) for columna in zip(*eventos))),
+        }
+
+    @staticmethod
+    def equity(tiempo, realizado, abierto, abiertas) -> pd.DataFrame:
+        """
+        Equity por instante a partir de eventos (deltas): sumas por instante con `bincount` y
+        sumas acumuladas. Columnas (`COLUMNAS_EQUITY`): PnL 'realizado', PnL 'abierto' de las
+        posiciones valoradas a la última marca, 'equity' (la suma), 'drawdown' desde su
+        máximo y 'abiertas' (operaciones abiertas), indexadas por 'tiempo'.
+        """
+        instantes, codigos = np.unique(tiempo, return_inverse=True)
+        tabla = pd.DataFrame({
+            'realizado': np.cumsum(np.bincount(codigos, weights=realizado, minlength=len(instantes))),
+            'abierto': np.cumsum(np.bincount(codigos, weights=abierto, minlength=len(instantes))),
+        }, index=pd.DatetimeIndex(instantes.astype('datetime64[ns]'), name='tiempo'))
+        tabla['abiertas'] = np.rint(np.cumsum(np.bincount(codigos, weights=abiertas,
+                                                          minlength=len(instantes)))).astype(np.int64)
+        # Sin posiciones abiertas el abierto es exactamente 0 (quita el error de redondeo acumulado)
+        tabla.loc[tabla['abiertas'] == 0, 'abierto'] = 0.0
+        tabla['equity'] = tabla['realizado'] + tabla['abierto']
+        tabla['drawdown'] = np.maximum.accumulate(tabla['equity'].to_numpy()) - tabla['equity'].to_numpy()
+        return tabla[list(COLUMNAS_EQUITY)]
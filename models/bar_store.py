@@ -0,0 +1,186 @@
+# models/bar_store.py
+import os
+import re
+import json
+
+import numpy as np
+import pandas as pd
+
+_RAIZ = os.path.dirname(os.path.dirname(__file__))
+
+COLUMNAS_BARRAS = ('tiempo', 'apertura', 'maximo', 'minimo', 'cierre')
+EXTENSIONES_CSV = ('.csv', '.txt')
+EXTENSIONES_PARQUET = ('.parquet',)
+# Encabezados aceptados (en minúsculas, sin tildes) -> columna canónica
+ALIAS_BARRAS = {
+    'tiempo': 'tiempo', 'time': 'tiempo', 'timestamp': 'tiempo', 'datetime': 'tiempo',
+    'date': 'tiempo', 'fecha': 'tiempo', 'fecha_hora': 'tiempo',
+    'apertura': 'apertura', 'open': 'apertura',
+    'maximo': 'maximo', 'high': 'maximo',
+    'minimo': 'minimo', 'low': 'minimo',
+    'cierre': 'cierre', 'close': 'cierre', 'last': 'cierre', 'precio': 'cierre', 'price': 'cierre',
+}
+# Export de datos históricos del NinjaTrader (sin encabezado, ';'):
+# barras 'yyyyMMdd HHmmss;apertura;máximo;mínimo;cierre;volumen' (tiempo = cierre de la barra)
+# ticks  'yyyyMMdd HHmmss fffffff;último;bid;ask;volumen'
+_PATRON_NINJATRADER = re.compile(rb'^\d{8} \d{6}( \d{7})?;')
+
+
+class AlmacenBarras:
+    """
+    Barras OHLC (de 1 minuto, de cualquier intervalo o ticks) de un símbolo, en arrays NumPy
+    mapeados en memoria: una consulta solo lee del disco las páginas que toca, así que un
+    año de barras de 1 minuto de MES / MNQ se consulta sin cargarlo entero.
+
+    Los archivos de origen viven en `Barras/` (CSV, TXT del export histórico del NinjaTrader
+    o Parquet) y su nombre empieza por el símbolo: 'MES.csv', 'MES_2025.parquet',
+    'MES 06-25.Last.txt'. La primera vez se unen (sin el solape entre archivos), se ordenan
+    por tiempo y se guardan como un `.npy` por columna en la caché; se vuelven a importar
+    si cambia algún archivo.
+    `tiempo` es el cierre de la barra (como exporta el NinjaTrader), en la misma hora que
+    las operaciones; los ticks tienen apertura = máximo = mínimo = cierre = precio.
+    """
+
+    RUTA_BARRAS = os.path.join(_RAIZ, "Barras")
+    RUTA_CACHE = os.path.join(_RAIZ, ".cache_operaciones", "barras")
+    VERSION = 2
+
+    def __init__(self, simbolo, columnas):
+        self.simbolo = simbolo
+        self.columnas = columnas    # columna -> array (np.memmap): 'tiempo' en ns (int64), precios float64
+
+    def __len__(self):
+        return len(self.columnas['tiempo'])
+
+    @property
+    def tiempos(self) -> np.ndarray:
+        return self.columnas['tiempo']
+
+    @staticmethod
+    def simbolo_archivo(nombre) -> str:
+        """'MES_2025.parquet' -> 'MES', 'MES 06-25.Last.txt' -> 'MES'."""
+        base = os.path.splitext(os.path.basename(nombre))[0]
+        return re.split(r'[\s_.\-]', base, maxsplit=1)[0].upper()
+
+    @classmethod
+    def archivos(cls, ruta_barras=None) -> dict:
+        """Símbolo -> archivos de barras de la carpeta, ordenados por nombre."""
+        ruta_barras = ruta_barras or cls.RUTA_BARRAS
+        if not os.path.isdir(ruta_barras):
+            return {}
+        por_simbolo = {}
+        for nombre in sorted(os.listdir(ruta_barras)):
+            if nombre.lower().endswith(EXTENSIONES_CSV + EXTENSIONES_PARQUET):
+                por_simbolo.setdefault(cls.simbolo_archivo(nombre), []).append(os.path.join(ruta_barras, nombre))
+        return por_simbolo
+
+    @staticmethod
+    def _normalizar(df) -> pd.DataFrame:
+        """Columnas canónicas (`COLUMNAS_BARRAS`) de un frame leído con encabezado."""
+        df = df.rename(columns=lambda c: ALIAS_BARRAS.get(
+            str(c).strip().lower().replace('á', 'a').replace('í', 'i').replace(' ', '_'), c))
+        if 'tiempo' not in df.columns or 'cierre' not in df.columns:
+            raise ValueError("El archivo de barras necesita columnas de tiempo y de cierre (o precio).")
+        for col in ('apertura', 'maximo', 'minimo'):
+            if col not in df.columns:
+                df[col] = df['cierre']
+        df = df[list(COLUMNAS_BARRAS)].copy()
+        df['tiempo'] = pd.to_datetime(df['tiempo'], errors='coerce')
+        return df
+
+    @classmethod
+    def leer_archivo(cls, ruta) -> pd.DataFrame:
+        """Barras de un archivo con las columnas `COLUMNAS_BARRAS` (tiempo como datetime64), sin ordenar."""
+        if ruta.lower().endswith(EXTENSIONES_PARQUET):
+            try:
+                return cls._normalizar(pd.read_parquet(ruta))
+            except ImportError as e:
+                raise ValueError(f"Se necesita pyarrow para leer barras en Parquet ({os.path.basename(ruta)}).") from e
+        with open(ruta, 'rb') as f:
+            primera = f.readline().lstrip(b'\xef\xbb\xbf')
+        if _PATRON_NINJATRADER.match(primera):
+            ticks = _PATRON_NINJATRADER.match(primera).group(1) is not None
+            nombres = ['tiempo', 'cierre', 'bid', 'ask', 'volumen'] if ticks else \
+                ['tiempo', 'apertura', 'maximo', 'minimo', 'cierre', 'volumen']
+            df = pd.read_csv(ruta, sep=';', header=None, names=nombres, usecols=range(len(nombres)))
+            formato = '%Y%m%d %H%M%S %f' if ticks else '%Y%m%d %H%M%S'
+            df['tiempo'] = pd.to_datetime(df['tiempo'], format=formato, errors='coerce')
+            return cls._normalizar(df)
+        texto = primera.decode('utf-8', errors='ignore')
+        separador = max((';', ',', '\t'), key=texto.count)
+        return cls._normalizar(pd.read_csv(ruta, sep=separador))
+
+    @staticmethod
+    def _firma(archivos) -> list:
+        """(nombre, tamaño, fecha de modificación) de cada archivo de origen."""
+        return [[os.path.basename(r), os.path.getsize(r), int(os.path.getmtime(r))] for r in archivos]
+
+    @classmethod
+    def _carpeta(cls, simbolo):
+        return os.path.join(cls.RUTA_CACHE, simbolo)
+
+    @staticmethod
+    def _por_primer_tiempo(frames) -> list:
+        """Frames sin filas inválidas, ordenados (estable) por tiempo y entre sí por su primer tiempo."""
+        frames = [f.dropna(subset=['tiempo', 'cierre']).sort_values('tiempo', kind='stable') for f in frames]
+        return sorted((f for f in frames if len(f)), key=lambda f: f['tiempo'].iloc[0])
+
+    @classmethod
+    def importar(cls, simbolo, archivos) -> 'AlmacenBarras':
+        """
+        Une y ordena las barras de `archivos`, las guarda como `.npy` por columna y las abre
+        mapeadas. Los archivos se toman en orden de su primer tiempo y de cada uno solo se
+        añade lo posterior a lo ya unido (el solape entre exports); dentro de un archivo se
+        conservan en su orden las filas con el mismo tiempo (ticks distintos del mismo segundo).
+        """
+        tramos = []
+        for barras in cls._por_primer_tiempo(cls.leer_archivo(r) for r in archivos):
+            if tramos:
+                barras = barras[barras['tiempo'] > tramos[-1]['tiempo'].iloc[-1]]
+            if len(barras):
+                tramos.append(barras)
+        barras = pd.concat(tramos, ignore_index=True) if tramos else pd.DataFrame(columns=list(COLUMNAS_BARRAS))
+        carpeta = cls._carpeta(simbolo)
+        os.makedirs(carpeta, exist_ok=True)
+        for col in COLUMNAS_BARRAS:
+            tipo = 'datetime64[ns]' if col == 'tiempo' else np.float64
+            valores = barras[col].to_numpy(dtype=tipo)
+            np.save(os.path.join(carpeta, col + '.npy'), valores.astype(np.int64) if col == 'tiempo' else valores)
+        with open(os.path.join(carpeta, 'origen.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': cls.VERSION, 'archivos': cls._firma(archivos)}, f)
+        return cls._mapear(simbolo)
+
+    @classmethod
+    def _mapear(cls, simbolo) -> 'AlmacenBarras':
+        carpeta = cls._carpeta(simbolo)
+        return cls(simbolo, {col: np.load(os.path.join(carpeta, col + '.npy'), mmap_mode='r')
+                             for col in COLUMNAS_BARRAS})
+
+    @classmethod
+    def abrir(cls, simbolo, ruta_barras=None):
+        """Almacén mapeado del símbolo (importando sus archivos si cambiaron), o None si no hay barras."""
+        simbolo = simbolo.upper()
+        archivos = cls.archivos(ruta_barras).get(simbolo)
+        if not archivos:
+            return None
+        try:
+            with open(os.path.join(cls._carpeta(simbolo), 'origen.json'), encoding='utf-8') as f:
+                origen = json.load(f)
+            if origen == {'version': cls.VERSION, 'archivos': cls._firma(archivos)}:
+                return cls._mapear(simbolo)
+        except (OSError, ValueError):
+            pass
+        return cls.importar(simbolo, archivos)
+
+    def rango(self, desde=None, hasta=None) -> tuple:
+        """Barras [inicio, fin) con tiempo en [desde, hasta) (None = sin límite)."""
+        inicio = 0 if desde is None else int(np.searchsorted(self.tiempos, pd.Timestamp(desde).as_unit('ns').value))
+        fin = len(self) if hasta is None else int(np.searchsorted(self.tiempos, pd.Timestamp(hasta).as_unit('ns').value))
+        return inicio, max(inicio, fin)
+
+    def barras(self, desde=None, hasta=None) -> pd.DataFrame:
+        """Barras con tiempo en [desde, hasta) como DataFrame (solo se leen esas filas)."""
+        inicio, fin = self.rango(desde, hasta)
+        df = pd.DataFrame({col: np.array(v[inicio:fin]) for col, v in self.columnas.items()})
+        df['tiempo'] = df['tiempo'].astype('datetime64[ns]')
+        return df
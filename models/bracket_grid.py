@@ -0,0 +1,195 @@
+# models/bracket_grid.py
+import numpy as np
+import pandas as pd
+
+from models.trade_model import TradeModel
+
+# Celdas (operaciones × SL × TP) por bloque: acota la memoria del barrido
+CELDAS_POR_BLOQUE = 1_000_000
+MEDIDAS = ('expectativa', 'profit_factor', 'win_rate', 'pnl_total', 'drawdown_max', 'stops', 'targets')
+ORDENES = ('peor', 'mejor')
+# Medidas en las que el mejor par es el de menor valor (el resto, el de mayor)
+MEDIDAS_MINIMIZAR = ('drawdown_max', 'stops')
+
+
+class BarridoBrackets:
+    """
+    Vuelve a puntuar la historia de operaciones con cada par (SL, TP) de una rejilla en ticks,
+    usando el MAE / MFE de cada operación:
+    - toca el stop si MAE >= SL (resultado -SL), el objetivo si MFE >= TP (resultado +TP)
+    - si no toca ninguno conserva su salida real (`ganancias`)
+    - si toca los dos, el orden no se conoce: 'peor' supone que el stop llega antes,
+      'mejor' que llega antes el objetivo
+    Los ticks se pasan a USD con `valor_tick` × `cant`: el MAE / MFE del export es el de
+    la posición completa (`excursion_por_contrato=True` si es por contrato, como en
+    `DrawdownIntradia.recorrido`).
+
+    Sumas y conteos salen de productos de matrices entre las máscaras de stop y objetivo;
+    el drawdown genera los PnL (operaciones × SL × TP) por bloques de `CELDAS_POR_BLOQUE`
+    celdas, arrastrando saldo y máximo de un bloque al siguiente, así que la memoria no
+    crece con el número de operaciones.
+    """
+
+    @staticmethod
+    def rejilla(inicio, fin, paso) -> np.ndarray:
+        """Valores en ticks de `inicio` a `fin` (incluido) cada `paso`."""
+        return np.arange(inicio, fin + paso / 2, paso, dtype=np.float64)
+
+    @staticmethod
+    def preparar(arrays, excursion_por_contrato=False) -> dict:
+        """
+        Por operación (arrays de `TradeModel.extraer_arrays`, en orden): 'ganancias',
+        'usd_tick' (USD por tick de bracket) y 'mae' / 'mfe' en ticks de bracket.
+        """
+        if arrays['mae'] is None or arrays['mfe'] is None:
+            raise ValueError("Se necesitan las columnas 'mae' y 'mfe' para el barrido de SL/TP.")
+        g = arrays['ganancias']
+        n = len(g)
+        valor_tick = arrays['valor_tick'] if arrays['valor_tick'] is not None else np.ones(n)
+        cant = np.abs(arrays['cant']) if arrays['cant'] is not None else np.ones(n)
+        cant = np.where(cant > 0, cant, 1.0)
+        usd_tick = valor_tick * cant
+        excursion = valor_tick if excursion_por_contrato else usd_tick
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mae = np.where(excursion > 0, np.abs(arrays['mae']) / excursion, 0.0)
+            mfe = np.where(excursion > 0, np.abs(arrays['mfe']) / excursion, 0.0)
+        return {'ganancias': g, 'usd_tick': usd_tick, 'mae': mae, 'mfe': mfe}
+
+    @staticmethod
+    def _salidas(operaciones, sl, tp) -> dict:
+        """
+        Por operación: 'toca_sl' (n × SL) y 'toca_tp' (n × TP), el resultado de salir por el
+        stop 'stop' (n × SL, USD) o por el objetivo 'objetivo' (n × TP), y 'base' (n × TP):
+        el objetivo si lo toca, si no la salida real.
+        """
+        usd = operaciones['usd_tick'][:, None]
+        toca_tp = operaciones['mfe'][:, None] >= tp[None, :]
+        objetivo = tp[None, :] * usd
+        return {
+            'toca_sl': operaciones['mae'][:, None] >= sl[None, :],
+            'toca_tp': toca_tp,
+            'stop': -sl[None, :] * usd,
+            'objetivo': objetivo,
+            'base': np.where(toca_tp, objetivo, operaciones['ganancias'][:, None]),
+        }
+
+    @staticmethod
+    def resultados(salidas, orden='peor', out=None) -> np.ndarray:
+        """PnL (USD) de cada operación con cada par (salida de `_salidas`): array (operaciones × SL × TP)."""
+        forma = (len(salidas['base']), salidas['stop'].shape[1], salidas['base'].shape[1])
+        pnl = np.empty(forma) if out is None else out[:forma[0]]
+        np.copyto(pnl, salidas['base'][:, None, :])
+        sale_sl = salidas['toca_sl'][:, :, None]
+        if orden == 'mejor':
+            sale_sl = sale_sl & ~salidas['toca_tp'][:, None, :]
+        np.copyto(pnl, salidas['stop'][:, :, None], where=sale_sl)
+        return pnl
+
+    @classmethod
+    def _drawdown(cls, salidas, orden, celdas_por_bloque) -> np.ndarray:
+        """
+        Drawdown máximo de cada par (SL × TP). Los PnL se generan por bloques de operaciones
+        y se recorren fila a fila con saldo, máximo y drawdown como vectores de pares:
+        sobre filas contiguas es más rápido que `cumsum` / `maximum.accumulate` en el eje 0.
+        """
+        n, forma = len(salidas['base']), (salidas['stop'].shape[1], salidas['base'].shape[1])
+        pares = forma[0] * forma[1]
+        saldo, pico, drawdown, caida = np.zeros(pares), np.full(pares, -np.inf), np.zeros(pares), np.empty(pares)
+        por_bloque = max(1, celdas_por_bloque // max(1, pares))
+        bloque = np.empty((min(por_bloque, n), *forma))
+        for inicio in range(0, n, por_bloque):
+            tramo = {k: v[inicio:inicio + por_bloque] for k, v in salidas.items()}
+            for pnl in cls.resultados(tramo, orden, out=bloque).reshape(-1, pares):
+                saldo += pnl
+                np.maximum(pico, saldo, out=pico)
+                np.subtract(pico, saldo, out=caida)
+                np.maximum(drawdown, caida, out=drawdown)
+        return drawdown.reshape(forma)
+
+    @classmethod
+    def superficie(cls, operaciones, sl, tp, orden='peor', celdas_por_bloque=CELDAS_POR_BLOQUE) -> dict:
+        """
+        Medidas de cada par (arrays SL × TP): 'expectativa' (USD por operación),
+        'profit_factor' (0 sin pérdidas, como `componer_metricas`), 'win_rate' (%),
+        'pnl_total', 'drawdown_max' (desde el máximo del PnL acumulado), 'stops' y 'targets'
+        (operaciones que salen por el stop / el objetivo).
+
+        Cada operación sale por el stop, por el objetivo o con su resultado real, así que
+        sumas y conteos son productos de matrices (SL × n) @ (n × TP) entre las máscaras;
+        solo el drawdown recorre el array (operaciones × SL × TP).
+        """
+        if orden not in ORDENES:
+            raise ValueError(f"Orden desconocido: {orden} (use {' o '.join(ORDENES)}).")
+        sl, tp = np.asarray(sl, dtype=np.float64), np.asarray(tp, dtype=np.float64)
+        n = len(operaciones['ganancias'])
+        forma = (len(sl), len(tp))
+        salidas = cls._salidas(operaciones, sl, tp)
+        S = salidas['toca_sl'].astype(np.float64)
+        T = salidas['toca_tp'].astype(np.float64)
+        g = operaciones['ganancias']
+
+        def por_sl(x):
+            return np.repeat(x.sum(axis=0)[:, None], forma[1], axis=1)
+
+        def por_tp(x):
+            return np.repeat(x.sum(axis=0)[None, :], forma[0], axis=0)
+
+        def con_sl(x):
+            """Σ_i S[i, sl] · x[i, tp]."""
+            return S.T @ x
+
+        # Operaciones que conservan su salida real: ni stop ni objetivo, (1 - S)·(1 - T)
+        real = 1.0 - T
+
+        def sin_salida(valor):
+            v = real * valor[:, None]
+            return por_tp(v) - con_sl(v)
+
+        objetivo, stop = T * salidas['objetivo'], S * salidas['stop']
+        if orden == 'peor':
+            # stop: S; objetivo: (1 - S)·T
+            n_stops, pnl_stop = por_sl(S), por_sl(stop)
+            n_targets, pnl_objetivo = por_tp(T) - con_sl(T), por_tp(objetivo) - con_sl(objetivo)
+        else:
+            # objetivo: T; stop: S·(1 - T)
+            n_targets, pnl_objetivo = por_tp(T), por_tp(objetivo)
+            n_stops, pnl_stop = con_sl(real), stop.T @ real
+
+        ganado = pnl_objetivo + sin_salida(np.maximum(g, 0.0))
+        perdido = -(pnl_stop + sin_salida(np.minimum(g, 0.0)))
+        wins = n_targets + sin_salida((g > 0).astype(np.float64))
+        pnl_total = ganado - perdido
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'expectativa': pnl_total / n if n else np.full(forma, np.nan),
+                'profit_factor': np.where(perdido != 0, ganado / perdido, 0.0),
+                'win_rate': wins / n * 100 if n else np.full(forma, np.nan),
+                'pnl_total': pnl_total,
+                'drawdown_max': cls._drawdown(salidas, orden, celdas_por_bloque),
+                'stops': np.rint(n_stops).astype(np.int64),
+                'targets': np.rint(n_targets).astype(np.int64),
+            }
+
+    @classmethod
+    def barrer(cls, df, sl, tp, orden='peor', excursion_por_contrato=False) -> dict:
+        """
+        Superficie de `df` (en orden de entrada) sobre la rejilla `sl` × `tp` en ticks.
+        Devuelve un DataFrame por medida, con SL como índice y TP como columnas.
+        """
+        operaciones = cls.preparar(TradeModel.extraer_arrays(df), excursion_por_contrato)
+        sl, tp = np.asarray(sl, dtype=np.float64), np.asarray(tp, dtype=np.float64)
+        r = cls.superficie(operaciones, sl, tp, orden)
+        indice, columnas = pd.Index(sl, name='sl_ticks'), pd.Index(tp, name='tp_ticks')
+        return {medida: pd.DataFrame(r[medida], index=indice, columns=columnas) for medida in MEDIDAS}
+
+    @staticmethod
+    def mejor_par(superficie, medida='expectativa') -> tuple:
+        """
+        (SL, TP) con el mejor valor de `medida` en la salida de `barrer`: el menor para las
+        `MEDIDAS_MINIMIZAR` y el mayor para el resto.
+        """
+        tabla = superficie[medida]
+        elegir = np.nanargmin if medida in MEDIDAS_MINIMIZAR else np.nanargmax
+        fila, columna = np.unravel_index(elegir(tabla.to_numpy()), tabla.shape)
+        return tabla.index[fila], tabla.columns[columna]
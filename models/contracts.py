@@ -1,4 +1,7 @@
 # models/contracts.py
+import numpy as np
+import pandas as pd
+
 class ContratosManager:
     """
     Administra la lista de contratos y sus parámetros (valor por punto, tamaño del tick, valor del tick).
@@ -20,18 +23,68 @@ class ContratosManager:
         {"Símbolo": "RTY",  "Valor por Punto": 50, "Tamaño del Tick": 0.1,  "Valor del Tick": 5.00}
     ]
 
+    PARAMETROS_DEFECTO = {
+        'VALOR_PUNTO': 5.0,
+        'TAMAÑO_TICK': 0.25,
+        'VALOR_TICK': 1.25
+    }
+
+    # Micro -> mini de la misma familia (10 micros equivalen a 1 mini)
+    MICRO_A_MINI = {"MES": "ES", "MNQ": "NQ", "MYM": "YM", "M2K": "RTY"}
+    MICROS_POR_MINI = 10
+
+    # Índice por símbolo para no recorrer CONTRATOS en cada consulta
+    _POR_SIMBOLO = {contrato["Símbolo"]: contrato for contrato in CONTRATOS}
+
+    # Columnas float que `parametros_por_instrumento` une al DataFrame de operaciones
+    COLUMNAS_PARAMETROS = {
+        'valor_punto': 'VALOR_PUNTO',
+        'tamano_tick': 'TAMAÑO_TICK',
+        'valor_tick': 'VALOR_TICK'
+    }
+
     @classmethod
     def obtener_parametros_contrato(cls, instrumento):
         simbolo = instrumento.split()[0]
-        for contrato in cls.CONTRATOS:
-            if contrato["Símbolo"] == simbolo:
-                return {
-                    'VALOR_PUNTO': contrato["Valor por Punto"],
-                    'TAMAÑO_TICK': contrato["Tamaño del Tick"],
-                    'VALOR_TICK': contrato["Valor del Tick"]
-                }
-        return {
-            'VALOR_PUNTO': 5.0,
-            'TAMAÑO_TICK': 0.25,
-            'VALOR_TICK': 1.25
-        }
+        contrato = cls._POR_SIMBOLO.get(simbolo)
+        if contrato is not None:
+            return {
+                'VALOR_PUNTO': contrato["Valor por Punto"],
+                'TAMAÑO_TICK': contrato["Tamaño del Tick"],
+                'VALOR_TICK': contrato["Valor del Tick"]
+            }
+        return dict(cls.PARAMETROS_DEFECTO)
+
+    @classmethod
+    def parametros_por_instrumento(cls, instrumentos: pd.Series) -> pd.DataFrame:
+        """
+        Parámetros de contrato como columnas float (valor_punto, tamano_tick, valor_tick)
+        alineadas con `instrumentos`. Cada instrumento distinto se consulta una sola vez
+        y el resultado se expande por código (factorize), sin bucles por fila.
+        """
+        codigos, unicos = pd.factorize(instrumentos)
+        tabla = np.array(
+            [
+                [cls.obtener_parametros_contrato(inst)[clave] for clave in cls.COLUMNAS_PARAMETROS.values()]
+                for inst in unicos
+            ] + [[cls.PARAMETROS_DEFECTO[clave] for clave in cls.COLUMNAS_PARAMETROS.values()]],  # fila -1: vacío
+            dtype=float
+        )
+        return pd.DataFrame(tabla[codigos], index=instrumentos.index, columns=list(cls.COLUMNAS_PARAMETROS))
+
+    @classmethod
+    def equivalencia_mini(cls, instrumentos: pd.Series) -> pd.DataFrame:
+        """
+        Familia (símbolo del mini) y contratos mini por contrato de cada instrumento,
+        alineados con `instrumentos`: 'MES JUN25' -> ('ES', 0.1), 'NQ JUN25' -> ('NQ', 1.0).
+        Los símbolos desconocidos cuentan como contrato completo de su propia familia.
+        """
+        codigos, unicos = pd.factorize(instrumentos)
+        raices, factores = [], []
+        for inst in unicos:
+            simbolo = str(inst).split()[0] if str(inst).split() else ''
+            raices.append(cls.MICRO_A_MINI.get(simbolo, simbolo))
+            factores.append(1 / cls.MICROS_POR_MINI if simbolo in cls.MICRO_A_MINI else 1.0)
+        raices = np.array(raices + [''], dtype=object)  # fila -1: vacío
+        factores = np.array(factores + [1.0])
+        return pd.DataFrame({'raiz': raices[codigos], 'factor_mini': factores[codigos]}, index=instrumentos.index)
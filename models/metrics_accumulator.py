@@ -0,0 +1,253 @@
+# models/metrics_accumulator.py
+import copy
+
+import numpy as np
+import pandas as pd
+
+from models.trade_model import TradeModel
+from models.session_calendar import CalendarioSesiones
+
+
+class AcumuladorMetricas:
+    """
+    Métricas de `TradeModel.calcular_metricas` mantenidas de forma incremental: cada
+    operación nueva actualiza sumas, conteos, pico/valle del PnL acumulado, rachas y
+    buckets diarios en O(1), sin recorrer la historia.
+
+    Dos acumuladores de tramos consecutivos (p.ej. dos archivos o dos workers) se combinan
+    con `fusionar`, que da lo mismo que haber acumulado todas las operaciones en orden
+    (salvo el redondeo de sumar en otro orden).
+    Las reglas de horario y stop loss se aplican al agregar, así que el acumulador queda
+    ligado a la configuración de cuenta con la que se creó.
+    """
+
+    def __init__(self, config_cuenta):
+        self.config_cuenta = config_cuenta
+        self.operaciones = 0
+        self.wins = 0
+        self.negativas = 0
+        self.pnl = 0.0
+        self.suma_ganadoras = 0.0
+        self.suma_perdedoras = 0.0
+        # Máximo y mínimo del PnL acumulado dentro del tramo, y drawdown máximo
+        self.pico = -np.inf
+        self.valle = np.inf
+        self.max_drawdown = np.nan
+        self.valor_tick = None
+        # día de sesión (entero datetime64[D]) -> [operaciones, wins, pnl], en orden de aparición
+        self.dias = None
+        self.sumas = {'mae': None, 'mfe': None, 'etd': None}
+        self.conteos = {'mae': 0, 'mfe': 0, 'etd': 0}
+        # Rachas de operaciones no ganadoras: al inicio del tramo, la actual (al final) y la máxima
+        self.racha_inicial = 0
+        self.racha_actual = 0
+        self.max_loss_streak = 0
+        self.fuera_horario = 0
+        self.sl_violations = 0
+
+    # --- Actualización ---
+
+    def _clave_reglas(self):
+        reglas = self.config_cuenta['REGLAS']
+        return tuple(
+            reglas[clave]['valor']
+            for clave in ('HORARIO_INICIO', 'HORARIO_FIN', 'STOP_LOSS_OBLIGATORIO', 'RATIO_SL_PIPS')
+        )
+
+    def agregar(self, ganancia, tiempo_de_entrada=None, mae=None, mfe=None, etd=None,
+                valor_tick=None, hora_operacion=None, sesion=None):
+        """
+        Suma una operación cerrada en O(1). Los argumentos son los valores de la fila
+        procesada (ver `procesar_datos`); `hora_operacion` y `sesion` (el día de sesión CME,
+        la clave de los buckets diarios como en `extraer_arrays`) se deducen de
+        `tiempo_de_entrada` si no se indican.
+        """
+        reglas = self.config_cuenta['REGLAS']
+        ganancia = float(ganancia)
+
+        self.operaciones += 1
+        gana = ganancia > 0
+        if gana:
+            self.wins += 1
+            self.suma_ganadoras += ganancia
+        elif ganancia < 0:
+            self.negativas += 1
+            self.suma_perdedoras += ganancia
+
+        self.pnl += ganancia
+        self.pico = max(self.pico, self.pnl)
+        self.valle = min(self.valle, self.pnl)
+        caida = self.pico - self.pnl
+        if not caida <= self.max_drawdown:  # también cuando aún es NaN
+            self.max_drawdown = caida
+
+        if self.valor_tick is None:
+            self.valor_tick = 1 if valor_tick is None else valor_tick
+
+        if tiempo_de_entrada is not None:
+            tiempo_de_entrada = pd.Timestamp(tiempo_de_entrada)
+            if self.dias is None:
+                self.dias = {}
+            if sesion is None or pd.isna(sesion):
+                sesion = CalendarioSesiones.sesiones([tiempo_de_entrada])[0]
+            dia = int(np.datetime64(pd.Timestamp(sesion), 'D').astype(np.int64))
+            bucket = self.dias.setdefault(dia, [0, 0, 0.0])
+            bucket[0] += 1
+            bucket[1] += int(gana)
+            bucket[2] += ganancia
+            if hora_operacion is None:
+                hora_operacion = tiempo_de_entrada.strftime('%H:%M')
+
+        for col, valor in (('mae', mae), ('mfe', mfe), ('etd', etd)):
+            if valor is None:
+                continue
+            if self.sumas[col] is None:
+                self.sumas[col] = 0.0
+            if not pd.isna(valor):
+                self.sumas[col] += float(valor)
+                self.conteos[col] += 1
+
+        if gana:
+            self.racha_actual = 0
+        else:
+            self.racha_actual += 1
+            if self.racha_inicial == self.operaciones - 1:
+                self.racha_inicial += 1
+            self.max_loss_streak = max(self.max_loss_streak, self.racha_actual)
+
+        if hora_operacion is not None:
+            if not reglas['HORARIO_INICIO']['valor'] <= str(hora_operacion) <= reglas['HORARIO_FIN']['valor']:
+                self.fuera_horario += 1
+
+        if reglas['STOP_LOSS_OBLIGATORIO']['valor'] and mae is not None:
+            sl_usd = reglas['RATIO_SL_PIPS']['valor'] * (1 if valor_tick is None else valor_tick)
+            if abs(mae) > sl_usd:
+                self.sl_violations += 1
+        return self
+
+    def agregar_fila(self, fila):
+        """`agregar` con una fila del frame procesado (Series o dict)."""
+        return self.agregar(
+            fila['ganancias'],
+            tiempo_de_entrada=fila.get('tiempo_de_entrada'),
+            mae=fila.get('mae'), mfe=fila.get('mfe'), etd=fila.get('etd'),
+            valor_tick=fila.get('valor_tick'),
+            hora_operacion=fila.get('hora_operacion'),
+            sesion=fila.get('sesion')
+        )
+
+    @classmethod
+    def desde_frame(cls, df, config_cuenta):
+        """Acumulador de todas las operaciones de `df` (en su orden), calculado vectorizado."""
+        arrays = TradeModel.extraer_arrays(df)
+        agregados = TradeModel.agregados_desde_arrays(arrays, config_cuenta)
+        acumulador = cls(config_cuenta)
+        n = agregados['operaciones']
+        if not n:
+            return acumulador
+
+        for clave in ('operaciones', 'wins', 'negativas', 'pnl', 'suma_ganadoras', 'suma_perdedoras',
+                      'max_drawdown', 'valor_tick', 'max_loss_streak', 'fuera_horario', 'sl_violations'):
+            setattr(acumulador, clave, agregados[clave])
+        pnl_acumulado = np.cumsum(arrays['ganancias'])
+        acumulador.pico = pnl_acumulado.max()
+        acumulador.valle = pnl_acumulado.min()
+
+        if agregados['dias'] is not None:
+            acumulador.dias = {
+                int(dia): [int(ops), int(wins), float(pnl)]
+                for dia, ops, wins, pnl in zip(
+                    agregados['dias'], agregados['operaciones_dia'], agregados['wins_dia'], agregados['pnl_dia']
+                )
+            }
+        for col in ('mae', 'mfe', 'etd'):
+            acumulador.sumas[col] = agregados[f'suma_{col}']
+            acumulador.conteos[col] = agregados[f'n_{col}']
+
+        posiciones_win = np.flatnonzero(arrays['ganancias'] > 0)
+        acumulador.racha_inicial = int(posiciones_win[0]) if len(posiciones_win) else n
+        acumulador.racha_actual = int(n - 1 - posiciones_win[-1]) if len(posiciones_win) else n
+        return acumulador
+
+    # --- Combinación ---
+
+    def fusionar(self, otro):
+        """
+        Acumulador de las operaciones de `self` seguidas de las de `otro` (el tramo posterior).
+        No modifica ninguno de los dos.
+        """
+        if self._clave_reglas() != otro._clave_reglas():
+            raise ValueError("Solo se pueden fusionar acumuladores con las mismas reglas de horario y stop loss.")
+        if not otro.operaciones:
+            return copy.deepcopy(self)
+        if not self.operaciones:
+            return copy.deepcopy(otro)
+
+        r = AcumuladorMetricas(self.config_cuenta)
+        r.operaciones = self.operaciones + otro.operaciones
+        r.wins = self.wins + otro.wins
+        r.negativas = self.negativas + otro.negativas
+        r.pnl = self.pnl + otro.pnl
+        r.suma_ganadoras = self.suma_ganadoras + otro.suma_ganadoras
+        r.suma_perdedoras = self.suma_perdedoras + otro.suma_perdedoras
+
+        # El tramo posterior arranca desde el PnL final del anterior
+        r.pico = max(self.pico, self.pnl + otro.pico)
+        r.valle = min(self.valle, self.pnl + otro.valle)
+        r.max_drawdown = max(self.max_drawdown, otro.max_drawdown, self.pico - (self.pnl + otro.valle))
+        r.valor_tick = self.valor_tick
+
+        if self.dias is not None or otro.dias is not None:
+            r.dias = {dia: list(bucket) for dia, bucket in (self.dias or {}).items()}
+            for dia, (ops, wins, pnl) in (otro.dias or {}).items():
+                bucket = r.dias.setdefault(dia, [0, 0, 0.0])
+                bucket[0] += ops
+                bucket[1] += wins
+                bucket[2] += pnl
+
+        for col in ('mae', 'mfe', 'etd'):
+            if self.sumas[col] is not None or otro.sumas[col] is not None:
+                r.sumas[col] = (self.sumas[col] or 0.0) + (otro.sumas[col] or 0.0)
+            r.conteos[col] = self.conteos[col] + otro.conteos[col]
+
+        # Una racha puede cruzar la frontera entre tramos
+        r.max_loss_streak = max(self.max_loss_streak, otro.max_loss_streak, self.racha_actual + otro.racha_inicial)
+        r.racha_inicial = self.racha_inicial + (otro.racha_inicial if self.racha_inicial == self.operaciones else 0)
+        r.racha_actual = otro.racha_actual + (self.racha_actual if otro.racha_actual == otro.operaciones else 0)
+
+        r.fuera_horario = self.fuera_horario + otro.fuera_horario
+        r.sl_violations = self.sl_violations + otro.sl_violations
+        return r
+
+    # --- Resultado ---
+
+    def agregados(self) -> dict:
+        """Agregados en el formato de `TradeModel.agregados_desde_arrays`."""
+        agregados = {
+            'operaciones': self.operaciones,
+            'wins': self.wins,
+            'negativas': self.negativas,
+            'pnl': self.pnl,
+            'suma_ganadoras': self.suma_ganadoras,
+            'suma_perdedoras': self.suma_perdedoras,
+            'max_drawdown': self.max_drawdown,
+            'valor_tick': 1 if self.valor_tick is None else self.valor_tick,
+            'max_loss_streak': self.max_loss_streak,
+            'fuera_horario': self.fuera_horario,
+            'sl_violations': self.sl_violations,
+            'dias': None, 'operaciones_dia': None, 'wins_dia': None, 'pnl_dia': None,
+        }
+        if self.dias is not None:
+            buckets = np.array(list(self.dias.values()), dtype=np.float64).reshape(-1, 3)
+            agregados['dias'] = np.fromiter(self.dias.keys(), dtype=np.int64, count=len(self.dias))
+            agregados['operaciones_dia'] = buckets[:, 0]
+            agregados['wins_dia'] = buckets[:, 1]
+            agregados['pnl_dia'] = buckets[:, 2]
+        for col in ('mae', 'mfe', 'etd'):
+            agregados[f'suma_{col}'] = self.sumas[col]
+            agregados[f'n_{col}'] = self.conteos[col]
+        return agregados
+
+    def metricas(self, fecha_inicio) -> dict:
+        """Mismo dict que `TradeModel.calcular_metricas` sobre las operaciones acumuladas."""
+        return TradeModel.componer_metricas(self.agregados(), fecha_inicio, self.config_cuenta)
@@ -0,0 +1,221 @@
+# models/monte_carlo.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from models.trade_model import TradeModel
+from models.session_calendar import CalendarioSesiones
+
+# Celdas (caminos × días × operaciones) por bloque: acota la memoria de cada proceso
+CELDAS_POR_BLOQUE = 4_000_000
+MODOS = ('dias', 'operaciones')
+
+
+def _estados_dia(ganancias):
+    """
+    Resumen de cada día a lo largo del último eje (operaciones en orden):
+    (PnL del día, máximo y mínimo del PnL intradía, drawdown máximo dentro del día).
+    Los ceros de relleno al final no cambian ninguno de los cuatro.
+    """
+    acumulado = np.cumsum(ganancias, axis=-1)
+    pico = np.maximum.accumulate(acumulado, axis=-1)
+    return acumulado[..., -1], pico[..., -1], acumulado.min(axis=-1), (pico - acumulado).max(axis=-1)
+
+
+def _simular_bloque(muestras, parametros, caminos, semilla):
+    """Simula `caminos` caminos en un proceso del pool (ver `SimuladorMonteCarlo.simular`)."""
+    rng = np.random.default_rng(semilla)
+    dias = parametros['dias']
+    if parametros['modo'] == 'dias':
+        # Días completos de la historia, con su secuencia intradía
+        elegidos = rng.integers(0, len(muestras['pnl_dia']), size=(caminos, dias))
+        estados = tuple(muestras[k][elegidos] for k in ('pnl_dia', 'max_dia', 'min_dia', 'drawdown_dia'))
+    else:
+        # Operaciones sueltas, con un número de operaciones por día tomado de la historia
+        conteos = muestras['operaciones_dia']
+        ganancias = muestras['ganancias'][rng.integers(0, len(muestras['ganancias']),
+                                                       size=(caminos, dias, conteos.max()))]
+        por_dia = conteos[rng.integers(0, len(conteos), size=(caminos, dias))]
+        ganancias[np.arange(conteos.max()) >= por_dia[..., None]] = 0.0
+        estados = _estados_dia(ganancias)
+    return SimuladorMonteCarlo.evaluar_caminos(*estados, parametros)
+
+
+class SimuladorMonteCarlo:
+    """
+    Probabilidad de superar una cuenta de evaluación remuestreando (bootstrap) la historia
+    de operaciones de `procesar_datos`: días completos (`modo='dias'`, conserva la
+    secuencia intradía y la correlación entre operaciones de un mismo día) u operaciones
+    sueltas (`modo='operaciones'`).
+
+    Cada bloque de caminos se simula como matrices NumPy (caminos × días [× operaciones]),
+    sin bucles por camino, y los bloques se reparten en un pool de procesos. Cada bloque
+    recibe su propia semilla derivada de `semilla`, así que el resultado no depende del
+    número de procesos.
+
+    Por camino y día se evalúa:
+    - ruptura: drawdown desde el máximo del saldo (intradía) mayor que `DRAWDOWN_MAX`,
+      o pérdida intradía del día mayor que `PERDIDA_DIARIA_MAX` (% de `TAMAÑO_CUENTA`)
+    - objetivo / umbral de pago: saldo al cierre del día >= `OBJETIVO_GANANCIA` / `UMBRAL_PAGO`
+    Un nivel alcanzado el mismo día de una ruptura no cuenta: la ruptura puede ser anterior.
+    """
+
+    @staticmethod
+    def parametros_cuenta(config_cuenta) -> dict:
+        """Límites de la plantilla en USD (0 = sin límite / sin objetivo)."""
+        return {
+            'objetivo': config_cuenta.get('OBJETIVO_GANANCIA', 0) or 0,
+            'umbral_pago': config_cuenta.get('UMBRAL_PAGO', 0) or 0,
+            'drawdown_max': config_cuenta.get('DRAWDOWN_MAX', 0) or 0,
+            'perdida_diaria_max': TradeModel.limite_perdida_diaria(config_cuenta),
+        }
+
+    @staticmethod
+    def preparar_muestras(df) -> dict:
+        """
+        Arrays de los que se remuestrea: las ganancias por operación, el número de
+        operaciones de cada día y el resumen intradía de cada día (ver `_estados_dia`).
+        """
+        if df.empty:
+            raise ValueError("No hay operaciones para simular.")
+        if 'tiempo_de_entrada' not in df.columns:
+            raise ValueError("Se necesita la columna 'tiempo_de_entrada' para agrupar por día.")
+        orden = np.argsort(df['tiempo_de_entrada'].to_numpy(), kind='stable')
+        arrays = TradeModel.extraer_arrays(df.iloc[orden])
+        ganancias = arrays['ganancias']
+
+        _, codigos, conteos = np.unique(arrays['dia'], return_inverse=True, return_counts=True)
+        inicio_dia = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+        # Una fila por día, rellena con ceros hasta el día con más operaciones
+        por_dia = np.zeros((len(conteos), conteos.max()))
+        por_dia[codigos, np.arange(len(ganancias)) - inicio_dia[codigos]] = ganancias
+        pnl_dia, max_dia, min_dia, drawdown_dia = _estados_dia(por_dia)
+        return {
+            'ganancias': ganancias,
+            'operaciones_dia': conteos,
+            'pnl_dia': pnl_dia,
+            'max_dia': max_dia,
+            'min_dia': min_dia,
+            'drawdown_dia': drawdown_dia,
+        }
+
+    @staticmethod
+    def evaluar_caminos(pnl_dia, max_dia, min_dia, drawdown_dia, parametros) -> dict:
+        """
+        Evalúa caminos dados por matrices (caminos × días) de estados diarios.
+        Devuelve conteos de caminos que alcanzan el objetivo / el umbral de pago antes de
+        una ruptura, que rompen antes de alcanzar el objetivo, y el saldo final de cada camino.
+        """
+        caminos, dias = pnl_dia.shape
+        inicial, pico_inicial = parametros['pnl_inicial'], parametros['pico_inicial']
+        saldo = inicial + np.cumsum(pnl_dia, axis=1)
+        previo = np.hstack([np.full((caminos, 1), inicial), saldo[:, :-1]])
+        pico = np.maximum.accumulate(np.maximum(previo + max_dia, pico_inicial), axis=1)
+        pico_previo = np.hstack([np.full((caminos, 1), pico_inicial), pico[:, :-1]])
+        caida = np.maximum(drawdown_dia, pico_previo - (previo + min_dia))
+
+        ruptura = np.zeros((caminos, dias), dtype=bool)
+        if parametros['drawdown_max']:
+            ruptura |= caida > parametros['drawdown_max']
+        if parametros['perdida_diaria_max']:
+            ruptura |= -min_dia > parametros['perdida_diaria_max']
+
+        def primer_dia(marcas):
+            """Índice del primer día marcado de cada camino (`dias` si ninguno)."""
+            return np.where(marcas.any(axis=1), marcas.argmax(axis=1), dias)
+
+        dia_ruptura = primer_dia(ruptura)
+        resultado = {'caminos': caminos, 'objetivo': None, 'umbral_pago': None, 'pnl_final': saldo[:, -1]}
+        dia_objetivo = np.full(caminos, dias)
+        if parametros['objetivo'] > 0:
+            dia_objetivo = primer_dia(saldo >= parametros['objetivo'])
+            resultado['objetivo'] = int((dia_objetivo < dia_ruptura).sum())
+        if parametros['umbral_pago'] > 0:
+            resultado['umbral_pago'] = int((primer_dia(saldo >= parametros['umbral_pago']) < dia_ruptura).sum())
+        resultado['ruptura'] = int(((dia_ruptura < dias) & (dia_ruptura <= dia_objetivo)).sum())
+        return resultado
+
+    @classmethod
+    def simular(cls, df, config_cuenta, dias=None, caminos=100_000, modo='dias', semilla=None,
+                procesos=None, pnl_inicial=0.0, pico_inicial=None) -> dict:
+        """
+        Simula `caminos` caminos de `dias` días (por defecto `DIAS_PRUEBA`) a partir del
+        saldo `pnl_inicial` y del máximo previo `pico_inicial` (por defecto el propio saldo).
+        `semilla` fija el generador (int o `np.random.SeedSequence`); `procesos=1` no usa pool.
+
+        Devuelve un dict con:
+        - 'prob_objetivo': alcanza `OBJETIVO_GANANCIA` antes de romper (None sin objetivo)
+        - 'prob_umbral_pago': alcanza `UMBRAL_PAGO` antes de romper (None sin umbral)
+        - 'prob_ruptura': rompe dentro del horizonte sin haber alcanzado antes el objetivo
+        - 'pnl_final_p5', 'pnl_final_p50', 'pnl_final_p95': percentiles del saldo final
+        - 'caminos', 'dias', 'modo'
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo de simulación desconocido: {modo} (use {' o '.join(MODOS)}).")
+        dias = config_cuenta.get('DIAS_PRUEBA', 0) if dias is None else dias
+        if dias < 1:
+            raise ValueError("No quedan días por simular.")
+        if caminos < 1:
+            raise ValueError("Se necesita al menos un camino.")
+
+        muestras = cls.preparar_muestras(df)
+        parametros = cls.parametros_cuenta(config_cuenta)
+        parametros.update(
+            dias=int(dias), modo=modo, pnl_inicial=float(pnl_inicial),
+            pico_inicial=float(max(pnl_inicial, pnl_inicial if pico_inicial is None else pico_inicial))
+        )
+
+        celdas = dias * (muestras['operaciones_dia'].max() if modo == 'operaciones' else 1)
+        por_bloque = max(1, CELDAS_POR_BLOQUE // celdas)
+        tamaños = [min(por_bloque, caminos - i) for i in range(0, caminos, por_bloque)]
+        semillas = (semilla if isinstance(semilla, np.random.SeedSequence)
+                    else np.random.SeedSequence(semilla)).spawn(len(tamaños))
+
+        procesos = min(procesos or os.cpu_count() or 1, len(tamaños))
+        argumentos = (repeat(muestras), repeat(parametros), tamaños, semillas)
+        if procesos == 1:
+            bloques = list(map(_simular_bloque, *argumentos))
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                bloques = list(pool.map(_simular_bloque, *argumentos))
+
+        def probabilidad(clave):
+            if bloques[0][clave] is None:
+                return None
+            return sum(b[clave] for b in bloques) / caminos
+
+        pnl_final = np.concatenate([b['pnl_final'] for b in bloques])
+        p5, p50, p95 = np.percentile(pnl_final, [5, 50, 95])
+        return {
+            'prob_objetivo': probabilidad('objetivo'),
+            'prob_umbral_pago': probabilidad('umbral_pago'),
+            'prob_ruptura': probabilidad('ruptura'),
+            'pnl_final_p5': p5,
+            'pnl_final_p50': p50,
+            'pnl_final_p95': p95,
+            'caminos': caminos,
+            'dias': int(dias),
+            'modo': modo,
+        }
+
+    @classmethod
+    def simular_cuenta(cls, df, config_cuenta, fecha_inicio, **opciones) -> dict:
+        """
+        `simular` desde el estado actual de la cuenta: saldo y máximo del PnL acumulado
+        de `df` y, como horizonte, las sesiones que quedan en la ventana de prueba.
+        `days_remaining` de `calcular_metricas` son días naturales (de mañana al último día
+        de `DIAS_PRUEBA`) y cada día simulado es una sesión, así que se cuentan las sesiones
+        de esa ventana con `CalendarioSesiones`.
+        """
+        metricas = TradeModel.calcular_metricas(df, fecha_inicio, config_cuenta)
+        manana = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+        sesiones = CalendarioSesiones.contar(manana, manana + pd.Timedelta(days=metricas['days_remaining']))
+        if not sesiones:
+            raise ValueError("La cuenta no tiene sesiones restantes de prueba.")
+        pnl = np.cumsum(df['ganancias'].to_numpy(dtype=np.float64))
+        opciones.setdefault('dias', sesiones)
+        return cls.simular(df, config_cuenta, pnl_inicial=metricas['current_pnl'],
+                           pico_inicial=max(0.0, pnl.max()), **opciones)
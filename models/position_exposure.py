@@ -0,0 +1,157 @@
+# models/position_exposure.py
+import numpy as np
+import pandas as pd
+
+from models.contracts import ContratosManager
+from models.trade_model import TradeModel
+
+_NS_POR_SEGUNDO = 10**9
+
+
+class ExposicionContratos:
+    """
+    Contratos abiertos a lo largo del tiempo, con un barrido (sweep line) sobre los eventos
+    de entrada (+cant) y salida (-cant) de cada operación: se ordenan una vez por
+    (grupo, tiempo) en O(n log n) y el nivel abierto es su suma acumulada.
+
+    Las cantidades se normalizan a contratos mini (`ContratosManager.equivalencia_mini`:
+    10 MES = 1 ES) y se cuentan en micros enteros, así que la suma es exacta y vuelve a 0
+    al final de cada grupo: una sola suma acumulada sirve para todos los grupos.
+    Con marcas de tiempo iguales las salidas van antes que las entradas (cerrar y volver a
+    entrar en el mismo segundo no duplica la posición); una operación que entra y sale en
+    el mismo instante cuenta durante 1 ns.
+    """
+
+    @staticmethod
+    def limite(config_cuenta):
+        """Límite de contratos (mini) de la plantilla: LIMITE_CONTRATOS o, si no, MULTIPLICADOR_CONTRATOS_MAX."""
+        reglas = config_cuenta.get('REGLAS', {})
+        return (reglas.get('LIMITE_CONTRATOS', {}).get('valor', 0)
+                or reglas.get('MULTIPLICADOR_CONTRATOS_MAX', {}).get('valor', 0) or 0)
+
+    @staticmethod
+    def _micros(arrays):
+        """Tamaño de cada operación en micros enteros y familia (raíz) de su instrumento."""
+        n = len(arrays['ganancias'])
+        cant = np.abs(arrays['cant']) if arrays['cant'] is not None else np.ones(n)
+        if arrays['instrumentos'] is None:
+            return np.rint(cant * ContratosManager.MICROS_POR_MINI).astype(np.int64), np.full(n, '', dtype=object)
+        equivalencia = ContratosManager.equivalencia_mini(arrays['instrumentos'])
+        factor = np.append(equivalencia['factor_mini'].to_numpy(), 1.0)[arrays['instrumento_codigos']]
+        raiz = np.append(equivalencia['raiz'].to_numpy(), '')[arrays['instrumento_codigos']]
+        return np.rint(cant * factor * ContratosManager.MICROS_POR_MINI).astype(np.int64), raiz
+
+    @staticmethod
+    def barrido(grupos, entradas, salidas, micros) -> dict:
+        """
+        Eventos ordenados por (grupo, tiempo, salida antes que entrada) con:
+        'grupo', 'tiempo' (ns), 'nivel' (micros abiertos tras el evento) y 'duracion'
+        (ns hasta el siguiente evento del grupo; 0 en el último).
+        Las operaciones sin grupo (código -1) o sin entrada o salida válida no participan.
+        """
+        nat = np.iinfo(np.int64).min
+        validas = (grupos >= 0) & (entradas != nat) & (salidas != nat)
+        grupos, entradas, salidas, micros = grupos[validas], entradas[validas], salidas[validas], micros[validas]
+        salidas = np.maximum(salidas, entradas + 1)
+
+        tiempo = np.concatenate((entradas, salidas))
+        delta = np.concatenate((micros, -micros))
+        grupo = np.concatenate((grupos, grupos))
+        es_entrada = np.concatenate((np.ones(len(entradas), dtype=np.int8), np.zeros(len(salidas), dtype=np.int8)))
+        orden = np.lexsort((es_entrada, tiempo, grupo))
+
+        tiempo, grupo = tiempo[orden], grupo[orden]
+        duracion = np.zeros(len(tiempo), dtype=np.int64)
+        mismo_grupo = grupo[1:] == grupo[:-1]
+        duracion[:-1] = np.where(mismo_grupo, tiempo[1:] - tiempo[:-1], 0)
+        return {'grupo': grupo, 'tiempo': tiempo, 'nivel': np.cumsum(delta[orden]), 'duracion': duracion}
+
+    @staticmethod
+    def resumen(eventos, n_grupos, limite) -> dict:
+        """
+        Por grupo: 'pico' (contratos mini), 'momento_pico' (primera vez que se alcanza,
+        datetime64[ns]) y 'segundos_sobre_limite' (tiempo con más de `limite` contratos mini abiertos).
+        """
+        grupo, nivel = eventos['grupo'], eventos['nivel']
+        pico = np.zeros(n_grupos, dtype=np.int64)
+        momento = np.full(n_grupos, np.iinfo(np.int64).min)
+        sobre = np.zeros(n_grupos)
+        if len(grupo):
+            np.maximum.at(pico, grupo, nivel)
+            en_pico = np.flatnonzero(nivel == pico[grupo])
+            grupos_pico, primeras = np.unique(grupo[en_pico], return_index=True)
+            momento[grupos_pico] = eventos['tiempo'][en_pico[primeras]]
+            if limite:
+                exceso = nivel > limite * ContratosManager.MICROS_POR_MINI
+                sobre = np.bincount(grupo, weights=eventos['duracion'] * exceso, minlength=n_grupos) / _NS_POR_SEGUNDO
+        return {
+            'pico': pico / ContratosManager.MICROS_POR_MINI,
+            'momento_pico': momento.astype('datetime64[ns]'),  # int64 mínimo = NaT
+            'segundos_sobre_limite': sobre,
+        }
+
+    @classmethod
+    def desde_arrays(cls, arrays, limite=0) -> dict:
+        """
+        Exposición de una cuenta sobre los arrays de `TradeModel.extraer_arrays`:
+        pico total y por familia de instrumento (contratos mini), momento del pico total
+        (Timestamp) y tiempo total sobre `limite` (Timedelta). None sin tiempos de entrada y salida.
+        """
+        if arrays['entrada'] is None or arrays['salida'] is None:
+            return None
+        micros, raiz = cls._micros(arrays)
+        total = cls.resumen(cls.barrido(np.zeros(len(micros), dtype=np.int64), arrays['entrada'],
+                                        arrays['salida'], micros), 1, limite)
+        codigos, raices = pd.factorize(raiz)
+        por_raiz = cls.resumen(cls.barrido(codigos, arrays['entrada'], arrays['salida'], micros), len(raices), 0)
+        return {
+            'pico': total['pico'][0],
+            'momento_pico': pd.Timestamp(total['momento_pico'][0]),
+            'tiempo_sobre_limite': pd.Timedelta(seconds=total['segundos_sobre_limite'][0]),
+            'pico_por_instrumento': dict(zip(raices, por_raiz['pico'])),
+        }
+
+    @classmethod
+    def por_cuenta(cls, df, config_cuenta=None, por_instrumento=False, limite=None) -> pd.DataFrame:
+        """
+        Exposición de todas las cuentas de `df` en un solo barrido. Indexado por `cuenta`
+        (y por familia `raiz` con `por_instrumento=True`): operaciones, pico (contratos mini),
+        momento_pico, tiempo_sobre_limite y el límite usado (por defecto el de la plantilla).
+        """
+        if limite is None:
+            limite = cls.limite(config_cuenta or {})
+        arrays = TradeModel.extraer_arrays(df)
+        if arrays['entrada'] is None or arrays['salida'] is None:
+            raise ValueError("Se necesitan 'tiempo_de_entrada' y 'tiempo_de_salida' para medir la exposición.")
+        micros, raiz = cls._micros(arrays)
+        if por_instrumento:
+            grupos, unicos = pd.MultiIndex.from_arrays([df['cuenta'].to_numpy(), raiz],
+                                                       names=['cuenta', 'raiz']).factorize(sort=True)
+        else:
+            grupos, unicos = pd.factorize(df['cuenta'], sort=True)
+            unicos = pd.Index(unicos, name='cuenta')
+        eventos = cls.barrido(grupos, arrays['entrada'], arrays['salida'], micros)
+        r = cls.resumen(eventos, len(unicos), limite)
+        return pd.DataFrame({
+            'operaciones': np.bincount(grupos[grupos >= 0], minlength=len(unicos)),
+            'pico': r['pico'],
+            'momento_pico': r['momento_pico'],
+            'tiempo_sobre_limite': pd.to_timedelta(r['segundos_sobre_limite'], unit='s'),
+            'limite': limite,
+        }, index=unicos)
+
+    @classmethod
+    def linea_tiempo(cls, df) -> pd.DataFrame:
+        """
+        Contratos mini abiertos tras cada evento de entrada/salida de una cuenta
+        (columnas tiempo y contratos), para graficar como escalones.
+        """
+        arrays = TradeModel.extraer_arrays(df)
+        if arrays['entrada'] is None or arrays['salida'] is None:
+            return pd.DataFrame(columns=['tiempo', 'contratos'])
+        micros, _ = cls._micros(arrays)
+        eventos = cls.barrido(np.zeros(len(micros), dtype=np.int64), arrays['entrada'], arrays['salida'], micros)
+        return pd.DataFrame({
+            'tiempo': eventos['tiempo'].astype('datetime64[ns]'),
+            'contratos': eventos['nivel'] / ContratosManager.MICROS_POR_MINI,
+        })
@@ -0,0 +1,171 @@
+# models/rolling_metrics.py
+import numpy as np
+import pandas as pd
+
+from models.trade_model import TradeModel
+
+COLUMNAS_MOVILES = ['operaciones', 'win_rate', 'profit_factor', 'expectancy', 'avg_r', 'max_drawdown']
+
+
+class MetricasMoviles:
+    """
+    Métricas sobre ventanas móviles: las últimas N operaciones o las últimas N sesiones
+    (días de entrada). Win rate, profit factor y expectancy siguen las definiciones de
+    `TradeModel.calcular_metricas`; `avg_r` es la media de `r_real` (solo valores finitos).
+
+    Todo sale de sumas acumuladas: cada métrica de una ventana [inicio, fin) es una resta
+    de dos prefijos, así que calcular todas las ventanas cuesta O(n) sea cual sea N.
+    El drawdown máximo dentro de la ventana no es una resta de prefijos; se obtiene
+    combinando bloques de longitud potencia de 2 (ver `_max_drawdown_rangos`), en
+    O(n log N) y sin bucles por ventana.
+    """
+
+    @staticmethod
+    def _prefijos(x):
+        """Suma acumulada con un 0 delante: la suma de x[i:j] es p[j] - p[i]."""
+        p = np.empty(len(x) + 1, dtype=np.float64 if x.dtype.kind == 'f' else np.int64)
+        p[0] = 0
+        np.cumsum(x, out=p[1:])
+        return p
+
+    @staticmethod
+    def _max_drawdown_rangos(pnl_acumulado, inicios, largos):
+        """
+        Drawdown máximo (mayor caída desde un máximo previo del PnL acumulado) de cada rango
+        pnl_acumulado[inicio:inicio + largo], igual que `calcular_metricas` sobre esas operaciones.
+
+        Para un bloque basta guardar (máximo, mínimo, drawdown); dos bloques consecutivos A y B
+        se combinan con drawdown = max(dA, dB, maxA - minB). Se recorren los bits de los largos
+        de menor a mayor: en el nivel k los arrays describen todos los bloques de 2**k
+        operaciones, y cada rango cuyo largo tiene el bit k añade a su derecha el bloque que
+        empieza donde termina lo ya acumulado. Solo se guarda el nivel actual.
+        NaN para los rangos vacíos.
+        """
+        n = len(pnl_acumulado)
+        largos = np.asarray(largos, dtype=np.int64)
+        inicios = np.asarray(inicios, dtype=np.int64)
+        acum_max = np.full(len(largos), -np.inf)
+        acum_dd = np.full(len(largos), -np.inf)
+        acum_largo = np.zeros(len(largos), dtype=np.int64)
+        if not len(largos) or not n:
+            return np.full(len(largos), np.nan)
+
+        maximo, minimo, caida = pnl_acumulado, pnl_acumulado, np.zeros(n)
+        bloque, bit = 1, 0
+        mayor = largos.max()
+        while True:
+            sel = np.flatnonzero((largos >> bit) & 1)
+            if len(sel):
+                pos = inicios[sel] + acum_largo[sel]
+                acum_dd[sel] = np.maximum(np.maximum(acum_dd[sel], caida[pos]), acum_max[sel] - minimo[pos])
+                acum_max[sel] = np.maximum(acum_max[sel], maximo[pos])
+                acum_largo[sel] += bloque
+            if mayor >> (bit + 1) == 0:
+                break
+            # Bloques de 2 * bloque operaciones a partir de los del nivel actual
+            m = n - 2 * bloque + 1
+            caida = np.maximum(np.maximum(caida[:m], caida[bloque:bloque + m]), maximo[:m] - minimo[bloque:bloque + m])
+            maximo = np.maximum(maximo[:m], maximo[bloque:bloque + m])
+            minimo = np.minimum(minimo[:m], minimo[bloque:bloque + m])
+            bloque, bit = 2 * bloque, bit + 1
+
+        acum_dd[largos == 0] = np.nan
+        return acum_dd
+
+    @classmethod
+    def _metricas_rangos(cls, arrays, r_real, inicios, fines) -> dict:
+        """Métricas de cada rango de operaciones [inicio, fin) de los arrays (ver `COLUMNAS_MOVILES`)."""
+        g = arrays['ganancias']
+        valor_tick = arrays['valor_tick'] if arrays['valor_tick'] is not None else np.ones(len(g))
+        positivas, negativas = g > 0, g < 0
+        ticks = g / valor_tick
+
+        def suma(x):
+            p = cls._prefijos(x)
+            return p[fines] - p[inicios]
+
+        n = fines - inicios
+        wins = suma(positivas.astype(np.int64))
+        n_neg = suma(negativas.astype(np.int64))
+        ganado = suma(np.where(positivas, g, 0.0))
+        perdido = suma(np.where(negativas, g, 0.0))
+        ticks_win = suma(np.where(positivas, ticks, 0.0))
+        ticks_loss = suma(np.where(negativas, ticks, 0.0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = np.where(n > 0, wins / n * 100, 0.0)
+            # Sin pérdidas en la ventana la resta de prefijos puede dejar un residuo: se decide por conteos
+            profit_factor = np.where(n_neg > 0, ganado / np.abs(perdido), 0.0)
+            avg_win_ticks = np.where(wins > 0, ticks_win / wins, 0.0)
+            avg_loss_ticks = np.where(n - wins > 0, np.where(n_neg > 0, ticks_loss / n_neg, np.nan), 0.0)
+            expectancy = np.where(n > 0, (win_rate * avg_win_ticks + (100 - win_rate) * avg_loss_ticks) / 100, 0.0)
+
+            avg_r = np.full(len(n), np.nan)
+            if r_real is not None:
+                finitos = np.isfinite(r_real)
+                n_r = suma(finitos.astype(np.int64))
+                avg_r = np.where(n_r > 0, suma(np.where(finitos, r_real, 0.0)) / n_r, np.nan)
+
+        return {
+            'operaciones': n,
+            'win_rate': win_rate,
+            'profit_factor': profit_factor,
+            'expectancy': expectancy,
+            'avg_r': avg_r,
+            'max_drawdown': cls._max_drawdown_rangos(np.cumsum(g), inicios, n),
+        }
+
+    @staticmethod
+    def _r_real(df):
+        return df['r_real'].to_numpy(dtype=np.float64) if 'r_real' in df.columns else None
+
+    @classmethod
+    def por_operaciones(cls, df, ventana=50, minimo=None) -> pd.DataFrame:
+        """
+        Métricas de las últimas `ventana` operaciones en cada operación de `df` (en su orden).
+        Las filas con menos de `minimo` operaciones en la ventana (por defecto `ventana`)
+        quedan en NaN, como `rolling(ventana)` de pandas.
+        Devuelve un DataFrame con el índice de `df` y las columnas de `COLUMNAS_MOVILES`.
+        """
+        if ventana < 1:
+            raise ValueError("La ventana debe ser de al menos 1 operación.")
+        minimo = ventana if minimo is None else minimo
+        arrays = TradeModel.extraer_arrays(df)
+        fines = np.arange(1, len(df) + 1)
+        inicios = np.maximum(fines - ventana, 0)
+        tabla = pd.DataFrame(cls._metricas_rangos(arrays, cls._r_real(df), inicios, fines),
+                             index=df.index, columns=COLUMNAS_MOVILES)
+        tabla.loc[tabla['operaciones'] < minimo, COLUMNAS_MOVILES[1:]] = np.nan
+        return tabla
+
+    @classmethod
+    def por_sesiones(cls, df, ventana=5, minimo=None) -> pd.DataFrame:
+        """
+        Métricas de las últimas `ventana` sesiones (días de sesión con operaciones, ver `CalendarioSesiones`)
+        al cierre de cada sesión. Dentro de la ventana las operaciones se toman en orden de
+        entrada, así que el drawdown es el intradía, no el de los cierres diarios.
+        `minimo` (por defecto `ventana`) es el número de sesiones necesario para dar valores.
+        Devuelve un DataFrame indexado por `fecha` con `sesiones` y las columnas de `COLUMNAS_MOVILES`.
+        """
+        if ventana < 1:
+            raise ValueError("La ventana debe ser de al menos 1 sesión.")
+        minimo = ventana if minimo is None else minimo
+        if 'tiempo_de_entrada' not in df.columns:
+            raise ValueError("Se necesita la columna 'tiempo_de_entrada' para agrupar por sesión.")
+
+        orden = np.argsort(df['tiempo_de_entrada'].to_numpy(), kind='stable')
+        df = df.iloc[orden]
+        arrays = TradeModel.extraer_arrays(df)
+        # Primera fila de cada día -> límites [inicio, fin) de cada sesión
+        dias, primeras = np.unique(arrays['dia'], return_index=True)
+        limites = np.append(primeras, len(df))
+        sesion = np.arange(len(dias))
+        inicios = limites[np.maximum(sesion - ventana + 1, 0)]
+        fines = limites[sesion + 1]
+
+        tabla = pd.DataFrame(cls._metricas_rangos(arrays, cls._r_real(df), inicios, fines),
+                             columns=COLUMNAS_MOVILES)
+        tabla.insert(0, 'sesiones', np.minimum(sesion + 1, ventana))
+        tabla.index = pd.Index(dias.astype('datetime64[D]').astype('datetime64[ns]'), name='fecha')
+        tabla.loc[tabla['sesiones'] < minimo, COLUMNAS_MOVILES[1:]] = np.nan
+        return tabla
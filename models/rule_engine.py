@@ -0,0 +1,285 @@
+# models/rule_engine.py
+import numpy as np
+import pandas as pd
+
+from models.trade_model import TradeModel
+from models.trailing_drawdown import DrawdownIntradia
+from models.position_exposure import ExposicionContratos
+
+
+class MotorReglas:
+    """
+    Evaluación de las reglas de una plantilla sin interfaz gráfica.
+
+    `compilar` convierte las reglas de `config_cuenta` en un plan: la lista de reglas a
+    evaluar y el conjunto de agregados que necesitan (PnL diario, PnL semanal, exposición
+    en contratos...). `evaluar_plan` construye cada agregado una sola vez por cuenta y
+    evalúa todas las reglas contra él; el PnL diario y la consistencia salen de los mismos
+    buckets diarios que usa `TradeModel.calcular_metricas`.
+    El resultado es una lista de dicts que la vista Tk solo tiene que pintar.
+    """
+
+    CATEGORIAS = {
+        'fatal':      ['TRAILING_DRAWDOWN', 'LIMITE_CONTRATOS', 'OVERNIGHT_POSITIONS'],
+        'critico':    ['PERDIDA_DIARIA_MAX', 'PERDIDA_SEMANAL_MAX', 'PERDIDAS_CONSECUTIVAS_MAX'],
+        'importante': ['STOP_LOSS_OBLIGATORIO', 'RATIO_SL_PIPS', 'RATIO_TP_PIPS', 'HORARIO_INICIO', 'HORARIO_FIN'],
+        'operativa':  ['DIAS_OPERANDO_MIN', 'GANANCIA_DIARIA_MAX_PORC', 'MULTIPLICADOR_CONTRATOS_MAX', 'CONSISTENCIA']
+    }
+
+    # Agregados compartidos que necesita el valor real de cada regla
+    AGREGADOS_POR_REGLA = {
+        'PERDIDA_DIARIA_MAX': 'diario',
+        'GANANCIA_DIARIA_MAX_PORC': 'diario',
+        'DIAS_OPERANDO_MIN': 'diario',
+        'PERDIDA_SEMANAL_MAX': 'semanal',
+        'MULTIPLICADOR_CONTRATOS_MAX': 'exposicion',
+        'LIMITE_CONTRATOS': 'exposicion',
+        'TRAILING_DRAWDOWN': 'trailing',
+    }
+
+    # Hora antes de la cual una operación se considera posición overnight
+    HORA_OVERNIGHT = '09:30'
+    # Desviación relativa del SL/TP planeado a partir de la cual se cuenta una violación
+    TOLERANCIA_DESVIACION = 0.25
+
+    @classmethod
+    def compilar(cls, config_cuenta) -> dict:
+        """
+        Plan de evaluación para `config_cuenta`: reglas en orden de categoría (las que
+        falten en la plantilla se evalúan con límite 0) y agregados necesarios.
+        No modifica `config_cuenta`.
+        """
+        reglas = config_cuenta.get('REGLAS', {})
+        plan = {'reglas': [], 'agregados': set(), 'config_cuenta': config_cuenta}
+        if not reglas:
+            return plan
+        for categoria, claves in cls.CATEGORIAS.items():
+            for clave in claves:
+                regla = reglas.get(clave, {'nombre': clave, 'valor': 0})
+                limite = regla.get('valor', 0)
+                if clave == 'TRAILING_DRAWDOWN':
+                    # Sin valor propio se usa el drawdown de la plantilla
+                    limite = DrawdownIntradia.limite(config_cuenta)
+                elif clave == 'LIMITE_CONTRATOS':
+                    # Sin valor propio se usa el máximo de contratos de la plantilla
+                    limite = ExposicionContratos.limite(config_cuenta)
+                elif clave == 'PERDIDA_DIARIA_MAX':
+                    # % de la cuenta en la plantilla; se compara en USD con el PnL diario
+                    limite = TradeModel.limite_perdida_diaria(config_cuenta)
+                plan['reglas'].append({
+                    'categoria': categoria,
+                    'clave': clave,
+                    'nombre': regla.get('nombre', clave),
+                    'limite': limite,
+                })
+                if clave in cls.AGREGADOS_POR_REGLA:
+                    plan['agregados'].add(cls.AGREGADOS_POR_REGLA[clave])
+        return plan
+
+    # --- Agregados compartidos ---
+
+    @staticmethod
+    def _agregado_diario(agregados):
+        """PnL por día de sesión (los buckets de `agregados_desde_arrays`)."""
+        return agregados['pnl_dia'] if agregados['pnl_dia'] is not None else np.empty(0)
+
+    @staticmethod
+    def _agregado_semanal(arrays):
+        """
+        PnL por semana lunes-domingo del día de sesión (como `resample('W')`; la sesión del
+        lunes abre el domingo a las 17:00 CT), incluyendo con 0 las semanas sin operaciones
+        entre la primera y la última.
+        """
+        if arrays['dia'] is None or not len(arrays['dia']):
+            return np.empty(0)
+        # 1970-01-01 fue jueves: (dia + 3) // 7 cambia de semana cada lunes
+        semanas = (arrays['dia'] + 3) // 7
+        return np.bincount(semanas - semanas.min(), weights=arrays['ganancias'])
+
+    @staticmethod
+    def _agregado_exposicion(arrays, config_cuenta):
+        """Contratos abiertos a la vez (barrido de `ExposicionContratos`), o None sin tiempos de salida."""
+        return ExposicionContratos.desde_arrays(arrays, ExposicionContratos.limite(config_cuenta))
+
+    @staticmethod
+    def _agregado_trailing(arrays, config_cuenta):
+        """
+        Resumen del umbral de trailing drawdown reconstruido con MAE/MFE (`DrawdownIntradia`).
+        KeyError si faltan MAE o MFE: sin ellos no hay recorrido intradía que evaluar.
+        """
+        faltantes = [col for col in ('mae', 'mfe') if arrays.get(col) is None]
+        if faltantes:
+            raise KeyError(', '.join(faltantes))
+        parametros = DrawdownIntradia.parametros(config_cuenta)
+        return DrawdownIntradia.resumen(DrawdownIntradia.recorrido(arrays, **parametros), parametros['limite'])
+
+    # --- Valores reales ---
+
+    @classmethod
+    def _valor_real(cls, clave, arrays, agregados, metricas, compartidos, config_cuenta):
+        """Valor real de la regla `clave` (mismo cálculo que tenía la vista de reglas)."""
+        if clave == 'PERDIDA_DIARIA_MAX':
+            diario = compartidos['diario']
+            return abs(diario.min()) if len(diario) else 0
+        if clave == 'PERDIDA_SEMANAL_MAX':
+            semanal = compartidos['semanal']
+            return abs(semanal.min()) if len(semanal) else 0
+        if clave == 'PERDIDAS_CONSECUTIVAS_MAX':
+            return metricas.get('max_loss_streak', 0)
+        if clave == 'GANANCIA_DIARIA_MAX_PORC':
+            diario = compartidos['diario']
+            base = config_cuenta.get('TAMAÑO_CUENTA', 1)
+            return (diario.max() / base) * 100 if len(diario) and base else 0
+        if clave == 'CONSISTENCIA':
+            return metricas.get('avg_daily_consistency', 0)
+        if clave == 'STOP_LOSS_OBLIGATORIO':
+            return metricas.get('sl_violations', 0)
+        if clave == 'DIAS_OPERANDO_MIN':
+            return len(compartidos['diario']) if arrays['dia'] is not None else 0
+        if clave == 'RATIO_SL_PIPS':
+            if arrays['sl_deviation'] is not None:
+                return int((arrays['sl_deviation'] > cls.TOLERANCIA_DESVIACION).sum())
+        if clave == 'RATIO_TP_PIPS':
+            if arrays['tp_deviation'] is not None:
+                return int((arrays['tp_deviation'] > cls.TOLERANCIA_DESVIACION).sum())
+        if clave in ('HORARIO_INICIO', 'HORARIO_FIN'):
+            return int(metricas.get('fuera_horario_count', 0))
+        if clave == 'MULTIPLICADOR_CONTRATOS_MAX':
+            # Mayor posición abierta en una misma familia de instrumento (contratos mini)
+            exposicion = compartidos['exposicion']
+            return max(exposicion['pico_por_instrumento'].values(), default=0) if exposicion else 0
+        if clave == 'TRAILING_DRAWDOWN':
+            # Saldo mínimo intradía de la cuenta (peor caso); NaN si no se pudo reconstruir
+            return compartidos['trailing']['saldo_minimo'] if compartidos['trailing'] else np.nan
+        if clave == 'LIMITE_CONTRATOS':
+            # Mayor posición abierta en la cuenta, todas las familias (contratos mini)
+            return compartidos['exposicion']['pico'] if compartidos['exposicion'] else 0
+        if clave == 'OVERNIGHT_POSITIONS':
+            if arrays['horas'] is not None:
+                return int((arrays['horas'] < cls.HORA_OVERNIGHT)[arrays['hora_codigos']].sum())
+            return 0
+        return 0
+
+    @staticmethod
+    def _estado(categoria, clave, valor, limite, compartidos):
+        """(ok, mensaje) de una regla según su categoría."""
+        if valor is None:
+            return True, ""
+        if categoria == 'fatal':
+            if clave == 'TRAILING_DRAWDOWN':
+                trailing = compartidos.get('trailing')
+                if trailing is None:
+                    return False, "No evaluable: el export no trae MAE / MFE"
+                if trailing['ruptura_peor']:
+                    return False, (f"Umbral {trailing['umbral_peor']:.2f} roto en la operación "
+                                   f"{trailing['posicion_peor'] + 1} (peor caso intradía)")
+            elif clave == 'LIMITE_CONTRATOS':
+                if valor > limite:
+                    exposicion = compartidos.get('exposicion')
+                    if exposicion:
+                        return False, (f"Pico de {valor:g} contratos el {exposicion['momento_pico']:%Y-%m-%d %H:%M}, "
+                                       f"{exposicion['tiempo_sobre_limite']} sobre el límite")
+                    return False, f"Exceso contratos totales: {valor}"
+            elif clave == 'OVERNIGHT_POSITIONS':
+                if valor > 0:
+                    return False, f"Posiciones Overnight: {valor}"
+        elif categoria == 'critico':
+            if valor > limite:
+                return False, f"Excedido: {valor}"
+        elif categoria == 'importante':
+            if clave in ('STOP_LOSS_OBLIGATORIO', 'RATIO_SL_PIPS', 'RATIO_TP_PIPS'):
+                if valor > 0:
+                    return False, f"{valor} violaciones"
+            elif clave in ('HORARIO_INICIO', 'HORARIO_FIN'):
+                if valor > 0:
+                    return False, f"{valor} ops fuera de horario"
+        elif categoria == 'operativa':
+            if clave == 'DIAS_OPERANDO_MIN':
+                if valor < limite:
+                    return False, f"{valor}/{limite} días"
+            elif valor > limite:
+                return False, f"{valor} > {limite}"
+        return True, ""
+
+    # --- Evaluación ---
+
+    @classmethod
+    def evaluar_plan(cls, plan, arrays, agregados=None, metricas=None, fecha_inicio=None) -> list:
+        """
+        Evalúa el plan sobre los arrays de una cuenta (`TradeModel.extraer_arrays`).
+        `agregados` y `metricas` se reutilizan si ya se calcularon para esa cuenta.
+        Devuelve una lista de dicts con categoria, clave, nombre, limite, valor, ok y mensaje;
+        `valor` es None si no hay operaciones (la regla cuenta como cumplida) y 0 si no pudo calcularse;
+        TRAILING_DRAWDOWN sin MAE / MFE queda incumplida con valor NaN y mensaje de no evaluable.
+        """
+        config_cuenta = plan['config_cuenta']
+        if not plan['reglas']:
+            return []
+        hay_operaciones = len(arrays['ganancias']) > 0
+        if hay_operaciones:
+            if agregados is None:
+                agregados = TradeModel.agregados_desde_arrays(arrays, config_cuenta)
+            if metricas is None:
+                fecha_inicio = fecha_inicio or TradeModel.fecha_inicio_arrays(arrays)
+                metricas = TradeModel.componer_metricas(agregados, fecha_inicio, config_cuenta)
+
+        compartidos = {}
+        if hay_operaciones:
+            if 'diario' in plan['agregados']:
+                compartidos['diario'] = cls._agregado_diario(agregados)
+            if 'semanal' in plan['agregados']:
+                compartidos['semanal'] = cls._agregado_semanal(arrays)
+            if 'exposicion' in plan['agregados']:
+                compartidos['exposicion'] = cls._agregado_exposicion(arrays, config_cuenta)
+            if 'trailing' in plan['agregados']:
+                try:
+                    compartidos['trailing'] = cls._agregado_trailing(arrays, config_cuenta)
+                except KeyError:
+                    # Sin MAE / MFE la regla queda sin evaluar (y no se da por cumplida)
+                    compartidos['trailing'] = None
+
+        resultados = []
+        for regla in plan['reglas']:
+            valor = None
+            if hay_operaciones:
+                try:
+                    valor = cls._valor_real(regla['clave'], arrays, agregados, metricas, compartidos, config_cuenta)
+                except Exception:
+                    valor = 0
+            ok, mensaje = cls._estado(regla['categoria'], regla['clave'], valor, regla['limite'], compartidos)
+            resultados.append({**regla, 'valor': valor, 'ok': ok, 'mensaje': mensaje})
+        return resultados
+
+    @classmethod
+    def evaluar(cls, df, config_cuenta, metricas=None, fecha_inicio=None) -> list:
+        """Evalúa las reglas de `config_cuenta` sobre las operaciones de una cuenta."""
+        return cls.evaluar_plan(cls.compilar(config_cuenta), TradeModel.extraer_arrays(df),
+                                metricas=metricas, fecha_inicio=fecha_inicio)
+
+    @classmethod
+    def evaluar_cuentas(cls, df, config_cuenta, fecha_inicio=None):
+        """
+        Métricas y reglas de todas las cuentas de `df` en una sola pasada: el plan se compila
+        una vez y cada cuenta comparte sus agregados entre métricas y reglas.
+
+        Devuelve (tabla, resultados):
+        - tabla: `TradeModel.calcular_metricas_por_cuenta` más `reglas_ok` (todas cumplidas)
+          y `reglas_fallidas` (número de reglas incumplidas)
+        - resultados: DataFrame largo (una fila por cuenta y regla) con la salida de `evaluar_plan`
+        """
+        plan = cls.compilar(config_cuenta)
+        filas, resultados = [], []
+        for cuenta, tramo in TradeModel.tramos_por_cuenta(df):
+            fecha = fecha_inicio or TradeModel.fecha_inicio_arrays(tramo)
+            agregados = TradeModel.agregados_desde_arrays(tramo, config_cuenta)
+            metricas = TradeModel.componer_metricas(agregados, fecha, config_cuenta)
+            evaluacion = cls.evaluar_plan(plan, tramo, agregados, metricas)
+            fallidas = sum(not r['ok'] for r in evaluacion)
+            filas.append({**metricas, 'cuenta': cuenta, 'fecha_inicio': fecha,
+                          'reglas_ok': fallidas == 0, 'reglas_fallidas': fallidas})
+            resultados.extend({'cuenta': cuenta, **r} for r in evaluacion)
+
+        if not filas:
+            return pd.DataFrame().rename_axis('cuenta'), pd.DataFrame()
+        tabla = TradeModel.estado_por_cuenta(pd.DataFrame(filas).set_index('cuenta'), config_cuenta)
+        return tabla, pd.DataFrame(resultados)
@@ -0,0 +1,231 @@
+# models/session_calendar.py
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from dateutil import tz
+
+from config_manager import ConfigManager
+
+try:
+    import exchange_calendars as xcals
+except ImportError:  # exchange_calendars es opcional: sin él se usa la regla de 17:00 CT sin festivos
+    xcals = None
+
+CALENDARIO = 'CMES'
+ZONA_SESION = 'America/Chicago'
+# Zona de los tiempos sin perfil ni `zona_horaria` en jota_config.json: la del equipo
+# (el NinjaTrader exporta en la hora local del PC)
+ZONA_LOCAL = 'local'
+# La sesión del día D abre a las 17:00 CT del día hábil anterior (la del lunes, el domingo)
+HORA_APERTURA = 17
+# Rango inicial del calendario persistido; se amplía si los datos caen fuera
+PRIMER_DIA = '2000-01-01'
+DIAS_ADELANTE = 730
+
+
+class CalendarioSesiones:
+    """
+    Sesión de futuros (CME Globex) de cada operación: la sesión cambia a las 17:00 CT y
+    salta fines de semana y festivos, así que una entrada del martes a las 18:00 CT cuenta
+    para la sesión del miércoles y una del domingo por la tarde para la del lunes. Es la
+    fecha con la que las prop firms cuentan pérdida diaria, semanal y días operados.
+
+    El calendario son dos arrays ordenados: la apertura de cada sesión (ns, hora de pared
+    de Chicago, sin zona) y su día (datetime64[D]). La sesión de un instante es un
+    `searchsorted` sobre las aperturas. Las aperturas salen de `exchange_calendars`
+    ('CMES', con festivos) si está instalado y, si no, de la regla de 17:00 CT en días
+    laborables. Se guardan en un `.npz` junto a la caché de operaciones, así que arrancar
+    no reconstruye el calendario; solo se rehace si los datos se salen de su rango.
+
+    Los tiempos de las operaciones vienen en la zona del export (`zona_origen`): la del
+    perfil si la fija, si no `zona_horaria` de jota_config.json y, si tampoco, la del equipo.
+    """
+
+    RUTA_CACHE = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache_operaciones")
+    VERSION = 1
+    _memoria = {}
+    _zona_configurada = None
+
+    @staticmethod
+    def fuente() -> str:
+        """'CMES' con `exchange_calendars` instalado, 'regla' sin él."""
+        return CALENDARIO if xcals is not None else 'regla'
+
+    @classmethod
+    def zona_origen(cls, zona=None) -> str:
+        """Zona de los tiempos: `zona` (la del perfil) o la de jota_config.json o `ZONA_LOCAL`."""
+        if zona:
+            return zona
+        if cls._zona_configurada is None:
+            cls._zona_configurada = ConfigManager.zona_horaria() or ZONA_LOCAL
+        return cls._zona_configurada
+
+    @classmethod
+    def firma_zona(cls, zona=None) -> str:
+        """Identifica `zona_origen(zona)`; la local, por sus nombres y desfases (cambia con el equipo)."""
+        zona = cls.zona_origen(zona)
+        if zona == ZONA_LOCAL:
+            return f"{ZONA_LOCAL}:{'/'.join(time.tzname)}:{time.timezone}:{time.altzone}"
+        return zona
+
+    @staticmethod
+    def _tz(zona):
+        """Zona para pandas: `ZONA_LOCAL` es la del equipo (dateutil)."""
+        return tz.tzlocal() if zona == ZONA_LOCAL else zona
+
+    @classmethod
+    def _ruta(cls, fuente):
+        return os.path.join(cls.RUTA_CACHE, f"sesiones_{fuente}_v{cls.VERSION}.npz")
+
+    @staticmethod
+    def _construir_regla(desde, hasta) -> tuple:
+        """Sesiones de lunes a viernes en [desde, hasta], abiertas a las 17:00 CT del día anterior."""
+        dias = pd.bdate_range(desde, hasta)
+        aperturas = dias - pd.Timedelta(days=1) + pd.Timedelta(hours=HORA_APERTURA)
+        return aperturas.asi8, dias.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    @staticmethod
+    def _construir_exchange(desde, hasta) -> tuple:
+        """Sesiones del calendario CME de `exchange_calendars` en [desde, hasta]."""
+        calendario = xcals.get_calendar(CALENDARIO, start=desde, end=hasta)
+        aperturas = pd.DatetimeIndex(calendario.schedule['open'])
+        if aperturas.tz is None:
+            aperturas = aperturas.tz_localize('UTC')
+        aperturas = aperturas.tz_convert(ZONA_SESION).tz_localize(None).as_unit('ns')
+        dias = pd.DatetimeIndex(calendario.schedule.index).tz_localize(None)
+        return aperturas.asi8, dias.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    @classmethod
+    def construir(cls, desde, hasta, fuente=None) -> dict:
+        """Calendario de sesiones entre los días `desde` y `hasta` (incluidos)."""
+        fuente = fuente or cls.fuente()
+        desde, hasta = pd.Timestamp(desde).normalize(), pd.Timestamp(hasta).normalize()
+        if fuente == CALENDARIO:
+            aperturas, dias = cls._construir_exchange(desde, hasta)
+        else:
+            aperturas, dias = cls._construir_regla(desde, hasta)
+        return {'aperturas': aperturas, 'dias': dias,
+                'hasta': np.int64(hasta.to_datetime64().astype('datetime64[D]').astype(np.int64))}
+
+    @staticmethod
+    def _cubre(calendario, minimo, maximo) -> bool:
+        """True si las aperturas cubren los instantes [minimo, maximo] (ns, hora de Chicago)."""
+        fin = np.datetime64(int(calendario['hasta']), 'D').astype('datetime64[ns]').astype(np.int64)
+        return len(calendario['aperturas']) > 0 and calendario['aperturas'][0] <= minimo and maximo < fin
+
+    @classmethod
+    def _cargar(cls, fuente):
+        """Calendario persistido de `fuente` o None si no existe o no se puede leer."""
+        try:
+            with np.load(cls._ruta(fuente)) as datos:
+                return {clave: datos[clave] for clave in ('aperturas', 'dias', 'hasta')}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def _guardar(cls, fuente, calendario):
+        os.makedirs(cls.RUTA_CACHE, exist_ok=True)
+        ruta = cls._ruta(fuente)
+        temporal = ruta + ".tmp.npz"
+        np.savez(temporal, **calendario)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def calendario(cls, minimo=None, maximo=None) -> dict:
+        """
+        Calendario ('aperturas', 'dias', 'hasta') que cubre los instantes [minimo, maximo]
+        (ns, hora de Chicago): de memoria, del `.npz` persistido o reconstruido (y guardado)
+        si ninguno los cubre.
+        """
+        fuente = cls.fuente()
+        calendario = cls._memoria.get(fuente)
+        if calendario is None:
+            calendario = cls._cargar(fuente)
+        minimo = pd.Timestamp(PRIMER_DIA).value if minimo is None else minimo
+        maximo = pd.Timestamp.now().value if maximo is None else maximo
+        if calendario is None or not cls._cubre(calendario, minimo, maximo):
+            # Un día de margen antes: la primera sesión abre la tarde anterior
+            desde = min(pd.Timestamp(PRIMER_DIA), pd.Timestamp(minimo) - pd.Timedelta(days=1))
+            hasta = max(pd.Timestamp.now(), pd.Timestamp(maximo)) + pd.Timedelta(days=DIAS_ADELANTE)
+            if calendario is not None:
+                hasta = max(hasta, pd.Timestamp(np.datetime64(int(calendario['hasta']), 'D')))
+            construida = fuente
+            try:
+                calendario = cls.construir(desde, hasta, fuente)
+            except Exception:  # calendario de la librería inválido para el rango: regla de 17:00 CT
+                construida = 'regla'
+                calendario = cls.construir(desde, hasta, construida)
+            try:
+                cls._guardar(construida, calendario)
+            except OSError:
+                pass  # sin disco se reconstruye en el próximo arranque
+        cls._memoria[fuente] = calendario
+        return calendario
+
+    @classmethod
+    def sesiones(cls, tiempos, zona=None) -> np.ndarray:
+        """
+        Día de sesión (datetime64[D]; NaT donde el tiempo es NaT) de cada instante de
+        `tiempos` (fechas sin zona, en hora de `zona_origen(zona)`; `ZONA_SESION` si ya
+        están en hora de Chicago). En el cambio de horario, las horas repetidas se toman
+        como horario estándar.
+        """
+        tiempos = pd.DatetimeIndex(tiempos).as_unit('ns')
+        zona = cls.zona_origen(zona)
+        if zona != ZONA_SESION:
+            tiempos = tiempos.tz_localize(cls._tz(zona), ambiguous=np.zeros(len(tiempos), dtype=bool),
+                                          nonexistent='shift_forward')
+            tiempos = tiempos.tz_convert(ZONA_SESION).tz_localize(None)
+        validos = ~tiempos.isna()
+        ns = tiempos.asi8
+        resultado = np.full(len(ns), np.datetime64('NaT'), dtype='datetime64[D]')
+        if not validos.any():
+            return resultado
+        calendario = cls.calendario(ns[validos].min(), ns[validos].max())
+        posicion = np.searchsorted(calendario['aperturas'], ns[validos], side='right') - 1
+        resultado[validos] = calendario['dias'][np.maximum(posicion, 0)].astype('datetime64[D]')
+        return resultado
+
+    @classmethod
+    def limites(cls, desde, hasta, zona=None) -> tuple:
+        """
+        (apertura, fin) de las sesiones con día en [desde, hasta) como Timestamps sin zona en
+        hora de `zona_origen(zona)` (la de los tiempos de las operaciones): la apertura de la
+        primera sesión desde el día `desde` y la de la primera desde el día `hasta`.
+        """
+        desde, hasta = pd.Timestamp(desde).normalize(), pd.Timestamp(hasta).normalize()
+        calendario = cls.calendario(desde.value - 2 * 86_400 * 10**9, hasta.value)
+        dias = np.array([desde, hasta], dtype='datetime64[D]').astype(np.int64)
+        posicion = np.searchsorted(calendario['dias'], dias)
+        aperturas = pd.DatetimeIndex(calendario['aperturas'][np.minimum(posicion, len(calendario['aperturas']) - 1)])
+        zona = cls.zona_origen(zona)
+        if zona != ZONA_SESION:
+            aperturas = aperturas.tz_localize(ZONA_SESION).tz_convert(cls._tz(zona)).tz_localize(None)
+        return aperturas[0], aperturas[1]
+
+    @classmethod
+    def contar(cls, desde, hasta) -> int:
+        """Número de sesiones con día en [desde, hasta) (sin fines de semana ni, con CMES, festivos)."""
+        desde, hasta = pd.Timestamp(desde).normalize(), pd.Timestamp(hasta).normalize()
+        if hasta <= desde:
+            return 0
+        calendario = cls.calendario(desde.value, hasta.value)
+        dias = np.array([desde, hasta], dtype='datetime64[D]').astype(np.int64)
+        inicio, fin = np.searchsorted(calendario['dias'], dias)
+        return int(fin - inicio)
+
+    @classmethod
+    def limpiar(cls):
+        """
+        Descarta el calendario en memoria y los persistidos (se reconstruyen al próximo uso)
+        y la zona leída de jota_config.json.
+        """
+        cls._memoria.clear()
+        cls._zona_configurada = None
+        for fuente in (CALENDARIO, 'regla'):
+            try:
+                os.remove(cls._ruta(fuente))
+            except OSError:
+                pass
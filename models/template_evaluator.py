@@ -0,0 +1,285 @@
+# models/template_evaluator.py
+import numpy as np
+import pandas as pd
+
+from models.trade_model import TradeModel
+from models.rule_engine import MotorReglas
+from models.trailing_drawdown import DrawdownIntradia
+from models.position_exposure import ExposicionContratos
+
+# Reglas evaluadas, en el orden de `MotorReglas.CATEGORIAS`
+REGLAS = [clave for claves in MotorReglas.CATEGORIAS.values() for clave in claves]
+CATEGORIA_POR_REGLA = {clave: categoria for categoria, claves in MotorReglas.CATEGORIAS.items() for clave in claves}
+
+
+class EvaluadorPlantillas:
+    """
+    "¿Qué plantillas habría superado esta operativa?": las reglas de N plantillas sobre
+    las M cuentas de un mismo frame base (`procesar_datos_base`), con el mismo resultado
+    que `MotorReglas.evaluar_cuentas` plantilla a plantilla pero sin reprocesar el frame
+    por plantilla.
+
+    Casi todo lo que miran las reglas no depende de la plantilla (PnL diario y semanal,
+    rachas, días operados, consistencia, exposición, overnight, recorrido del trailing
+    con saldo y límite 0): se calcula una vez por cuenta. Lo que sí depende se reduce a
+    umbrales que se difunden (broadcasting) sobre esos agregados:
+    - límites de cada regla y tamaño de cuenta: comparaciones de matrices plantillas × cuentas
+    - trailing: el margen mínimo con saldo S y límite L es (margen con S = L = 0) + L
+    - SL / TP en pips: un conteo por cada valor distinto de SL / TP entre las plantillas
+    - horario: operaciones por hora distinta y cuenta, multiplicadas por la máscara
+      de horas fuera del horario de cada plantilla
+    """
+
+    @staticmethod
+    def _parametros(plantillas) -> dict:
+        """Parámetros de cada plantilla como arrays alineados con `plantillas` (dict nombre -> config)."""
+        nombres = list(plantillas)
+        configs = [plantillas[n] for n in nombres]
+        planes = [MotorReglas.compilar(c) for c in configs]
+
+        def regla(config, clave, defecto):
+            return config.get('REGLAS', {}).get(clave, {}).get('valor', defecto)
+
+        def numero(valor):
+            try:
+                return float(valor)
+            except (TypeError, ValueError):
+                return np.nan
+
+        return {
+            'nombres': nombres,
+            'con_reglas': np.array([bool(p['reglas']) for p in planes]),
+            'limites': {
+                clave: np.array([numero(next((r['limite'] for r in p['reglas'] if r['clave'] == clave), np.nan))
+                                 for p in planes], dtype=np.float64)
+                for clave in REGLAS
+            },
+            'saldo_inicial': np.array([c.get('TAMAÑO_CUENTA', 0) or 0 for c in configs], dtype=np.float64),
+            'base_ganancia': np.array([c.get('TAMAÑO_CUENTA', 1) or 0 for c in configs], dtype=np.float64),
+            'fin_dia': np.array([c.get('TIPO_DRAWDOWN') == 'fin_dia' for c in configs]),
+            'sl': np.array([numero(regla(c, 'RATIO_SL_PIPS', np.nan)) for c in configs], dtype=np.float64),
+            'tp': np.array([numero(regla(c, 'RATIO_TP_PIPS', np.nan)) for c in configs], dtype=np.float64),
+            'sl_obligatorio': np.array([bool(regla(c, 'STOP_LOSS_OBLIGATORIO', False)) for c in configs]),
+            'horario': [(regla(c, 'HORARIO_INICIO', None), regla(c, 'HORARIO_FIN', None)) for c in configs],
+            'objetivo': np.array([c.get('OBJETIVO_GANANCIA', 0) or 0 for c in configs], dtype=np.float64),
+            'drawdown_max': np.array([c.get('DRAWDOWN_MAX', 0) or 0 for c in configs], dtype=np.float64),
+        }
+
+    @staticmethod
+    def _conteos_umbral(tramo, pnl_neto, sls, tps):
+        """
+        Violaciones de stop obligatorio (|MAE| > SL en USD) y de desviación de SL / TP
+        (`MotorReglas.TOLERANCIA_DESVIACION`, con la misma aritmética que `aplicar_config_cuenta`)
+        de una cuenta, para cada valor distinto de SL (`sls`) y de TP (`tps`).
+        """
+        valor_tick = tramo['valor_tick']
+        tolerancia = MotorReglas.TOLERANCIA_DESVIACION
+        conteos = {'stop': np.zeros(len(sls), dtype=np.int64),
+                   'sl': np.zeros(len(sls), dtype=np.int64),
+                   'tp': np.zeros(len(tps), dtype=np.int64)}
+        if valor_tick is None:
+            return conteos
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if tramo['mae'] is not None:
+                conteos['stop'] = (np.abs(tramo['mae'])[None, :] > sls[:, None] * valor_tick[None, :]).sum(axis=1)
+            if pnl_neto is not None:
+                # La desviación solo es distinta de 0 en perdedoras (SL) y ganadoras (TP)
+                negativas, positivas = pnl_neto < 0, pnl_neto > 0
+                sl_usd = sls[:, None] * valor_tick[negativas][None, :]
+                tp_usd = tps[:, None] * valor_tick[positivas][None, :]
+                conteos['sl'] = (np.abs(pnl_neto[negativas])[None, :] / sl_usd - 1 > tolerancia).sum(axis=1)
+                conteos['tp'] = (pnl_neto[positivas][None, :] / tp_usd - 1 > tolerancia).sum(axis=1)
+        return conteos
+
+    @classmethod
+    def agregados_cuentas(cls, df, sls=(), tps=()):
+        """
+        Agregados por cuenta que no dependen de la plantilla (DataFrame indexado por `cuenta`),
+        más las operaciones por hora (`horas` distintas) y los conteos por SL / TP de
+        `_conteos_umbral`. Devuelve (tabla, horas, por_hora, conteos).
+        """
+        sls, tps = np.asarray(sls, dtype=np.float64), np.asarray(tps, dtype=np.float64)
+        pnl_neto_df = df['pnl_neto'].to_numpy(dtype=np.float64) if 'pnl_neto' in df.columns else None
+        filas, por_hora, horas = [], [], None
+        conteos = {'stop': [], 'sl': [], 'tp': []}
+        for cuenta, tramo in TradeModel.tramos_por_cuenta(df):
+            g = tramo['ganancias']
+            n = len(g)
+            positivas = g > 0
+            pnl_acumulado = np.cumsum(g)
+            fila = {
+                'cuenta': cuenta,
+                'operaciones': n,
+                'pnl': g.sum(),
+                'max_drawdown': (np.maximum.accumulate(pnl_acumulado) - pnl_acumulado).max() if n else np.nan,
+                'dias': 0, 'perdida_diaria': 0.0, 'ganancia_diaria': np.nan, 'consistencia': 0.0,
+            }
+            # Buckets diarios y semanales: los mismos de agregados_desde_arrays y MotorReglas
+            if tramo['dia'] is not None:
+                codigos_dia, dias = pd.factorize(tramo['dia'])
+                pnl_dia = np.bincount(codigos_dia, weights=g, minlength=len(dias))
+                operaciones_dia = np.bincount(codigos_dia, minlength=len(dias))
+                wins_dia = np.bincount(codigos_dia, weights=positivas, minlength=len(dias))
+                if len(dias):
+                    fila.update(dias=len(dias), perdida_diaria=abs(pnl_dia.min()), ganancia_diaria=pnl_dia.max(),
+                                consistencia=(wins_dia / operaciones_dia * 100).mean())
+            semanal = MotorReglas._agregado_semanal(tramo)
+            fila['perdida_semanal'] = abs(semanal.min()) if len(semanal) else 0.0
+            posiciones_win = np.flatnonzero(positivas)
+            fila['racha_perdidas'] = int(np.diff(posiciones_win, prepend=-1, append=n).max() - 1)
+
+            try:
+                exposicion = ExposicionContratos.desde_arrays(tramo)
+            except Exception:
+                exposicion = None
+            fila['pico_contratos'] = exposicion['pico'] if exposicion else 0.0
+            fila['pico_familia'] = max(exposicion['pico_por_instrumento'].values(), default=0) if exposicion else 0.0
+
+            # Trailing con saldo y límite 0: el margen de cada plantilla es este + su límite
+            for sufijo, fin_dia in (('intradia', False), ('fin_dia', True)):
+                recorrido = DrawdownIntradia.recorrido(tramo, 0.0, 0.0, fin_dia=fin_dia)
+                fila[f'caida_{sufijo}'] = recorrido['margen_peor'].min()
+            fila['bajo_minimo'] = recorrido['bajo'].min()
+
+            horas = tramo['horas']
+            fila['overnight'] = 0
+            if horas is not None:
+                conteo_horas = np.bincount(tramo['hora_codigos'], minlength=len(horas))
+                fila['overnight'] = int(conteo_horas[horas < MotorReglas.HORA_OVERNIGHT].sum())
+                por_hora.append(conteo_horas)
+
+            pnl_neto = pnl_neto_df[tramo['fila']] if pnl_neto_df is not None else None
+            for clave, valor in cls._conteos_umbral(tramo, pnl_neto, sls, tps).items():
+                conteos[clave].append(valor)
+            filas.append(fila)
+
+        tabla = pd.DataFrame(filas).set_index('cuenta') if filas else pd.DataFrame().rename_axis('cuenta')
+        por_hora = np.array(por_hora) if horas is not None else None
+        conteos = {
+            clave: np.array(valor).reshape(len(filas), len(sls if clave != 'tp' else tps))
+            for clave, valor in conteos.items()
+        }
+        return tabla, horas, por_hora, conteos
+
+    @staticmethod
+    def _estado(clave, valor, limite):
+        """(ok, margen) de una regla para matrices plantillas × cuentas; margen < 0 = incumplida."""
+        categoria = CATEGORIA_POR_REGLA[clave]
+        limite = limite[:, None]
+        with np.errstate(invalid='ignore'):
+            if clave == 'DIAS_OPERANDO_MIN':
+                margen = valor - limite
+            elif categoria == 'importante' or clave == 'OVERNIGHT_POSITIONS':
+                # Conteos de violaciones: cualquiera incumple
+                margen = -valor
+            else:
+                margen = limite - valor
+            return ~(margen < 0), margen
+
+    @classmethod
+    def evaluar(cls, df, plantillas) -> dict:
+        """
+        Reglas de cada plantilla (dict nombre -> config de cuenta, ver
+        `ConfigManager.cargar_todas_las_plantillas`) sobre cada cuenta de `df` (frame base:
+        las columnas que dependen de la plantilla se calculan aquí).
+
+        Devuelve un dict con:
+        - 'ok', 'margen', 'valor': DataFrames indexados por (plantilla, cuenta), una columna
+          por regla de `REGLAS`; margen en las unidades de la regla (positivo = holgura,
+          negativo = exceso; en reglas de conteo, -violaciones). Sin reglas en la plantilla:
+          todo cumplido y margen / valor NaN.
+        - 'limite': DataFrame plantilla × regla con los límites de `MotorReglas.compilar`
+        - 'resumen': por (plantilla, cuenta) reglas_fallidas, reglas_ok, objetivo_alcanzado,
+          drawdown_excedido (como `TradeModel.estado_por_cuenta`) y `pasa` (reglas
+          cumplidas, sin drawdown excedido y objetivo alcanzado si la plantilla lo tiene)
+        - 'matriz': `pasa` como tabla plantilla × cuenta
+        """
+        if not plantillas:
+            raise ValueError("No hay plantillas que evaluar.")
+        p = cls._parametros(plantillas)
+        sls = np.unique(p['sl'][~np.isnan(p['sl'])])
+        tps = np.unique(p['tp'][~np.isnan(p['tp'])])
+        tabla, horas, por_hora, conteos = cls.agregados_cuentas(df, sls, tps)
+        if tabla.empty:
+            raise ValueError("No hay operaciones con cuenta que evaluar.")
+        n_plantillas, n_cuentas = len(p['nombres']), len(tabla)
+
+        def por_cuenta(columna):
+            return np.broadcast_to(tabla[columna].to_numpy(dtype=np.float64), (n_plantillas, n_cuentas))
+
+        def por_umbral(clave, umbrales, valores):
+            """Conteo de cada plantilla según su umbral (0 si no lo tiene)."""
+            posicion = np.searchsorted(umbrales, np.nan_to_num(valores))
+            encontrado = ~np.isnan(valores) & (posicion < len(umbrales))
+            resultado = np.zeros((n_plantillas, n_cuentas))
+            resultado[encontrado] = conteos[clave][:, posicion[encontrado]].T
+            return resultado
+
+        valores = {
+            'LIMITE_CONTRATOS': por_cuenta('pico_contratos'),
+            'OVERNIGHT_POSITIONS': por_cuenta('overnight'),
+            'PERDIDA_DIARIA_MAX': por_cuenta('perdida_diaria'),
+            'PERDIDA_SEMANAL_MAX': por_cuenta('perdida_semanal'),
+            'PERDIDAS_CONSECUTIVAS_MAX': por_cuenta('racha_perdidas'),
+            'DIAS_OPERANDO_MIN': por_cuenta('dias'),
+            'MULTIPLICADOR_CONTRATOS_MAX': por_cuenta('pico_familia'),
+            'CONSISTENCIA': por_cuenta('consistencia'),
+            'TRAILING_DRAWDOWN': p['saldo_inicial'][:, None] + tabla['bajo_minimo'].to_numpy()[None, :],
+            'RATIO_SL_PIPS': por_umbral('sl', sls, p['sl']),
+            'RATIO_TP_PIPS': por_umbral('tp', tps, p['tp']),
+            'STOP_LOSS_OBLIGATORIO': np.where(p['sl_obligatorio'][:, None], por_umbral('stop', sls, p['sl']), 0.0),
+        }
+        base = p['base_ganancia'][:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valores['GANANCIA_DIARIA_MAX_PORC'] = np.where(
+                (base != 0) & (por_cuenta('dias') > 0), por_cuenta('ganancia_diaria') / base * 100, 0.0)
+
+        fuera = np.zeros((n_plantillas, n_cuentas))
+        if horas is not None:
+            for i, (inicio, fin) in enumerate(p['horario']):
+                if inicio is not None and fin is not None:
+                    fuera[i] = por_hora @ ~((horas >= inicio) & (horas <= fin))
+        valores['HORARIO_INICIO'] = valores['HORARIO_FIN'] = fuera
+
+        ok, margen = {}, {}
+        for clave in REGLAS:
+            if clave == 'TRAILING_DRAWDOWN':
+                limite = p['limites'][clave][:, None]
+                caida = np.where(p['fin_dia'][:, None], por_cuenta('caida_fin_dia'), por_cuenta('caida_intradia'))
+                # Sin límite no hay umbral que romper
+                margen[clave] = np.where(limite > 0, caida + limite, np.inf)
+                ok[clave] = ~(margen[clave] < 0)
+            else:
+                ok[clave], margen[clave] = cls._estado(clave, valores[clave], p['limites'][clave])
+
+        sin_reglas = ~p['con_reglas'][:, None]
+        indice = pd.MultiIndex.from_product([p['nombres'], tabla.index], names=['plantilla', 'cuenta'])
+
+        def apilar(matrices, relleno):
+            return pd.DataFrame({
+                clave: np.where(sin_reglas, relleno, matrices[clave]).reshape(-1) for clave in REGLAS
+            }, index=indice)
+
+        resultado = {
+            'ok': apilar(ok, True).astype(bool),
+            'margen': apilar(margen, np.nan),
+            'valor': apilar(valores, np.nan),
+            'limite': pd.DataFrame(p['limites'], index=pd.Index(p['nombres'], name='plantilla')),
+        }
+
+        fallidas = (~resultado['ok']).sum(axis=1)
+        objetivo = np.repeat(p['objetivo'], n_cuentas)
+        drawdown_max = np.repeat(p['drawdown_max'], n_cuentas)
+        pnl = np.tile(tabla['pnl'].to_numpy(), n_plantillas)
+        max_drawdown = np.tile(tabla['max_drawdown'].to_numpy(), n_plantillas)
+        resumen = pd.DataFrame({
+            'reglas_fallidas': fallidas,
+            'reglas_ok': fallidas == 0,
+            'objetivo_alcanzado': (objetivo != 0) & (pnl >= objetivo),
+            'drawdown_excedido': (drawdown_max != 0) & (max_drawdown > drawdown_max),
+        }, index=indice)
+        resumen['pasa'] = (resumen['reglas_ok'] & ~resumen['drawdown_excedido']
+                           & (resumen['objetivo_alcanzado'] | (objetivo == 0)))
+        resultado['resumen'] = resumen
+        resultado['matriz'] = resumen['pasa'].unstack('cuenta').reindex(p['nombres'])
+        return resultado
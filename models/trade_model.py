@@ -6,34 +6,136 @@ from datetime import datetime
 class TradeModel:
     """
     Cálculo de métricas avanzadas a partir de un DataFrame ya procesado.
-    Extraído íntegro de `jota_capital_tracker.py` :contentReference[oaicite:14]{index=14}.
+    Extraído de `jota_capital_tracker.py` :contentReference[oaicite:14]{index=14};
+    el cálculo trabaja sobre arrays NumPy (`extraer_arrays` -> `agregados_desde_arrays` -> `componer_metricas`).
     """
 
+    # Arrays de `extraer_arrays` con un valor por código (no por fila): no se ordenan ni se recortan
+    _VALORES_DISTINTOS = ('horas', 'instrumentos')
+
     @staticmethod
-    def calcular_metricas(df, fecha_inicio, config_cuenta) -> dict:
+    def extraer_arrays(df) -> dict:
+        """
+        Columnas que usa `calcular_metricas`, leídas una sola vez como arrays NumPy
+        (las opcionales quedan en None si el frame no las trae):
+        - 'ganancias', 'mae', 'mfe', 'etd', 'valor_tick': float64 por fila
+        - 'pnl_acum', 'valor_punto', 'sl_deviation', 'tp_deviation', 'cant': float64 por fila (reglas)
+        - 'dia': día de la sesión (`sesion`, o el de `tiempo_de_entrada` si no está) como entero (datetime64[D])
+        - 'hora_codigos' / 'horas': `hora_operacion` factorizada (códigos por fila y valores distintos)
+        - 'entrada' / 'salida': `tiempo_de_entrada` / `tiempo_de_salida` en nanosegundos (int64)
+        - 'instrumento_codigos' / 'instrumentos': `instrumento` factorizado
+        """
+        def columna(nombre):
+            return df[nombre].to_numpy(dtype=np.float64) if nombre in df.columns else None
+
+        arrays = {
+            nombre: columna(nombre)
+            for nombre in ('ganancias', 'mae', 'mfe', 'etd', 'valor_tick',
+                           'pnl_acum', 'valor_punto', 'sl_deviation', 'tp_deviation', 'cant')
+        }
+        arrays['dia'] = None
+        if 'sesion' in df.columns:
+            arrays['dia'] = df['sesion'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        elif 'tiempo_de_entrada' in df.columns:
+            arrays['dia'] = df['tiempo_de_entrada'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        arrays['hora_codigos'] = arrays['horas'] = None
+        if 'hora_operacion' in df.columns:
+            codigos, horas = pd.factorize(df['hora_operacion'].astype(str))
+            arrays['hora_codigos'], arrays['horas'] = codigos, np.asarray(horas, dtype=object)
+        for nombre, col in (('entrada', 'tiempo_de_entrada'), ('salida', 'tiempo_de_salida')):
+            arrays[nombre] = df[col].to_numpy(dtype='datetime64[ns]').astype(np.int64) if col in df.columns else None
+        arrays['instrumento_codigos'] = arrays['instrumentos'] = None
+        if 'instrumento' in df.columns:
+            codigos, instrumentos = pd.factorize(df['instrumento'])
+            arrays['instrumento_codigos'], arrays['instrumentos'] = codigos, pd.Series(instrumentos, dtype=object)
+        return arrays
+
+    @staticmethod
+    def agregados_desde_arrays(arrays, config_cuenta) -> dict:
+        """
+        Sumas y conteos de los que salen todas las métricas (ver `componer_metricas`),
+        calculados en una pasada sobre los arrays de `extraer_arrays`: cada máscara,
+        suma y agrupación diaria se calcula una vez y se reutiliza.
+        """
+        reglas = config_cuenta['REGLAS']
+        g = arrays['ganancias']
+        n = len(g)
+        positivas = g > 0
+        negativas = g < 0
+
+        pnl_acumulado = np.cumsum(g)
+        agregados = {
+            'operaciones': n,
+            'wins': int(positivas.sum()),
+            'negativas': int(negativas.sum()),
+            'pnl': g.sum(),
+            'suma_ganadoras': g[positivas].sum(),
+            'suma_perdedoras': g[negativas].sum(),
+            'max_drawdown': (np.maximum.accumulate(pnl_acumulado) - pnl_acumulado).max() if n else np.nan,
+            'valor_tick': arrays['valor_tick'][0] if arrays['valor_tick'] is not None and n else 1,
+        }
+
+        # Buckets diarios (en orden de primera aparición): pérdida diaria y consistencia
+        agregados['dias'] = agregados['operaciones_dia'] = agregados['wins_dia'] = agregados['pnl_dia'] = None
+        if arrays['dia'] is not None:
+            codigos_dia, dias = pd.factorize(arrays['dia'])
+            agregados['dias'] = dias
+            agregados['operaciones_dia'] = np.bincount(codigos_dia, minlength=len(dias))
+            agregados['wins_dia'] = np.bincount(codigos_dia, weights=positivas, minlength=len(dias))
+            agregados['pnl_dia'] = np.bincount(codigos_dia, weights=g, minlength=len(dias))
+
+        for col in ('mae', 'mfe', 'etd'):
+            x = arrays[col]
+            validos = ~np.isnan(x) if x is not None else None
+            agregados[f'suma_{col}'] = x[validos].sum() if x is not None else None
+            agregados[f'n_{col}'] = int(validos.sum()) if x is not None else 0
+
+        # Racha de pérdidas más larga: mayor hueco entre dos operaciones ganadoras
+        posiciones_win = np.flatnonzero(positivas)
+        agregados['max_loss_streak'] = int(np.diff(posiciones_win, prepend=-1, append=n).max() - 1)
+
+        horas = arrays['horas']
+        fuera_por_hora = ~((horas >= reglas['HORARIO_INICIO']['valor']) & (horas <= reglas['HORARIO_FIN']['valor']))
+        agregados['fuera_horario'] = int(fuera_por_hora[arrays['hora_codigos']].sum())
+
+        agregados['sl_violations'] = 0
+        if reglas['STOP_LOSS_OBLIGATORIO']['valor'] and arrays['mae'] is not None:
+            sl_usd = reglas['RATIO_SL_PIPS']['valor'] * arrays['valor_tick']
+            agregados['sl_violations'] = int((np.abs(arrays['mae']) > sl_usd).sum())
+        return agregados
+
+    @staticmethod
+    def limite_perdida_diaria(config_cuenta) -> float:
+        """Pérdida diaria máxima en USD: `PERDIDA_DIARIA_MAX` es un % de `TAMAÑO_CUENTA` (0 = sin límite)."""
+        regla = config_cuenta.get('REGLAS', {}).get('PERDIDA_DIARIA_MAX', {})
+        return (regla.get('valor', 0) or 0) / 100 * (config_cuenta.get('TAMAÑO_CUENTA', 0) or 0)
+
+    @staticmethod
+    def componer_metricas(agregados, fecha_inicio, config_cuenta) -> dict:
+        """Dict de `calcular_metricas` a partir de los agregados (de arrays o de `AcumuladorMetricas`)."""
         fecha_hoy = datetime.now().date()
         dias_transcurridos = (fecha_hoy - fecha_inicio).days + 1
         dias_restantes = max(0, config_cuenta['DIAS_PRUEBA'] - dias_transcurridos)
 
-        pnl_actual = df['ganancias'].sum()
+        n = agregados['operaciones']
+        pnl_actual = agregados['pnl']
         objetivo = config_cuenta.get('OBJETIVO_GANANCIA', 0)
         progreso = (pnl_actual / objetivo) * 100 if objetivo else 0
 
-        pnl_acumulado = df['ganancias'].cumsum()
-        max_drawdown = (pnl_acumulado.cummax() - pnl_acumulado).max()
+        wins = agregados['wins']
+        losses = int(n - wins)
+        win_rate = (wins / n) * 100 if n > 0 else 0
 
-        df['resultado'] = np.where(df['ganancias'] > 0, 1, 0)
-        wins = int(df['resultado'].sum())
-        losses = int(len(df) - wins)
-        win_rate = (wins / len(df)) * 100 if len(df) > 0 else 0
-
-        valor_tick = df['parametros_operativos'].iloc[0]['VALOR_TICK'] if 'parametros_operativos' in df.columns else 1
-        avg_win_ticks = df[df['ganancias'] > 0]['ganancias'].mean() / valor_tick if wins > 0 else 0
-        avg_loss_ticks = df[df['ganancias'] < 0]['ganancias'].mean() / valor_tick if losses > 0 else 0
+        valor_tick = agregados['valor_tick']
+        negativas = agregados['negativas']
+        avg_win_ticks = (agregados['suma_ganadoras'] / wins) / valor_tick if wins > 0 else 0
+        avg_loss_ticks = (
+            (agregados['suma_perdedoras'] / negativas if negativas else np.nan) / valor_tick
+        ) if losses > 0 else 0
         avg_rr = abs(avg_win_ticks / avg_loss_ticks) if avg_loss_ticks != 0 else 0
 
-        gross_profit = df[df['ganancias'] > 0]['ganancias'].sum()
-        gross_loss = abs(df[df['ganancias'] < 0]['ganancias'].sum())
+        gross_profit = agregados['suma_ganadoras']
+        gross_loss = abs(agregados['suma_perdedoras'])
         profit_factor = gross_profit / gross_loss if gross_loss != 0 else 0
 
         expectancy = (
@@ -41,40 +143,24 @@ class TradeModel:
         ) / 100 if (wins + losses) > 0 else 0
 
         daily_loss_ok = "OK"
-        if 'tiempo_de_entrada' in df.columns:
-            df['fecha'] = df['tiempo_de_entrada'].dt.date
-            df_diario = df.groupby('fecha')['ganancias'].sum()
-            if any(df_diario < -config_cuenta['DRAWDOWN_MAX']):
+        avg_daily_consistency = 0
+        if agregados['pnl_dia'] is not None and n:
+            if np.any(agregados['pnl_dia'] < -config_cuenta['DRAWDOWN_MAX']):
                 daily_loss_ok = "EXCEDIDO"
+            avg_daily_consistency = ((agregados['wins_dia'] / agregados['operaciones_dia']) * 100).mean()
 
-        avg_mae = df['mae'].mean() if 'mae' in df.columns else 0
-        avg_mfe = df['mfe'].mean() if 'mfe' in df.columns else 0
-        avg_etd = df['etd'].mean() if 'etd' in df.columns else 0
-
-        daily_wins = df.groupby(df['tiempo_de_entrada'].dt.date)['resultado'].mean() * 100 if 'tiempo_de_entrada' in df.columns else pd.Series(dtype=float)
-        avg_daily_consistency = daily_wins.mean() if not daily_wins.empty else 0
-
-        df['loss_streak'] = (df['resultado'] == 0).astype(int).groupby(df['resultado'].eq(1).cumsum()).cumsum()
-        max_loss_streak = int(df['loss_streak'].max()) if 'loss_streak' in df.columns else 0
-
-        horario_inicio = config_cuenta['REGLAS']['HORARIO_INICIO']['valor']
-        horario_fin = config_cuenta['REGLAS']['HORARIO_FIN']['valor']
-        df['fuera_horario'] = ~df['hora_operacion'].between(horario_inicio, horario_fin)
-        fuera_horario_count = int(df['fuera_horario'].sum()) if 'fuera_horario' in df.columns else 0
-
-        sl_violations = 0
-        if config_cuenta['REGLAS']['STOP_LOSS_OBLIGATORIO']['valor'] and 'mae' in df.columns:
-            sl_ticks = config_cuenta['REGLAS']['RATIO_SL_PIPS']['valor']
-            sl_usd = df['parametros_operativos'].apply(lambda x: sl_ticks * x['VALOR_TICK'])
-            sl_violations = int((df['mae'].abs() > sl_usd).sum())
+        def media(col):
+            if agregados[f'suma_{col}'] is None:
+                return 0
+            return agregados[f'suma_{col}'] / agregados[f'n_{col}'] if agregados[f'n_{col}'] else np.nan
 
         return {
             'current_pnl': pnl_actual,
             'progress_to_target': progreso,
             'days_elapsed': dias_transcurridos,
             'days_remaining': dias_restantes,
-            'max_drawdown': max_drawdown,
-            'total_trades': len(df),
+            'max_drawdown': agregados['max_drawdown'],
+            'total_trades': n,
             'wins': wins,
             'losses': losses,
             'win_rate': win_rate,
@@ -84,11 +170,90 @@ class TradeModel:
             'profit_factor': profit_factor,
             'expectancy': expectancy,
             'daily_loss_status': daily_loss_ok,
-            'avg_mae': avg_mae,
-            'avg_mfe': avg_mfe,
-            'avg_etd': avg_etd,
+            'avg_mae': media('mae'),
+            'avg_mfe': media('mfe'),
+            'avg_etd': media('etd'),
             'avg_daily_consistency': avg_daily_consistency,
-            'max_loss_streak': max_loss_streak,
-            'fuera_horario_count': fuera_horario_count,
-            'sl_violations': sl_violations
+            'max_loss_streak': agregados['max_loss_streak'],
+            'fuera_horario_count': agregados['fuera_horario'],
+            'sl_violations': agregados['sl_violations']
         }
+
+    @staticmethod
+    def metricas_desde_arrays(arrays, fecha_inicio, config_cuenta) -> dict:
+        """Núcleo de `calcular_metricas` sobre los arrays de `extraer_arrays`."""
+        return TradeModel.componer_metricas(
+            TradeModel.agregados_desde_arrays(arrays, config_cuenta), fecha_inicio, config_cuenta
+        )
+
+    @staticmethod
+    def calcular_metricas(df, fecha_inicio, config_cuenta) -> dict:
+        """
+        Métricas de desempeño de `df` (operaciones ya procesadas de una cuenta).
+        Lee las columnas una vez como arrays NumPy y no modifica `df`.
+        """
+        return TradeModel.metricas_desde_arrays(TradeModel.extraer_arrays(df), fecha_inicio, config_cuenta)
+
+    @staticmethod
+    def tramos_por_cuenta(df):
+        """
+        Genera (cuenta, arrays) para cada cuenta de `df`, en orden alfabético. Las columnas
+        se leen una vez (`extraer_arrays`), se ordenan por cuenta con un único argsort estable
+        (conserva el orden de las operaciones dentro de cada cuenta) y cada cuenta recibe
+        vistas de esos arrays: no se copia el frame por cuenta. 'fila' da la posición de
+        cada operación en `df`.
+        """
+        if df.empty:
+            return
+        # Las filas sin cuenta (código -1) quedan al principio y fuera de todos los tramos
+        codigos, cuentas = pd.factorize(df['cuenta'], sort=True)
+        orden = np.argsort(codigos, kind='stable')
+        arrays = {
+            clave: (valor[orden] if clave not in TradeModel._VALORES_DISTINTOS and valor is not None else valor)
+            for clave, valor in TradeModel.extraer_arrays(df).items()
+        }
+        arrays['fila'] = orden
+        limites = np.searchsorted(codigos[orden], np.arange(len(cuentas) + 1))
+        for i, cuenta in enumerate(cuentas):
+            inicio, fin = limites[i], limites[i + 1]
+            yield cuenta, {
+                clave: (valor[inicio:fin] if clave not in TradeModel._VALORES_DISTINTOS and valor is not None else valor)
+                for clave, valor in arrays.items()
+            }
+
+    @staticmethod
+    def fecha_inicio_arrays(arrays):
+        """Fecha de la primera operación de los arrays (hoy si no hay `tiempo_de_entrada`)."""
+        if arrays['dia'] is None or not len(arrays['dia']):
+            return datetime.now().date()
+        return pd.Timestamp(np.datetime64(int(arrays['dia'].min()), 'D')).date()
+
+    @staticmethod
+    def calcular_metricas_por_cuenta(df, config_cuenta, fecha_inicio=None) -> pd.DataFrame:
+        """
+        `calcular_metricas` de todas las cuentas de `df` en una sola pasada (ver
+        `tramos_por_cuenta`). Con `fecha_inicio=None` cada cuenta cuenta sus días desde
+        su primera operación.
+
+        Devuelve un DataFrame indexado por `cuenta` con una columna por métrica, más
+        `fecha_inicio`, `drawdown_excedido` y `objetivo_alcanzado`.
+        """
+        filas = []
+        for cuenta, tramo in TradeModel.tramos_por_cuenta(df):
+            fecha = fecha_inicio or TradeModel.fecha_inicio_arrays(tramo)
+            metricas = TradeModel.metricas_desde_arrays(tramo, fecha, config_cuenta)
+            metricas['cuenta'] = cuenta
+            metricas['fecha_inicio'] = fecha
+            filas.append(metricas)
+        if not filas:
+            return pd.DataFrame().rename_axis('cuenta')
+        return TradeModel.estado_por_cuenta(pd.DataFrame(filas).set_index('cuenta'), config_cuenta)
+
+    @staticmethod
+    def estado_por_cuenta(tabla, config_cuenta) -> pd.DataFrame:
+        """Añade a la tabla por cuenta las columnas `drawdown_excedido` y `objetivo_alcanzado`."""
+        drawdown_max = config_cuenta.get('DRAWDOWN_MAX', 0)
+        objetivo = config_cuenta.get('OBJETIVO_GANANCIA', 0)
+        tabla['drawdown_excedido'] = (tabla['max_drawdown'] > drawdown_max) if drawdown_max else False
+        tabla['objetivo_alcanzado'] = (tabla['current_pnl'] >= objetivo) if objetivo else False
+        return tabla
@@ -0,0 +1,182 @@
+# models/trade_store.py
+import numpy as np
+import pandas as pd
+
+from models.session_calendar import CalendarioSesiones
+
+
+class AlmacenOperaciones:
+    """
+    Operaciones ordenadas por (cuenta, `tiempo_de_entrada`) para responder consultas por
+    rango de fechas sin máscaras sobre el frame: cada cuenta es un tramo contiguo y un
+    rango [desde, hasta) dentro de ella son dos `searchsorted` sobre los tiempos de entrada.
+    `operaciones` devuelve el corte del frame ordenado (`iloc` con slice, sin copiar filas)
+    y `arrays` vistas de los arrays NumPy.
+
+    Sumas de prefijos del PnL dan el PnL de un rango con una resta. El drawdown de un rango
+    (como `max_drawdown` de `calcular_metricas`: desde el máximo del PnL acumulado dentro
+    del rango) sale de un árbol de segmentos sobre el PnL acumulado, con máximo, mínimo y
+    drawdown por nodo: O(log n) por consulta.
+    """
+
+    def __init__(self, df, tiempos, tramos, pnl_acum, arbol):
+        self.df = df                # frame ordenado por (cuenta, tiempo_de_entrada), índice original
+        self.tiempos = tiempos      # tiempo de entrada en ns (int64) por fila de `df`
+        self.tramos = tramos        # cuenta -> (primera fila, última + 1) en `df`
+        self.pnl_acum = pnl_acum    # prefijos de `ganancias`: pnl_acum[i] = suma de las filas < i
+        self.arbol = arbol          # (máximo, mínimo, drawdown) por nodo, hojas = pnl_acum[1:]
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def cuentas(self) -> list:
+        return list(self.tramos)
+
+    @classmethod
+    def construir(cls, df) -> 'AlmacenOperaciones':
+        """Almacén de un frame de `procesar_datos` (las filas sin cuenta quedan en la cuenta '')."""
+        if 'tiempo_de_entrada' not in df.columns:
+            raise ValueError("Se necesita la columna 'tiempo_de_entrada' para ordenar las operaciones.")
+        n = len(df)
+        tiempos = df['tiempo_de_entrada'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        if 'cuenta' in df.columns:
+            codigos, cuentas = pd.factorize(df['cuenta'].astype(object).where(df['cuenta'].notna(), ''), sort=True)
+        else:
+            codigos, cuentas = np.zeros(n, dtype=np.int64), ['']
+        orden = np.lexsort((tiempos, codigos))
+        ordenado = df.iloc[orden]
+        codigos, tiempos = codigos[orden], tiempos[orden]
+
+        limites = np.searchsorted(codigos, np.arange(len(cuentas) + 1))
+        tramos = {c: (int(limites[i]), int(limites[i + 1])) for i, c in enumerate(cuentas)}
+        pnl_acum = np.concatenate(([0.0], np.cumsum(ordenado['ganancias'].to_numpy(dtype=np.float64))))
+        return cls(ordenado, tiempos, tramos, pnl_acum, cls._construir_arbol(pnl_acum[1:]))
+
+    @staticmethod
+    def _construir_arbol(valores) -> tuple:
+        """
+        Árbol de segmentos en arrays (nodo i con hijos 2i y 2i+1, hojas desde `tamaño`),
+        construido nivel a nivel con operaciones vectorizadas.
+        """
+        tamaño = 1 << max(0, int(len(valores) - 1).bit_length())
+        maximo = np.full(2 * tamaño, -np.inf)
+        minimo = np.full(2 * tamaño, np.inf)
+        caida = np.zeros(2 * tamaño)
+        maximo[tamaño:tamaño + len(valores)] = valores
+        minimo[tamaño:tamaño + len(valores)] = valores
+        nivel = tamaño // 2
+        while nivel >= 1:
+            padres = np.arange(nivel, 2 * nivel)
+            izq, der = 2 * padres, 2 * padres + 1
+            maximo[padres] = np.maximum(maximo[izq], maximo[der])
+            minimo[padres] = np.minimum(minimo[izq], minimo[der])
+            caida[padres] = np.maximum(np.maximum(caida[izq], caida[der]), maximo[izq] - minimo[der])
+            nivel //= 2
+        return maximo, minimo, caida
+
+    @staticmethod
+    def _instante(valor) -> int:
+        """Fecha u hora (str, date, datetime, Timestamp) en ns."""
+        return pd.Timestamp(valor).as_unit('ns').value
+
+    @staticmethod
+    def dia(fecha) -> tuple:
+        """
+        (desde, hasta) de la sesión CME del día `fecha`: de su apertura (17:00 CT del día
+        hábil anterior) a la de la siguiente sesión, en la hora de los tiempos de las
+        operaciones (ver `CalendarioSesiones.limites`).
+        """
+        inicio = pd.Timestamp(fecha).normalize()
+        return CalendarioSesiones.limites(inicio, inicio + pd.Timedelta(days=1))
+
+    @staticmethod
+    def semana(fecha) -> tuple:
+        """
+        (desde, hasta) de las sesiones de la semana lunes-domingo de `fecha`, de la apertura
+        del domingo a las 17:00 CT a la de la semana siguiente (como `MotorReglas._agregado_semanal`),
+        en la hora de los tiempos de las operaciones.
+        """
+        inicio = pd.Timestamp(fecha).normalize()
+        inicio -= pd.Timedelta(days=inicio.dayofweek)
+        return CalendarioSesiones.limites(inicio, inicio + pd.Timedelta(days=7))
+
+    def rango(self, cuenta, desde=None, hasta=None) -> tuple:
+        """Filas [inicio, fin) de `df` de la cuenta con entrada en [desde, hasta) (None = sin límite)."""
+        if cuenta not in self.tramos:
+            raise ValueError(f"Cuenta desconocida: {cuenta}")
+        primera, ultima = self.tramos[cuenta]
+        tiempos = self.tiempos[primera:ultima]
+        inicio = primera if desde is None else primera + int(np.searchsorted(tiempos, self._instante(desde)))
+        fin = ultima if hasta is None else primera + int(np.searchsorted(tiempos, self._instante(hasta)))
+        return inicio, max(inicio, fin)
+
+    def operaciones(self, cuenta, desde=None, hasta=None) -> pd.DataFrame:
+        """Operaciones de la cuenta con entrada en [desde, hasta), en orden de entrada (corte de `df`)."""
+        inicio, fin = self.rango(cuenta, desde, hasta)
+        return self.df.iloc[inicio:fin]
+
+    def arrays(self, cuenta, desde=None, hasta=None, columnas=('ganancias',)) -> dict:
+        """Vistas NumPy de `columnas` y 'tiempos' (ns) de las operaciones del rango."""
+        inicio, fin = self.rango(cuenta, desde, hasta)
+        r = {'tiempos': self.tiempos[inicio:fin]}
+        for col in columnas:
+            r[col] = self.df[col].to_numpy()[inicio:fin]
+        return r
+
+    def pnl(self, cuenta, desde=None, hasta=None) -> float:
+        """PnL de las operaciones del rango."""
+        return self._pnl_filas(*self.rango(cuenta, desde, hasta))
+
+    def _pnl_filas(self, inicio, fin) -> float:
+        return float(self.pnl_acum[fin] - self.pnl_acum[inicio])
+
+    def drawdown(self, cuenta, desde=None, hasta=None) -> float:
+        """
+        Drawdown máximo del PnL acumulado de las operaciones del rango (NaN sin operaciones),
+        como `max_drawdown` de `calcular_metricas` sobre ese corte.
+        """
+        return self._drawdown_filas(*self.rango(cuenta, desde, hasta))
+
+    def _drawdown_filas(self, inicio, fin) -> float:
+        if fin <= inicio:
+            return np.nan
+        maximo, minimo, caida = self.arbol
+        tamaño = len(maximo) // 2
+        # Acumuladores de izquierda (en orden) y de derecha (en orden inverso): (máximo, mínimo, drawdown)
+        izq, der = (-np.inf, np.inf, 0.0), (-np.inf, np.inf, 0.0)
+
+        def unir(a, b):
+            return max(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2], a[0] - b[1])
+
+        i, j = inicio + tamaño, fin + tamaño
+        while i < j:
+            if i & 1:
+                izq = unir(izq, (maximo[i], minimo[i], caida[i]))
+                i += 1
+            if j & 1:
+                j -= 1
+                der = unir((maximo[j], minimo[j], caida[j]), der)
+            i //= 2
+            j //= 2
+        return float(unir(izq, der)[2])
+
+    def primera_entrada(self, cuenta=None) -> pd.Timestamp:
+        """Primera entrada de la cuenta (o de todas las cuentas con `cuenta=None`)."""
+        tramos = self.tramos.values() if cuenta is None else [self.rango(cuenta)]
+        primeras = [self.tiempos[inicio] for inicio, fin in tramos if fin > inicio]
+        return pd.Timestamp(min(primeras)) if primeras else pd.NaT
+
+    def por_cuenta(self, desde=None, hasta=None) -> pd.DataFrame:
+        """Operaciones, PnL y drawdown del rango [desde, hasta) de cada cuenta."""
+        filas = {}
+        for cuenta in self.tramos:
+            inicio, fin = self.rango(cuenta, desde, hasta)
+            filas[cuenta] = {
+                'operaciones': fin - inicio,
+                'pnl': self._pnl_filas(inicio, fin),
+                'max_drawdown': self._drawdown_filas(inicio, fin),
+            }
+        tabla = pd.DataFrame.from_dict(filas, orient='index')
+        tabla.index.name = 'cuenta'
+        return tabla
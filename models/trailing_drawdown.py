@@ -0,0 +1,146 @@
+# models/trailing_drawdown.py
+import numpy as np
+import pandas as pd
+
+from models.trade_model import TradeModel
+
+ESCENARIOS = ('cierre', 'mejor', 'peor')
+
+
+class DrawdownIntradia:
+    """
+    Umbral de trailing drawdown (estilo Apex) sobre el saldo de la cuenta, reconstruyendo
+    el recorrido intradía de cada operación con su MAE y MFE:
+    - alto = saldo previo + MFE, bajo = saldo previo - MAE (y el cierre, saldo previo + ganancia)
+    - 'peor': el máximo no realizado llega antes que el mínimo (el umbral ya subió cuando
+      se toca el bajo); 'mejor': el mínimo llega primero; 'cierre': solo saldos al cierre
+    El umbral es (máximo del saldo) - límite, opcionalmente congelado en `tope_umbral`.
+    Con `TIPO_DRAWDOWN == 'fin_dia'` el máximo solo se actualiza con los cierres de cada
+    día, así que el orden dentro de la operación no importa ('mejor' == 'peor').
+
+    Todo son máximos acumulados y máscaras sobre arrays: sin bucles por operación.
+    """
+
+    @staticmethod
+    def limite(config_cuenta):
+        """Límite en USD: la regla TRAILING_DRAWDOWN si tiene valor, si no `DRAWDOWN_MAX` (0 = sin límite)."""
+        regla = config_cuenta.get('REGLAS', {}).get('TRAILING_DRAWDOWN', {})
+        return regla.get('valor', 0) or config_cuenta.get('DRAWDOWN_MAX', 0) or 0
+
+    @staticmethod
+    def recorrido(arrays, saldo_inicial, limite, fin_dia=False, tope_umbral=None,
+                  excursion_por_contrato=False) -> dict:
+        """
+        Recorrido de una cuenta sobre los arrays de `TradeModel.extraer_arrays` (operaciones en orden).
+        Devuelve arrays por operación: 'saldo' (al cierre), 'bajo', 'alto' y, por escenario,
+        'umbral_<escenario>' (el vigente al tocar el punto evaluado) y 'margen_<escenario>'
+        (punto evaluado - umbral; negativo = umbral roto).
+        `excursion_por_contrato=True` multiplica MAE/MFE por `cant` (exports con excursión por contrato).
+        """
+        g = arrays['ganancias']
+        n = len(g)
+        mae = np.abs(arrays['mae']) if arrays['mae'] is not None else np.zeros(n)
+        mfe = np.abs(arrays['mfe']) if arrays['mfe'] is not None else np.zeros(n)
+        if excursion_por_contrato and arrays['cant'] is not None:
+            mae, mfe = mae * arrays['cant'], mfe * arrays['cant']
+
+        saldo = saldo_inicial + np.cumsum(g)
+        previo = np.concatenate(([saldo_inicial], saldo[:-1]))
+        alto = np.maximum(previo + mfe, saldo)
+        bajo = np.minimum(previo - mae, saldo)
+
+        def umbral(pico):
+            u = pico - limite
+            return np.minimum(u, tope_umbral) if tope_umbral is not None else u
+
+        def anterior(pico):
+            return np.concatenate(([saldo_inicial], pico[:-1]))
+
+        r = {'saldo': saldo, 'bajo': bajo, 'alto': alto}
+        if fin_dia and arrays['dia'] is not None:
+            # Solo cuenta el saldo de la última operación de cada día
+            ultima_del_dia = np.append(arrays['dia'][1:] != arrays['dia'][:-1], True)
+            cierres = np.where(ultima_del_dia, saldo, -np.inf)
+            u = umbral(anterior(np.maximum.accumulate(np.maximum(cierres, saldo_inicial))))
+            r['umbral_cierre'] = r['umbral_mejor'] = r['umbral_peor'] = u
+            r['margen_cierre'] = saldo - u
+            r['margen_mejor'] = r['margen_peor'] = bajo - u
+            return r
+
+        pico_cierre = np.maximum.accumulate(np.maximum(saldo, saldo_inicial))
+        pico = np.maximum.accumulate(np.maximum(alto, saldo_inicial))
+        r['umbral_cierre'] = umbral(pico_cierre)
+        r['margen_cierre'] = saldo - r['umbral_cierre']
+        r['umbral_peor'] = umbral(pico)
+        r['margen_peor'] = bajo - r['umbral_peor']
+        # Mejor caso: el bajo se toca con el umbral de antes de la operación y, tras el alto,
+        # el cierre aún debe quedar por encima del umbral actualizado
+        r['umbral_mejor'] = umbral(anterior(pico))
+        r['margen_mejor'] = np.minimum(bajo - r['umbral_mejor'], saldo - r['umbral_peor'])
+        return r
+
+    @staticmethod
+    def resumen(recorrido, limite) -> dict:
+        """
+        Por escenario: si se rompe el umbral, en qué posición (0 = primera operación, None si
+        no se rompe) y el margen mínimo. Sin límite (`limite` 0) nunca hay ruptura.
+        """
+        r = {'saldo_minimo': recorrido['bajo'].min() if len(recorrido['bajo']) else np.nan}
+        for escenario in ESCENARIOS:
+            margen = recorrido[f'margen_{escenario}']
+            rotas = margen < 0 if limite else np.zeros(len(margen), dtype=bool)
+            posicion = int(rotas.argmax()) if rotas.any() else None
+            r[f'ruptura_{escenario}'] = posicion is not None
+            r[f'posicion_{escenario}'] = posicion
+            r[f'margen_minimo_{escenario}'] = margen.min() if len(margen) else np.nan
+            r[f'umbral_{escenario}'] = recorrido[f'umbral_{escenario}'][posicion] if posicion is not None else np.nan
+        return r
+
+    @classmethod
+    def parametros(cls, config_cuenta, **opciones) -> dict:
+        """Saldo inicial, límite y tipo de trailing de la plantilla (sobrescribibles con `opciones`)."""
+        parametros = {
+            'saldo_inicial': config_cuenta.get('TAMAÑO_CUENTA', 0) or 0,
+            'limite': cls.limite(config_cuenta),
+            'fin_dia': config_cuenta.get('TIPO_DRAWDOWN') == 'fin_dia',
+        }
+        parametros.update(opciones)
+        return parametros
+
+    @classmethod
+    def trayectoria(cls, df, config_cuenta, **opciones) -> pd.DataFrame:
+        """
+        Recorrido por operación de una cuenta (`df` en orden de entrada), con el índice de `df`:
+        saldo, bajo, alto, umbral_* y margen_* de cada escenario.
+        """
+        p = cls.parametros(config_cuenta, **opciones)
+        return pd.DataFrame(cls.recorrido(TradeModel.extraer_arrays(df), **p), index=df.index)
+
+    @classmethod
+    def por_cuenta(cls, df, config_cuenta, **opciones) -> pd.DataFrame:
+        """
+        Resumen de todas las cuentas de `df` (ver `TradeModel.tramos_por_cuenta`), indexado por
+        `cuenta`: por escenario, si se rompe el umbral, la fila de `df` de la operación que lo
+        rompe (`operacion_<escenario>`, su etiqueta de índice), su `tiempo_de_entrada`,
+        el umbral en ese momento y el margen mínimo.
+        """
+        p = cls.parametros(config_cuenta, **opciones)
+        filas = []
+        for cuenta, tramo in TradeModel.tramos_por_cuenta(df):
+            resumen = cls.resumen(cls.recorrido(tramo, **p), p['limite'])
+            fila = {'cuenta': cuenta, 'limite': p['limite'], 'saldo_minimo': resumen['saldo_minimo']}
+            for escenario in ESCENARIOS:
+                posicion = resumen[f'posicion_{escenario}']
+                fila_df = tramo['fila'][posicion] if posicion is not None else None
+                fila[f'ruptura_{escenario}'] = resumen[f'ruptura_{escenario}']
+                fila[f'operacion_{escenario}'] = df.index[fila_df] if fila_df is not None else None
+                fila[f'tiempo_{escenario}'] = (
+                    df['tiempo_de_entrada'].iloc[fila_df]
+                    if fila_df is not None and 'tiempo_de_entrada' in df.columns else pd.NaT
+                )
+                fila[f'umbral_{escenario}'] = resumen[f'umbral_{escenario}']
+                fila[f'margen_minimo_{escenario}'] = resumen[f'margen_minimo_{escenario}']
+            filas.append(fila)
+        if not filas:
+            return pd.DataFrame().rename_axis('cuenta')
+        return pd.DataFrame(filas).set_index('cuenta')
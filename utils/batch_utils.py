@@ -0,0 +1,96 @@
+# utils/batch_utils.py
+import os
+import glob
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import CacheManager
+from utils.data_utils import aplicar_config_cuenta, compactar_datos
+
+# Columnas que identifican una operación entre exportaciones solapadas del NinjaTrader Grid
+CLAVE_OPERACION = [
+    'cuenta', 'instrumento', 'tiempo_de_entrada', 'tiempo_de_salida',
+    'precio_de_entrada', 'precio_de_salida', 'cant'
+]
+
+def listar_archivos_csv(origen) -> list:
+    """
+    Resuelve `origen` a una lista ordenada de rutas CSV:
+    una carpeta (todos sus *.csv), un patrón glob o una lista de rutas.
+    """
+    if isinstance(origen, (list, tuple)):
+        return sorted(origen)
+    if os.path.isdir(origen):
+        return sorted(glob.glob(os.path.join(origen, '*.csv')))
+    return sorted(glob.glob(origen))
+
+def _procesar_archivo(ruta: str) -> pd.DataFrame:
+    """Carga y procesa (etapa base) un único CSV en un proceso del pool, usando la caché."""
+    df = CacheManager.cargar_base(ruta)
+    df['archivo_origen'] = os.path.basename(ruta)
+    return df
+
+def _hash_operaciones(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash uint64 por fila sobre CLAVE_OPERACION más el número de aparición de esa clave
+    dentro de su archivo: así se conservan operaciones idénticas legítimas de un mismo
+    export y solo se descartan las repetidas entre exportaciones.
+    """
+    claves = [c for c in CLAVE_OPERACION if c in df.columns]
+    h = pd.util.hash_pandas_object(df[claves], index=False)
+    ocurrencia = h.groupby([df['archivo_origen'].to_numpy(), h.to_numpy()]).cumcount()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({'h': h.to_numpy(), 'n': ocurrencia.to_numpy()}), index=False
+    ).to_numpy()
+
+def _recalcular_acumulados(df: pd.DataFrame) -> pd.DataFrame:
+    """Recalcula las columnas que dependen del orden (mismas fórmulas que `procesar_datos`)."""
+    df['pnl_acum'] = df['pnl_neto'].cumsum()
+    df['equity_peak'] = df['pnl_acum'].cummax()
+    df['drawdown'] = (df['equity_peak'] - df['pnl_acum']).abs()
+    df['loss_streak'] = (df['resultado'] == 0).astype(int).groupby(
+        df['resultado'].eq(1).cumsum()
+    ).cumsum()
+    return df
+
+def cargar_operaciones_lote(origen, config_cuenta: dict = None, procesos: int = None,
+                            compacto: bool = False) -> pd.DataFrame:
+    """
+    Ingesta en lote de todos los exports de una carpeta (p.ej. `Operaciones/`) o patrón glob.
+    Cada archivo se carga y procesa en un pool de procesos; los resultados se unen,
+    se eliminan las operaciones repetidas entre exportaciones por hash de CLAVE_OPERACION
+    y se recalculan las columnas acumuladas sobre la historia combinada.
+    Sin `config_cuenta` devuelve el frame base (ver `procesar_datos_base`).
+    Los archivos que no se pueden procesar se omiten con un aviso.
+    Con `compacto=True` el resultado se reduce con `compactar_datos` (historias largas).
+    """
+    rutas = listar_archivos_csv(origen)
+    if not rutas:
+        raise ValueError(f"No se encontraron archivos CSV en: {origen}")
+
+    # Los más grandes primero: el tiempo total se acerca al del archivo más pesado
+    rutas = sorted(rutas, key=os.path.getsize, reverse=True)
+    procesos = min(procesos or os.cpu_count() or 1, len(rutas))
+
+    frames = []
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = {ruta: pool.submit(_procesar_archivo, ruta) for ruta in rutas}
+        for ruta, futuro in futuros.items():
+            try:
+                frames.append(futuro.result())
+            except Exception as e:
+                warnings.warn(f"Se omite {os.path.basename(ruta)}: {e}")
+
+    if not frames:
+        raise ValueError("Ningún archivo pudo procesarse.")
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df[~pd.Series(_hash_operaciones(df)).duplicated().to_numpy()]
+    df = df.sort_values(['tiempo_de_entrada', 'archivo_origen'], kind='stable').reset_index(drop=True)
+    df = _recalcular_acumulados(df)
+    if config_cuenta:
+        df = aplicar_config_cuenta(df, config_cuenta)
+    return compactar_datos(df) if compacto else df
@@ -0,0 +1,158 @@
+# utils/cache_utils.py
+import os
+import json
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+from utils.data_utils import (
+    cargar_datos_csv, procesar_datos_base, aplicar_config_cuenta, _perfil_archivo, VERSION_PARSER
+)
+from models.session_calendar import CalendarioSesiones
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow es opcional: sin él la caché queda desactivada
+    feather = None
+
+
+class CacheManager:
+    """
+    Caché de frames base (`procesar_datos_base`) en memoria y en disco (formato columnar
+    Feather/Arrow). La clave es el hash del contenido del CSV + VERSION_PARSER + lo que
+    decide cómo se interpreta (perfil de exportación, zona de los tiempos y fuente del
+    calendario de sesiones), así que renombrar o mover un export no invalida su entrada,
+    y como el frame base no depende de la plantilla, cambiar de plantilla nunca vuelve a parsear.
+    Tamaño en disco acotado con desalojo LRU (por fecha de último acceso del archivo).
+    """
+
+    RUTA_CACHE = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache_operaciones")
+    TAMANO_MAXIMO_BYTES = 512 * 1024 * 1024
+    MAX_ENTRADAS_MEMORIA = 8
+    EXTENSION = ".feather"
+    _memoria = OrderedDict()
+
+    @staticmethod
+    def disponible():
+        """True si pyarrow está instalado y la caché puede usarse."""
+        return feather is not None
+
+    @staticmethod
+    def hash_archivo(ruta_archivo, bloque=1024 * 1024):
+        """Hash blake2b del contenido del archivo, leído por bloques."""
+        h = hashlib.blake2b(digest_size=16)
+        with open(ruta_archivo, "rb") as f:
+            for trozo in iter(lambda: f.read(bloque), b""):
+                h.update(trozo)
+        return h.hexdigest()
+
+    @classmethod
+    def clave(cls, ruta_archivo):
+        """
+        Clave de caché: contenido del CSV + versión del parser + perfil detectado (formato
+        de fecha, zona, columnas...) + zona de los tiempos + fuente del calendario de sesiones.
+        """
+        perfil, _ = _perfil_archivo(ruta_archivo)
+        perfil = {k: v for k, v in perfil.items() if k != 'indice'} if perfil is not None else None
+        h = hashlib.blake2b(digest_size=16)
+        h.update(cls.hash_archivo(ruta_archivo).encode())
+        h.update(f"v{VERSION_PARSER}".encode())
+        h.update(json.dumps(perfil, sort_keys=True, ensure_ascii=False).encode())
+        h.update(CalendarioSesiones.firma_zona(perfil and perfil.get('zona_horaria')).encode())
+        h.update(CalendarioSesiones.fuente().encode())
+        return h.hexdigest()
+
+    @classmethod
+    def _ruta_entrada(cls, clave):
+        return os.path.join(cls.RUTA_CACHE, clave + cls.EXTENSION)
+
+    @classmethod
+    def obtener(cls, clave):
+        """DataFrame cacheado para `clave` o None. Un acierto renueva su posición LRU."""
+        if not cls.disponible():
+            return None
+        ruta = cls._ruta_entrada(clave)
+        if not os.path.isfile(ruta):
+            return None
+        try:
+            df = feather.read_feather(ruta)
+        except Exception:
+            return None
+        os.utime(ruta)
+        return df
+
+    @classmethod
+    def guardar(cls, clave, df):
+        """Escribe `df` en la caché y desaloja entradas antiguas si se supera el tamaño máximo."""
+        if not cls.disponible():
+            return
+        os.makedirs(cls.RUTA_CACHE, exist_ok=True)
+        ruta = cls._ruta_entrada(clave)
+        # Temporal único: dos workers pueden escribir la misma clave (exports idénticos)
+        descriptor, temporal = tempfile.mkstemp(dir=cls.RUTA_CACHE, suffix=".tmp")
+        os.close(descriptor)
+        try:
+            feather.write_feather(df.reset_index(drop=True), temporal, compression="lz4")
+            os.replace(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        cls.desalojar()
+
+    @classmethod
+    def desalojar(cls, tamano_maximo=None):
+        """Borra las entradas menos usadas recientemente hasta quedar bajo `tamano_maximo` bytes."""
+        tamano_maximo = cls.TAMANO_MAXIMO_BYTES if tamano_maximo is None else tamano_maximo
+        if not os.path.isdir(cls.RUTA_CACHE):
+            return
+        entradas = []
+        for nombre in os.listdir(cls.RUTA_CACHE):
+            if nombre.endswith(cls.EXTENSION):
+                info = os.stat(os.path.join(cls.RUTA_CACHE, nombre))
+                entradas.append((info.st_mtime, info.st_size, nombre))
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, nombre in sorted(entradas):
+            if total <= tamano_maximo:
+                break
+            try:
+                os.remove(os.path.join(cls.RUTA_CACHE, nombre))
+                total -= tamano
+            except OSError:
+                pass
+
+    @classmethod
+    def limpiar(cls):
+        """Vacía la caché completa (memoria y disco)."""
+        cls._memoria.clear()
+        cls.desalojar(tamano_maximo=0)
+
+    @classmethod
+    def _memorizar(cls, clave, df):
+        cls._memoria[clave] = df
+        cls._memoria.move_to_end(clave)
+        while len(cls._memoria) > cls.MAX_ENTRADAS_MEMORIA:
+            cls._memoria.popitem(last=False)
+
+    @classmethod
+    def cargar_base(cls, ruta_archivo):
+        """
+        `procesar_datos_base(cargar_datos_csv(ruta))` servido desde memoria o disco si el
+        export ya se vio. Devuelve una copia superficial: añadir columnas no altera la caché.
+        """
+        clave = cls.clave(ruta_archivo)
+        df = cls._memoria.get(clave)
+        if df is None:
+            df = cls.obtener(clave)
+        if df is None:
+            df = procesar_datos_base(cargar_datos_csv(ruta_archivo))
+            try:
+                cls.guardar(clave, df)
+            except (OSError, ValueError, TypeError):
+                pass  # la caché nunca debe impedir cargar los datos
+        cls._memorizar(clave, df)
+        return df.copy(deep=False)
+
+    @classmethod
+    def cargar_procesado(cls, ruta_archivo, config_cuenta):
+        """Equivalente a `procesar_datos(cargar_datos_csv(ruta), config_cuenta)` usando la caché."""
+        return aplicar_config_cuenta(cls.cargar_base(ruta_archivo), config_cuenta)
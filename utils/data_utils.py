@@ -2,6 +2,14 @@
 import pandas as pd
 import numpy as np
 import string
+import re
+from functools import lru_cache
+
+from utils.format_utils import FormatosManager
+from models.session_calendar import CalendarioSesiones
+
+# Versión del flujo de `procesar_datos`: subirla invalida los resultados cacheados
+VERSION_PARSER = 5
 
 def validar_numerico(x):
     """Verificar si un valor se puede convertir a float. Retorna 0 si OK, 1 si error."""
@@ -22,6 +30,12 @@ def validar_fecha(x):
     except:
         return 1
 
+# Símbolos de moneda que se eliminan (en este orden) antes de convertir a float
+SIMBOLOS_MONEDA = ['$', '€', '£', '¥', 'R$', 'USD', 'EUR', 'GBP', 'JPY', 'CAD', 'AUD', 'CHF', 'NZD', 'MXN', 'COP', 'CLP', 'PEN', 'ARS', 'BRL']
+
+# Cadenas que `float()` acepta sin ambigüedad tras la normalización
+_PATRON_FLOAT_SIMPLE = r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+
 def limpiar_numerico(x):
     """
     Convierte cadenas a float, eliminando símbolos de moneda y separadores.
@@ -31,7 +45,7 @@ def limpiar_numerico(x):
         return 0.0
     x_str = str(x).strip()
     # Quitar símbolos comunes de moneda
-    for simb in ['$', '€', '£', '¥', 'R$', 'USD', 'EUR', 'GBP', 'JPY', 'CAD', 'AUD', 'CHF', 'NZD', 'MXN', 'COP', 'CLP', 'PEN', 'ARS', 'BRL']:
+    for simb in SIMBOLOS_MONEDA:
         x_str = x_str.replace(simb, '')
     x_str = x_str.replace('%', '').replace(' ', '').rstrip(',')
     x_str = x_str.replace(',', '.')
@@ -45,6 +59,103 @@ def limpiar_numerico(x):
     except (ValueError, TypeError):
         return 0.0
 
+def _float_o_cero(x_str):
+    """float() de Python con 0.0 como valor de error (ruta lenta de `limpiar_numerico_serie`)."""
+    try:
+        return float(x_str)
+    except (ValueError, TypeError):
+        return 0.0
+
+def _normalizar_cadenas_numericas(s: pd.Series) -> pd.Series:
+    """Aplica a una serie de str los mismos reemplazos que `limpiar_numerico`, en el mismo orden."""
+    # Ruta rápida: sin letras ni símbolos raros, la secuencia strip/símbolos/'%'/' '
+    # se reduce a borrar '$', '%' y espacios de una sola pasada.
+    rapidas = s.str.fullmatch(r'[-+\d.,$% ]*')
+    if not rapidas.all():
+        lentas = s[~rapidas].str.strip().str.replace('$', '', regex=False)
+        for simb in SIMBOLOS_MONEDA[1:]:
+            lentas = lentas.str.replace(simb, '', regex=False)
+        s = s.copy()
+        s[~rapidas] = lentas.str.replace('%', '', regex=False)
+    s = s.str.replace(r'[$% ]', '', regex=True).str.rstrip(',').str.replace(',', '.', regex=False)
+
+    # Más de un punto: solo el último es decimal; 'x.' -> 'x'
+    n_puntos = s.str.count(r'\.')
+    multiples = n_puntos > 1
+    if multiples.any():
+        s[multiples] = s[multiples].str.replace(r'\.(?=.*\.)', '', regex=True)
+    final_punto = (n_puntos == 1) & s.str.endswith('.')
+    if final_punto.any():
+        s[final_punto] = s[final_punto].str[:-1]
+    return s
+
+# Símbolos de moneda de `SIMBOLOS_MONEDA`, los más largos primero ('R$' antes que '$')
+_PATRON_SIMBOLOS = '|'.join(re.escape(simb) for simb in sorted(SIMBOLOS_MONEDA, key=len, reverse=True))
+
+def _normalizar_importes(s: pd.Series, moneda: dict) -> pd.Series:
+    """
+    Importes en str con el formato `moneda` de un perfil de exportación ('decimal', 'miles',
+    'negativo_parentesis') -> texto que `float()` acepta: sin símbolos de moneda, '%' ni
+    espacios, sin separador de miles, '.' decimal y '(x)' como '-x' si el perfil lo indica.
+    """
+    s = s.str.replace(_PATRON_SIMBOLOS, '', regex=True).str.replace(r'[%\s]', '', regex=True)
+    if moneda.get('negativo_parentesis'):
+        s = s.str.replace(r'^-?\((.*)\)$', r'-\1', regex=True)
+    if moneda.get('miles'):
+        s = s.str.replace(moneda['miles'], '', regex=False)
+    if moneda.get('decimal', '.') != '.':
+        s = s.str.replace(moneda['decimal'], '.', regex=False)
+    return s
+
+def limpiar_numerico_serie(serie: pd.Series, moneda: dict = None) -> pd.Series:
+    """
+    Versión por columna de `limpiar_numerico`: mismo resultado celda a celda,
+    pero con operaciones vectorizadas de `.str` y regex en lugar de un bucle Python.
+    Ejemplos: '$ 45,00' -> 45.0, '-$ 1.055,00' -> -1055.0, '$ (12,50)' -> 0.0.
+    Con el formato `moneda` de un perfil (ver `_normalizar_importes`) los separadores y
+    los negativos salen del perfil: en inglés '($75.00)' -> -75.0 y '$1,076' -> 1076.0.
+    """
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        # str(float) siempre vuelve a dar el mismo float: no hay nada que limpiar
+        return serie.astype(float).fillna(0.0)
+
+    resultado = np.zeros(len(serie), dtype=float)
+    validos = serie.notna().to_numpy()
+    if not validos.any():
+        return pd.Series(resultado, index=serie.index)
+
+    # Los importes se repiten mucho (múltiplos del tick): cada valor distinto se limpia una vez
+    codigos, unicos = pd.factorize(serie[validos].astype(str))
+    unicos = pd.Series(unicos, dtype=object)
+    s = _normalizar_cadenas_numericas(unicos) if moneda is None else _normalizar_importes(unicos, moneda)
+
+    valores = np.zeros(len(s), dtype=float)
+    simples = s.str.fullmatch(_PATRON_FLOAT_SIMPLE).to_numpy()
+    if simples.any():
+        valores[simples] = s[simples].astype(float).to_numpy()
+    if not simples.all():
+        valores[~simples] = s[~simples].map(_float_o_cero).to_numpy(dtype=float)
+
+    resultado[validos] = valores[codigos]
+    return pd.Series(resultado, index=serie.index)
+
+# Variantes latinas de AM/PM que se normalizan antes de parsear (en este orden)
+MARCAS_AM = ['a m', 'am', 'a.m.', 'A M', 'AM', 'A.M.']
+MARCAS_PM = ['p m', 'pm', 'p.m.', 'P M', 'PM', 'P.M.']
+
+# Formatos de fecha/hora probados en orden por `parsear_fecha_hora`
+FORMATOS_FECHA = [
+    '%d/%m/%Y %H:%M:%S', '%d-%m-%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S', '%m-%d-%Y %H:%M:%S',
+    '%Y/%m/%d %H:%M:%S', '%Y-%m-%d %H:%M:%S',
+    '%d/%m/%Y %I:%M:%S %p', '%d-%m-%Y %I:%M:%S %p',
+    '%m/%d/%Y %I:%M:%S %p', '%m-%d-%Y %I:%M:%S %p',
+    '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M',
+    '%m/%d/%Y %H:%M', '%m-%d-%Y %H:%M',
+    '%Y/%m/%d %H:%M', '%Y-%m-%d %H:%M',
+    '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y', '%m-%d-%Y', '%Y/%m/%d', '%Y-%m-%d'
+]
+
 def parsear_fecha_hora(x):
     """
     Intenta convertir múltiples formatos de fecha/hora a pd.Timestamp.
@@ -53,23 +164,12 @@ def parsear_fecha_hora(x):
     if pd.isna(x) or x == '':
         return pd.NaT
     s = str(x).strip().replace('Â', '').replace('\u00a0', ' ').replace('\xa0', ' ')
-    for am in ['a m', 'am', 'a.m.', 'A M', 'AM', 'A.M.']:
+    for am in MARCAS_AM:
         s = s.replace(am, 'AM')
-    for pm in ['p m', 'pm', 'p.m.', 'P M', 'PM', 'P.M.']:
+    for pm in MARCAS_PM:
         s = s.replace(pm, 'PM')
 
-    formatos = [
-        '%d/%m/%Y %H:%M:%S', '%d-%m-%Y %H:%M:%S',
-        '%m/%d/%Y %H:%M:%S', '%m-%d-%Y %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S', '%Y-%m-%d %H:%M:%S',
-        '%d/%m/%Y %I:%M:%S %p', '%d-%m-%Y %I:%M:%S %p',
-        '%m/%d/%Y %I:%M:%S %p', '%m-%d-%Y %I:%M:%S %p',
-        '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M',
-        '%m/%d/%Y %H:%M', '%m-%d-%Y %H:%M',
-        '%Y/%m/%d %H:%M', '%Y-%m-%d %H:%M',
-        '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y', '%m-%d-%Y', '%Y/%m/%d', '%Y-%m-%d'
-    ]
-    for fmt in formatos:
+    for fmt in FORMATOS_FECHA:
         try:
             resultado = pd.to_datetime(s, format=fmt, errors='coerce')
             if not pd.isna(resultado):
@@ -84,6 +184,83 @@ def parsear_fecha_hora(x):
     except:
         return pd.NaT
 
+# Cadenas cuyo único texto es la marca AM/PM final: admiten normalización en una pasada
+_PATRON_FECHA_SIMPLE = r'[\d/:\-. ]*(?:a m|am|a\.m\.|A M|AM|A\.M\.|p m|pm|p\.m\.|P M|PM|P\.M\.)?'
+_TAMANO_MUESTRA_FECHA = 200
+
+def _normalizar_cadenas_fecha(s: pd.Series) -> pd.Series:
+    """Aplica a una serie de str la misma normalización de `parsear_fecha_hora`."""
+    s = s.str.strip().str.replace('Â', '', regex=False).str.replace('\xa0', ' ', regex=False)
+    simples = s.str.fullmatch(_PATRON_FECHA_SIMPLE)
+    if not simples.all():
+        lentas = s[~simples]
+        for am in MARCAS_AM:
+            lentas = lentas.str.replace(am, 'AM', regex=False)
+        for pm in MARCAS_PM:
+            lentas = lentas.str.replace(pm, 'PM', regex=False)
+        s = s.copy()
+        s[~simples] = lentas
+    s = s.str.replace(r'(?:a m|am|a\.m\.|A M|A\.M\.)$', 'AM', regex=True)
+    return s.str.replace(r'(?:p m|pm|p\.m\.|P M|P\.M\.)$', 'PM', regex=True)
+
+def _forma_formato(fmt: str) -> str:
+    """'%d/%m/%Y %H:%M' -> '%F/%F/%F %H:%M': formatos que solo difieren en el orden día/mes/año."""
+    return re.sub(r'%[dmY]', '%F', fmt)
+
+@lru_cache(maxsize=64)
+def _inferir_formato_fecha(muestra: tuple):
+    """
+    Formato de FORMATOS_FECHA que más filas de la muestra resuelve primero (mismo orden que
+    `parsear_fecha_hora`). Cacheado por muestra: recargar el mismo export no vuelve a inferir.
+    """
+    pendientes = pd.Series(muestra, dtype=object)
+    conteo = {}
+    for fmt in FORMATOS_FECHA:
+        if pendientes.empty:
+            break
+        ok = pd.to_datetime(pendientes, format=fmt, errors='coerce').notna()
+        if ok.any():
+            conteo[fmt] = int(ok.sum())
+            pendientes = pendientes[~ok]
+    return max(conteo, key=conteo.get) if conteo else None
+
+def parsear_fecha_hora_serie(serie: pd.Series, formato: str = None) -> pd.Series:
+    """
+    Versión por columna de `parsear_fecha_hora`: normaliza AM/PM con operaciones `.str`,
+    infiere el formato ganador con una muestra y parsea toda la columna en una sola
+    llamada a `pd.to_datetime`. Solo las filas que fallan pasan por la ruta lenta.
+    Con `formato` (p.ej. el del perfil de exportación) no se infiere nada.
+    """
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    validos = (serie.notna() & (serie.astype(str) != '')).to_numpy()
+    if not validos.any():
+        return resultado
+
+    crudos = serie[validos].reset_index(drop=True)
+    s = _normalizar_cadenas_fecha(crudos.astype(str))
+    if formato:
+        fechas = pd.to_datetime(s, format=formato, errors='coerce')
+    else:
+        muestra = s.drop_duplicates().head(_TAMANO_MUESTRA_FECHA)
+        fmt = _inferir_formato_fecha(tuple(muestra))
+        fechas = pd.Series(pd.NaT, index=s.index, dtype='datetime64[ns]')
+        if fmt is not None:
+            fechas = pd.to_datetime(s, format=fmt, errors='coerce')
+            # Un formato anterior con la misma forma (p.ej. día/mes antes que mes/día) tiene prioridad
+            anteriores = FORMATOS_FECHA[:FORMATOS_FECHA.index(fmt)]
+            for previo in reversed([f for f in anteriores if _forma_formato(f) == _forma_formato(fmt)]):
+                previas = pd.to_datetime(s, format=previo, errors='coerce')
+                fechas = previas.where(previas.notna(), fechas)
+
+    fallidas = fechas.isna().to_numpy()
+    if fallidas.any():
+        # Las celdas inválidas suelen repetirse: cada valor distinto pasa una sola vez por la ruta lenta
+        pendientes = crudos[fallidas]
+        lentas = {valor: parsear_fecha_hora(valor) for valor in pendientes.unique()}
+        fechas[fallidas] = pd.to_datetime(pendientes.map(lentas), errors='coerce')
+    resultado[validos] = fechas.to_numpy()
+    return resultado
+
 def normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
     """
     Normaliza nombres de columnas a minúsculas, sin espacios, sin tildes,
@@ -103,30 +280,139 @@ def normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
     df.columns = nuevas
     return df
 
-def cargar_datos_csv(ruta_archivo: str) -> pd.DataFrame:
+# Tipos de las columnas del NinjaTrader Grid para el motor C (sin inferencia de tipos).
+# Los importes ('$ 45,00') quedan como texto y se limpian en `procesar_datos`.
+DTYPES_NINJATRADER = {
+    'Número de trade': 'int64',
+    'Instrumento': 'object',
+    'Cuenta': 'object',
+    'Estrategia': 'object',
+    'Mercado pos.': 'object',
+    'Cant.': 'int64',
+    'Precio de entrada': 'float64',
+    'Precio de salida': 'float64',
+    'Tiempo de entrada': 'object',
+    'Tiempo de salida': 'object',
+    'Nombre de entrada': 'object',
+    'Nombre de salida': 'object',
+    'Ganancias': 'object',
+    'Con ganancia neto': 'object',
+    'Comisión': 'object',
+    'MAE': 'object',
+    'MFE': 'object',
+    'ETD': 'object',
+    'Barras': 'int64',
+}
+
+_TAMANO_BLOQUE_CSV = 100_000
+
+def _perfil_archivo(ruta_archivo: str, formato: str = None):
+    """
+    (perfil, encabezado) del archivo: el perfil `formato` si se indica, si no el
+    detectado a partir de la primera línea. (None, encabezado) si no hay perfil aplicable.
     """
-    Carga un CSV usando delimitador ';' fijo (tal como en el original),
-    elimina columnas 'Unnamed', maneja miles y decimales latinos.
+    encabezado = FormatosManager.leer_encabezado(ruta_archivo)
+    nombre = formato or FormatosManager.detectar(encabezado)
+    perfil = FormatosManager.obtener(nombre) if nombre else None
+    if formato and perfil is None:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+    return perfil, encabezado
+
+def _opciones_lectura_csv(motor: str, tipado: bool, perfil: dict = None, encabezado: bytes = None) -> dict:
     """
-    df = pd.read_csv(
-        ruta_archivo,
+    Argumentos de `pd.read_csv` comunes a la carga completa y por bloques.
+    Sin perfil se usa el formato original del NinjaTrader en español.
+    """
+    if perfil is not None:
+        return FormatosManager.opciones_lectura(perfil, encabezado, motor, tipado)
+    opciones = dict(
         sep=';',
         encoding='utf-8',
         decimal=',',
         thousands='.',
-        engine='python',
+        engine=motor,
         on_bad_lines='skip'
     )
+    if motor == 'c' and tipado:
+        opciones['dtype'] = DTYPES_NINJATRADER
+    return opciones
+
+def _limpiar_columnas_csv(df: pd.DataFrame, perfil: dict = None, encabezado: bytes = None) -> pd.DataFrame:
+    """
+    Quita la columna vacía que deja el ';' final y los espacios de los encabezados.
+    Con perfil, renombra las columnas a sus nombres canónicos y lo anota en `df.attrs`.
+    """
     df = df.loc[:, ~df.columns.str.match(r'^Unnamed')]
     df.columns = df.columns.str.strip()
+    if perfil is not None:
+        mapeo = FormatosManager.columnas(perfil, encabezado)
+        df = df.rename(columns={original.strip(): canonica for original, canonica in mapeo.items()})
+        df.attrs['formato_exportacion'] = perfil['nombre']
+        df.attrs['formato_fecha'] = perfil.get('formato_fecha')
+        df.attrs['zona_horaria'] = perfil.get('zona_horaria')
+        df.attrs['moneda'] = perfil.get('moneda')
     return df
 
+def cargar_datos_csv(ruta_archivo: str, motor: str = 'c', formato: str = None) -> pd.DataFrame:
+    """
+    Carga un CSV con el perfil de exportación indicado en `formato` o, si no se indica,
+    el detectado por su encabezado (ver `FormatosManager`): separador, decimales, miles
+    y tipos salen del perfil y las columnas quedan con sus nombres canónicos.
+    Si ningún perfil encaja se usa la lectura original (';', decimales latinos).
+    Con motor='c' usa el parser C de pandas con tipos fijos;
+    si alguna celda no encaja en su tipo se relee sin tipos fijos.
+    motor='python' conserva la lectura original.
+    """
+    perfil, encabezado = _perfil_archivo(ruta_archivo, formato)
+    try:
+        df = pd.read_csv(ruta_archivo, **_opciones_lectura_csv(motor, True, perfil, encabezado))
+    except (ValueError, TypeError):
+        if motor != 'c':
+            raise
+        df = pd.read_csv(ruta_archivo, **_opciones_lectura_csv(motor, False, perfil, encabezado))
+    return _limpiar_columnas_csv(df, perfil, encabezado)
+
+def cargar_datos_csv_por_bloques(ruta_archivo: str, tamano_bloque: int = _TAMANO_BLOQUE_CSV, motor: str = 'c',
+                                 formato: str = None):
+    """
+    Generador de `cargar_datos_csv` para exportaciones grandes: entrega DataFrames de
+    `tamano_bloque` filas ya limpios, con memoria acotada. Concatenar los bloques da
+    el mismo resultado que `cargar_datos_csv`.
+    """
+    perfil, encabezado = _perfil_archivo(ruta_archivo, formato)
+    entregados = 0
+    try:
+        with pd.read_csv(ruta_archivo, chunksize=tamano_bloque,
+                         **_opciones_lectura_csv(motor, True, perfil, encabezado)) as lector:
+            for bloque in lector:
+                yield _limpiar_columnas_csv(bloque, perfil, encabezado)
+                entregados += 1
+    except (ValueError, TypeError):
+        if motor != 'c':
+            raise
+        # Se relee sin tipos fijos saltando los bloques ya entregados
+        with pd.read_csv(ruta_archivo, chunksize=tamano_bloque,
+                         **_opciones_lectura_csv(motor, False, perfil, encabezado)) as lector:
+            for n, bloque in enumerate(lector):
+                if n >= entregados:
+                    yield _limpiar_columnas_csv(bloque, perfil, encabezado)
+
 def procesar_datos(df: pd.DataFrame, config_cuenta: dict) -> pd.DataFrame:
     """
     Aplica todo el flujo de normalización/limpieza y cálculo de métricas intermedias.
     Extraído textualmente de `jota_capital_tracker.py` :contentReference[oaicite:3]{index=3}, sin cambiar nada.
+    Equivale a `aplicar_config_cuenta(procesar_datos_base(df), config_cuenta)`.
+    """
+    return aplicar_config_cuenta(procesar_datos_base(df), config_cuenta)
+
+def procesar_datos_base(df: pd.DataFrame) -> pd.DataFrame:
     """
-    df = normalizar_columnas(df)
+    Etapa de `procesar_datos` que no depende de la plantilla: limpieza, fechas,
+    parámetros de contrato, ticks y columnas acumuladas. Es la parte cara y la
+    que conviene cachear; cambiar de plantilla solo requiere `aplicar_config_cuenta`.
+    """
+    # Con perfil de exportación las columnas ya llegan con su nombre canónico
+    df = df.copy() if df.attrs.get('formato_exportacion') else normalizar_columnas(df)
 
     requeridas = ['cuenta', 'ganancias', 'precio_de_entrada', 'precio_de_salida', 'mercado_pos']
     faltantes = [c for c in requeridas if c not in df.columns]
@@ -135,12 +421,12 @@ def procesar_datos(df: pd.DataFrame, config_cuenta: dict) -> pd.DataFrame:
 
     for col in ['precio_de_entrada', 'precio_de_salida', 'ganancias', 'mae', 'mfe', 'etd']:
         if col in df.columns:
-            df[col] = df[col].apply(limpiar_numerico)
+            df[col] = limpiar_numerico_serie(df[col], df.attrs.get('moneda'))
             df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
 
     for col in ['tiempo_de_entrada', 'tiempo_de_salida']:
         if col in df.columns:
-            df[col] = df[col].map(parsear_fecha_hora)
+            df[col] = parsear_fecha_hora_serie(df[col], df.attrs.get('formato_fecha'))
             df[col] = pd.to_datetime(df[col], errors='coerce')
             df = df[~df[col].isna()]
 
@@ -154,28 +440,49 @@ def procesar_datos(df: pd.DataFrame, config_cuenta: dict) -> pd.DataFrame:
 
     if 'instrumento' in df.columns:
         from models.contracts import ContratosManager
-        df['parametros_operativos'] = df['instrumento'].apply(
-            lambda x: ContratosManager.obtener_parametros_contrato(x)
-        )
-        df['ticks'] = df.apply(
-            lambda row: (row['precio_de_salida'] - row['precio_de_entrada'])
-                        / row['parametros_operativos']['TAMAÑO_TICK'], axis=1
-        )
-        df['valor_ticks'] = df['ticks'] * df['parametros_operativos'].apply(lambda x: x['VALOR_TICK'])
-        df['puntos'] = df['ticks'] * df['parametros_operativos'].apply(lambda x: x['TAMAÑO_TICK'])
+        parametros = ContratosManager.parametros_por_instrumento(df['instrumento'])
+        for col in parametros.columns:
+            df[col] = parametros[col]
+        df['ticks'] = (df['precio_de_salida'] - df['precio_de_entrada']) / df['tamano_tick']
+        df['valor_ticks'] = df['ticks'] * df['valor_tick']
+        df['puntos'] = df['ticks'] * df['tamano_tick']
 
     df['ticks_magnitud'] = df['ticks'].abs()
-    df['pnl_neto'] = df['ganancias'].apply(lambda x: -abs(x) if x < 0 else x)
+    df['pnl_neto'] = df['ganancias'].where(df['ganancias'] >= 0, -df['ganancias'].abs())
     df['pnl_acum'] = df['pnl_neto'].cumsum()
     df['equity_peak'] = df['pnl_acum'].cummax()
     df['drawdown'] = (df['equity_peak'] - df['pnl_acum']).abs()
 
+    if 'mfe' in df.columns and 'ganancias' in df.columns:
+        df['etd'] = np.where(df['mfe'] > 0, df['mfe'] - df['ganancias'], 0)
+
+    if 'tiempo_de_entrada' in df.columns:
+        df['hora_operacion'] = df['tiempo_de_entrada'].dt.strftime('%H:%M')
+        # Sesión CME (cambia a las 17:00 CT): la clave de todas las agregaciones diarias y semanales
+        sesiones = CalendarioSesiones.sesiones(df['tiempo_de_entrada'], df.attrs.get('zona_horaria'))
+        df['sesion'] = sesiones.astype('datetime64[ns]')
+        df['fecha'] = df['sesion'].dt.date
+
+    df['resultado'] = np.where(df['ganancias'] > 0, 1, 0)
+    df['loss_streak'] = (df['resultado'] == 0).astype(int).groupby(
+        df['resultado'].eq(1).cumsum()
+    ).cumsum()
+
+    return df
+
+def aplicar_config_cuenta(df_base: pd.DataFrame, config_cuenta: dict) -> pd.DataFrame:
+    """
+    Etapa de `procesar_datos` que depende de la plantilla (RATIO_SL_PIPS / RATIO_TP_PIPS):
+    sl/tp planeados, r_real y desviaciones. Es aritmética vectorizada sobre el frame base,
+    que no se modifica, así que cambiar de plantilla cuesta milisegundos.
+    """
+    df = df_base.copy(deep=False)
     if 'REGLAS' in config_cuenta:
         sl_ticks = config_cuenta['REGLAS']['RATIO_SL_PIPS']['valor']
         tp_ticks = config_cuenta['REGLAS']['RATIO_TP_PIPS']['valor']
-        df['sl_planeado_usd'] = df['parametros_operativos'].apply(lambda x: sl_ticks * x['VALOR_TICK'])
+        df['sl_planeado_usd'] = sl_ticks * df['valor_tick']
         df['r_real'] = df['pnl_neto'] / df['sl_planeado_usd']
-        df['tp_planeado_usd'] = df['parametros_operativos'].apply(lambda x: tp_ticks * x['VALOR_TICK'])
+        df['tp_planeado_usd'] = tp_ticks * df['valor_tick']
         df['sl_deviation'] = np.where(
             df['pnl_neto'] < 0,
             abs(df['pnl_neto']) / df['sl_planeado_usd'] - 1,
@@ -186,17 +493,58 @@ def procesar_datos(df: pd.DataFrame, config_cuenta: dict) -> pd.DataFrame:
             df['pnl_neto'] / df['tp_planeado_usd'] - 1,
             0
         )
+    return df
 
-    if 'mfe' in df.columns and 'ganancias' in df.columns:
-        df['etd'] = np.where(df['mfe'] > 0, df['mfe'] - df['ganancias'], 0)
+# Columnas de texto con pocos valores distintos: se guardan como categóricas en modo compacto.
+# `hora_operacion` queda como texto porque las reglas la comparan con horas sueltas ('09:30')
+# y una categórica no admite comparar con valores que no están entre sus categorías.
+COLUMNAS_CATEGORICAS = [
+    'cuenta', 'instrumento', 'estrategia', 'mercado_pos',
+    'nombre_de_entrada', 'nombre_de_salida', 'archivo_origen'
+]
 
-    if 'tiempo_de_entrada' in df.columns:
-        df['hora_operacion'] = df['tiempo_de_entrada'].dt.strftime('%H:%M')
-        df['fecha'] = df['tiempo_de_entrada'].dt.date
+def compactar_datos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Modo compacto (opcional) de un frame ya procesado, para historias largas multi-cuenta:
+    - categóricas para las columnas de texto de baja cardinalidad (COLUMNAS_CATEGORICAS)
+    - `fecha` como datetime64 (día) en lugar de objetos `date`
+    - int8 para `resultado` y enteros reducidos para contadores
+    - float32 solo en columnas donde la conversión no pierde ningún valor
+    """
+    df = df.copy()
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
 
-    df['resultado'] = np.where(df['ganancias'] > 0, 1, 0)
-    df['loss_streak'] = (df['resultado'] == 0).astype(int).groupby(
-        df['resultado'].eq(1).cumsum()
-    ).cumsum()
+    if 'fecha' in df.columns:
+        df['fecha'] = pd.to_datetime(df['fecha'])
+    if 'resultado' in df.columns:
+        df['resultado'] = df['resultado'].astype(np.int8)
 
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.select_dtypes(include='float64').columns:
+        valores = df[col].to_numpy()
+        reducidos = valores.astype(np.float32)
+        if np.array_equal(reducidos.astype(np.float64), valores, equal_nan=True):
+            df[col] = reducidos
     return df
+
+def memory_report(df: pd.DataFrame, df_compacto: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Ocupación en memoria por columna (bytes, incluyendo objetos Python) antes y después
+    de `compactar_datos`, con su tipo y la reducción obtenida. La última fila es el total.
+    """
+    if df_compacto is None:
+        df_compacto = compactar_datos(df)
+    antes = df.memory_usage(index=False, deep=True)
+    despues = df_compacto.memory_usage(index=False, deep=True).reindex(antes.index)
+    reporte = pd.DataFrame({
+        'tipo_antes': df.dtypes.astype(str),
+        'tipo_despues': df_compacto.dtypes.reindex(antes.index).astype(str),
+        'bytes_antes': antes,
+        'bytes_despues': despues,
+    })
+    reporte.loc['TOTAL'] = ['', '', antes.sum(), despues.sum()]
+    reporte['reduccion'] = reporte['bytes_antes'] / reporte['bytes_despues']
+    return reporte
@@ -0,0 +1,127 @@
+# utils/format_utils.py
+import os
+import csv
+import json
+import string
+import unicodedata
+
+# Columnas sin las que un perfil no puede considerarse detectado
+COLUMNAS_MINIMAS = ['cuenta', 'ganancias', 'precio_de_entrada', 'precio_de_salida', 'mercado_pos']
+
+
+class FormatosManager:
+    """
+    Registro de perfiles de exportación de brokers/plataformas (separador, decimales,
+    formato de fecha, formato de los importes en `moneda`, zona horaria opcional de los
+    tiempos, mapeo de columnas y tipos). Los perfiles viven en
+    `formatos_exportacion.json`, junto a `empresas.json`; añadir un formato nuevo es
+    añadir una entrada a ese archivo. Se compilan una sola vez al primer uso.
+    """
+
+    RUTA_FORMATOS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "formatos_exportacion.json")
+    _perfiles = None
+
+    @staticmethod
+    def clave_encabezado(texto):
+        """'  Número de trade ' -> 'numero de trade': sin tildes, mayúsculas ni puntuación final."""
+        texto = unicodedata.normalize("NFKD", texto.strip().lower())
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        return texto.rstrip(string.punctuation).strip()
+
+    @classmethod
+    def _compilar(cls, nombre, datos):
+        """Precalcula el índice de encabezados normalizados -> nombre canónico de columna."""
+        perfil = dict(datos)
+        perfil["nombre"] = nombre
+        perfil["indice"] = {cls.clave_encabezado(k): v for k, v in datos.get("columnas", {}).items()}
+        perfil.setdefault("tipos", {})
+        perfil.setdefault("codificacion", "utf-8")
+        return perfil
+
+    @classmethod
+    def cargar_perfiles(cls):
+        """Dict nombre -> perfil compilado. Si el archivo no existe o no es válido, queda vacío."""
+        if cls._perfiles is None:
+            try:
+                with open(cls.RUTA_FORMATOS, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                datos = {}
+            cls._perfiles = {nombre: cls._compilar(nombre, p) for nombre, p in datos.items()}
+        return cls._perfiles
+
+    @classmethod
+    def recargar(cls):
+        """Descarta los perfiles compilados para releer el JSON (p.ej. tras editarlo)."""
+        cls._perfiles = None
+
+    @classmethod
+    def obtener(cls, nombre):
+        """Perfil compilado `nombre` o None."""
+        return cls.cargar_perfiles().get(nombre)
+
+    @staticmethod
+    def leer_encabezado(ruta_archivo):
+        """Primera línea del archivo en bytes (sin BOM ni salto de línea)."""
+        with open(ruta_archivo, "rb") as f:
+            linea = f.readline()
+        return linea.removeprefix(b"\xef\xbb\xbf").rstrip(b"\r\n")
+
+    @staticmethod
+    def _campos(perfil, linea):
+        """Campos del encabezado `linea` (bytes) según el separador y la codificación del perfil."""
+        texto = linea.decode(perfil["codificacion"], errors="replace")
+        return next(csv.reader([texto], delimiter=perfil["separador"]), [])
+
+    @classmethod
+    def columnas(cls, perfil, linea):
+        """{encabezado original: nombre canónico} para las columnas de `linea` que el perfil conoce."""
+        mapeo = {}
+        for campo in cls._campos(perfil, linea):
+            canonica = perfil["indice"].get(cls.clave_encabezado(campo))
+            if canonica:
+                mapeo[campo] = canonica
+        return mapeo
+
+    @classmethod
+    def detectar(cls, linea):
+        """
+        Nombre del perfil que reconoce el encabezado `linea` (bytes): el que mapea más
+        columnas entre los que cubren COLUMNAS_MINIMAS. None si ninguno encaja.
+        """
+        mejor, mejor_conteo = None, 0
+        for nombre, perfil in cls.cargar_perfiles().items():
+            mapeo = cls.columnas(perfil, linea)
+            if not set(COLUMNAS_MINIMAS) <= set(mapeo.values()):
+                continue
+            if len(mapeo) > mejor_conteo:
+                mejor, mejor_conteo = nombre, len(mapeo)
+        return mejor
+
+    @classmethod
+    def detectar_archivo(cls, ruta_archivo):
+        """`detectar` sobre la primera línea del archivo."""
+        return cls.detectar(cls.leer_encabezado(ruta_archivo))
+
+    @classmethod
+    def opciones_lectura(cls, perfil, linea, motor="c", tipado=True):
+        """
+        Argumentos de `pd.read_csv` para un archivo con encabezado `linea`: separador,
+        decimales y miles del perfil y, con el motor C, los tipos por columna original.
+        """
+        opciones = dict(
+            sep=perfil["separador"],
+            encoding=perfil["codificacion"],
+            decimal=perfil.get("decimal", "."),
+            engine=motor,
+            on_bad_lines="skip"
+        )
+        if perfil.get("miles"):
+            opciones["thousands"] = perfil["miles"]
+        if motor == "c" and tipado:
+            opciones["dtype"] = {
+                original: perfil["tipos"][canonica]
+                for original, canonica in cls.columnas(perfil, linea).items()
+                if canonica in perfil["tipos"]
+            }
+        return opciones
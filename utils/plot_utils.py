@@ -2,6 +2,9 @@
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
 import numpy as np
+import pandas as pd
+
+from models.bracket_grid import BarridoBrackets
 
 def crear_figura_equity_drawdown(df, config_cuenta, colores) -> Figure:
     """
@@ -85,15 +88,21 @@ def crear_grafico_rr(df, colores) -> Figure:
     fig.tight_layout()
     return fig
 
-def crear_grafico_win_rate_por_hora(df, colores) -> Figure:
+def crear_grafico_win_rate_por_hora(df, colores, cubo=None) -> Figure:
     """
     Win Rate (%) por hora de operación.
     Sacado de `jota_capital_tracker.py` :contentReference[oaicite:8]{index=8}, sección Timing.
+    Con `cubo` (un `CuboAgregados` ya cortado a la cuenta) se lee de sus buckets de hora
+    en lugar de agrupar `df`.
     """
     fig, ax = plt.subplots(figsize=(8, 4))
-    if 'hora_operacion' in df.columns and 'resultado' in df.columns:
+    df_hora = None
+    if cubo is not None:
+        df_hora = cubo.agregar('hora')['win_rate']
+    elif 'hora_operacion' in df.columns and 'resultado' in df.columns:
         df_hora = df.groupby('hora_operacion')['resultado'].mean() * 100
         df_hora = df_hora.sort_index()
+    if df_hora is not None:
         ax.bar(df_hora.index, df_hora.values, color=colores['acento'], alpha=0.7, edgecolor='black')
         ax.set_title('⏱️ Win Rate por Hora', fontsize=13, fontweight='bold')
         ax.set_xlabel('Hora (HH:MM)')
@@ -138,15 +147,20 @@ def crear_grafico_duracion(df, colores) -> Figure:
     fig.tight_layout()
     return fig
 
-def crear_grafico_drawdown_diario(df, colores) -> Figure:
+def crear_grafico_drawdown_diario(df, colores, cubo=None) -> Figure:
     """
     Drawdown acumulado por fecha.
     Copiado de `jota_capital_tracker.py` :contentReference[oaicite:10]{index=10}.
+    Con `cubo` (un `CuboAgregados` ya cortado a la cuenta) el PnL diario sale del cubo.
     """
     fig, ax = plt.subplots(figsize=(6, 4))
-    if 'fecha' in df.columns and 'ganancias' in df.columns:
+    pnl_diario = None
+    if cubo is not None:
+        pnl_diario = cubo.agregar('fecha')['pnl'].cumsum()
+    elif 'fecha' in df.columns and 'ganancias' in df.columns:
         df2 = df.copy()
         pnl_diario = df2.groupby('fecha')['ganancias'].sum().cumsum()
+    if pnl_diario is not None:
         drawdown = pnl_diario.cummax() - pnl_diario
         ax.plot(drawdown.index, drawdown.values, color=colores['peligro'], linewidth=2)
         ax.set_title('📉 Drawdown Diario', fontsize=13, fontweight='bold')
@@ -157,13 +171,143 @@ def crear_grafico_drawdown_diario(df, colores) -> Figure:
     fig.tight_layout()
     return fig
 
-def crear_graficos_timing(df, colores) -> list:
+def crear_graficos_timing(df, colores, cubo=None) -> list:
     """
     Retorna [fig_win_rate, fig_mae_mfe, fig_duracion].
     Textualmente igual que el bloque “Gráficos Avanzados” original.
     """
     figs = []
-    figs.append(crear_grafico_win_rate_por_hora(df, colores))
+    figs.append(crear_grafico_win_rate_por_hora(df, colores, cubo))
     figs.append(crear_grafico_mae_vs_mfe(df, colores))
     figs.append(crear_grafico_duracion(df, colores))
     return figs
+
+def crear_grafico_metricas_moviles(moviles, colores, titulo='📉 Métricas Móviles') -> Figure:
+    """
+    Win rate, profit factor, expectancy/R medio y drawdown de una ventana móvil
+    (salida de `MetricasMoviles.por_operaciones` o `MetricasMoviles.por_sesiones`).
+    """
+    fig, ejes = plt.subplots(4, 1, figsize=(12, 8), sharex=True)
+    validas = moviles.dropna(subset=['win_rate'])
+    if validas.empty:
+        ejes[0].text(0.5, 0.5, 'Operaciones insuficientes para la ventana', transform=ejes[0].transAxes,
+                     ha='center', va='center')
+    else:
+        por_fecha = isinstance(validas.index, pd.DatetimeIndex)
+        x = validas.index if por_fecha else np.flatnonzero(moviles['win_rate'].notna())
+        ejes[0].plot(x, validas['win_rate'], color=colores['primario'])
+        ejes[0].axhline(50, color='black', linewidth=1, linestyle=':')
+        ejes[0].set_ylabel('Win Rate (%)')
+
+        ejes[1].plot(x, validas['profit_factor'], color=colores['secundario'])
+        ejes[1].axhline(1, color=colores['peligro'], linewidth=1, linestyle='--')
+        ejes[1].set_ylabel('Profit Factor')
+
+        ejes[2].plot(x, validas['expectancy'], color=colores['acento'], label='Expectancy (ticks)')
+        ejes[2].axhline(0, color='black', linewidth=1)
+        ejes[2].set_ylabel('Ticks')
+        if validas['avg_r'].notna().any():
+            eje_r = ejes[2].twinx()
+            eje_r.plot(x, validas['avg_r'], color=colores['advertencia'], linestyle='--', label='R medio')
+            eje_r.set_ylabel('R')
+            eje_r.legend(loc='upper right', fontsize=9)
+        ejes[2].legend(loc='upper left', fontsize=9)
+
+        ejes[3].fill_between(x, 0, validas['max_drawdown'], color=colores['peligro'], alpha=0.3)
+        ejes[3].plot(x, validas['max_drawdown'], color=colores['peligro'])
+        ejes[3].set_ylabel('Drawdown ($)')
+
+    for eje in ejes:
+        eje.grid(True, alpha=0.3)
+    ejes[-1].set_xlabel('Fecha' if isinstance(moviles.index, pd.DatetimeIndex) else 'Operación')
+    ejes[0].set_title(titulo, fontsize=14, fontweight='bold')
+    plt.setp(ejes[-1].xaxis.get_majorticklabels(), rotation=45)
+    fig.tight_layout()
+    return fig
+
+def crear_grafico_exposicion(linea, limite, colores) -> Figure:
+    """
+    Contratos (mini) abiertos a lo largo del tiempo, en escalones, con el límite de la plantilla
+    (salida de `ExposicionContratos.linea_tiempo`).
+    """
+    fig, ax = plt.subplots(figsize=(12, 4))
+    if linea.empty:
+        ax.text(0.5, 0.5, 'Sin tiempos de entrada y salida', transform=ax.transAxes, ha='center', va='center')
+    else:
+        ax.step(linea['tiempo'], linea['contratos'], where='post', color=colores['primario'], linewidth=1)
+        if limite:
+            ax.axhline(limite, color=colores['peligro'], linestyle='--', linewidth=1, label=f'Límite ({limite})')
+            ax.fill_between(linea['tiempo'], limite, linea['contratos'], where=linea['contratos'] > limite,
+                            step='post', color=colores['peligro'], alpha=0.3)
+            ax.legend(loc='upper right', fontsize=9)
+    ax.set_title('📦 Contratos Abiertos', fontsize=13, fontweight='bold')
+    ax.set_xlabel('Tiempo')
+    ax.set_ylabel('Contratos (mini)')
+    ax.grid(True, alpha=0.3)
+    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+    fig.tight_layout()
+    return fig
+
+def crear_grafico_equity_barras(equity, colores) -> Figure:
+    """
+    Equity con las posiciones valoradas a mercado y PnL realizado, en escalones, con el
+    drawdown intradía debajo (salida 'equity' de `ReproductorBarras.reproducir`).
+    """
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 6), sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+    if equity.empty:
+        ax1.text(0.5, 0.5, 'Sin operaciones con barras', transform=ax1.transAxes, ha='center', va='center')
+    else:
+        ax1.step(equity.index, equity['equity'], where='post', color=colores['primario'], linewidth=1,
+                 label='Equity (a mercado)')
+        ax1.step(equity.index, equity['realizado'], where='post', color=colores['exito'], linewidth=1,
+                 linestyle='--', label='Realizado')
+        ax1.legend(loc='upper left', fontsize=9)
+        ax2.fill_between(equity.index, 0, -equity['drawdown'], step='post', color=colores['peligro'], alpha=0.4)
+    ax1.set_title('📈 Equity Intradía sobre Barras', fontsize=13, fontweight='bold')
+    ax1.set_ylabel('USD')
+    ax1.grid(True, alpha=0.3)
+    ax2.set_xlabel('Tiempo')
+    ax2.set_ylabel('Drawdown ($)')
+    ax2.grid(True, alpha=0.3)
+    plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+    fig.tight_layout()
+    return fig
+
+def crear_mapa_calor_brackets(superficie, colores, medida='expectativa', actual=None) -> Figure:
+    """
+    Mapa de calor SL × TP de una medida de `BarridoBrackets.barrer`, marcando el mejor par
+    y, si se da, el par `actual` (sl, tp) de la plantilla.
+    """
+    titulos = {
+        'expectativa': ('🎯 Expectativa por SL/TP', 'USD por operación', 'RdYlGn'),
+        'profit_factor': ('🎯 Profit Factor por SL/TP', 'Profit Factor', 'RdYlGn'),
+        'drawdown_max': ('🎯 Drawdown Máx. por SL/TP', 'USD', 'RdYlGn_r'),
+        'win_rate': ('🎯 Win Rate por SL/TP', '%', 'RdYlGn'),
+    }
+    titulo, etiqueta, mapa = titulos.get(medida, (f'🎯 {medida} por SL/TP', medida, 'viridis'))
+    tabla = superficie[medida]
+    sl, tp = tabla.index.to_numpy(), tabla.columns.to_numpy()
+
+    def borde(v):
+        paso = np.diff(v).mean() if len(v) > 1 else 1
+        return (v[0] - paso / 2, v[-1] + paso / 2)
+
+    fig, ax = plt.subplots(figsize=(12, 5))
+    imagen = ax.imshow(tabla.to_numpy(), origin='lower', aspect='auto', cmap=mapa,
+                       extent=(*borde(tp), *borde(sl)))
+    fig.colorbar(imagen, ax=ax, label=etiqueta)
+
+    if np.isfinite(tabla.to_numpy()).any():
+        sl_mejor, tp_mejor = BarridoBrackets.mejor_par(superficie, medida)
+        ax.plot(tp_mejor, sl_mejor, marker='*', markersize=14, color=colores['primario'],
+                markeredgecolor='white', linestyle='none', label=f'Mejor ({sl_mejor:g} / {tp_mejor:g})')
+    if actual is not None:
+        ax.plot(actual[1], actual[0], marker='o', markersize=9, markerfacecolor='none',
+                markeredgecolor=colores['oscuro'], markeredgewidth=2,
+                linestyle='none', label=f'Plantilla ({actual[0]:g} / {actual[1]:g})')
+    ax.set_title(titulo, fontsize=13, fontweight='bold')
+    ax.set_xlabel('TP (ticks)')
+    ax.set_ylabel('SL (ticks)')
+    ax.legend(loc='upper right', fontsize=9)
+    fig.tight_layout()
+    return fig
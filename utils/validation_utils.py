@@ -0,0 +1,135 @@
+# utils/validation_utils.py
+import numpy as np
+import pandas as pd
+
+from utils.format_utils import FormatosManager
+
+from utils.data_utils import (
+    _perfil_archivo, normalizar_columnas, parsear_fecha_hora_serie, _normalizar_cadenas_numericas,
+    _normalizar_importes, _PATRON_FLOAT_SIMPLE, _TAMANO_BLOQUE_CSV
+)
+
+COLUMNAS_REQUERIDAS = ['cuenta', 'ganancias', 'precio_de_entrada', 'precio_de_salida', 'mercado_pos']
+COLUMNAS_DECIMALES = ['precio_de_entrada', 'precio_de_salida', 'ganancias', 'mae', 'mfe', 'etd']
+COLUMNAS_ENTERAS = ['numero_de_trade', 'cant', 'barras']
+COLUMNAS_FECHA = ['tiempo_de_entrada', 'tiempo_de_salida']
+
+MAX_MUESTRAS = 5
+# Clave de `errores` para las líneas con más campos que el encabezado
+CLAVE_CAMPOS = 'campos'
+# Relleno de esas líneas: conservan su fila de datos para que la numeración siga al archivo
+_LINEA_INVALIDA = '\x00linea_invalida'
+
+def _es_float(x) -> bool:
+    """True si `float()` acepta el valor ya normalizado."""
+    try:
+        float(x)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+def _por_valor_unico(serie: pd.Series, comprobar) -> np.ndarray:
+    """Aplica `comprobar` (serie -> máscara de fallos) una vez por valor distinto y la expande."""
+    codigos, unicos = pd.factorize(serie)
+    return comprobar(pd.Series(unicos, dtype=object))[codigos]
+
+def _fallos_decimales(s: pd.Series, moneda: dict = None) -> np.ndarray:
+    """
+    Máscara de celdas que `limpiar_numerico_serie` (con el formato `moneda` del perfil, si
+    lo hay) no sabe convertir y que el flujo normal convertiría en 0.0 sin avisar.
+    Las celdas vacías también cuentan como fallo.
+    """
+    vacias = (s.str.strip() == '').to_numpy()
+    s = _normalizar_cadenas_numericas(s) if moneda is None else _normalizar_importes(s, moneda)
+    validos = s.str.fullmatch(_PATRON_FLOAT_SIMPLE).to_numpy()
+    if not validos.all():
+        validos[~validos] = s[~validos].map(_es_float).to_numpy(dtype=bool)
+    return vacias | ~validos
+
+def _fallos_enteros(s: pd.Series) -> np.ndarray:
+    """Máscara de celdas que no son un entero (admite '.' como separador de miles)."""
+    return ~s.str.strip().str.fullmatch(r'[+-]?\d{1,3}(?:\.\d{3})*|[+-]?\d+').to_numpy(dtype=bool)
+
+def _fallos_fecha(s: pd.Series) -> np.ndarray:
+    """Máscara de celdas que `parsear_fecha_hora` no reconoce (la fila se descartaría al cargar)."""
+    return parsear_fecha_hora_serie(s).isna().to_numpy()
+
+def validar_csv(ruta_archivo: str, tamano_bloque: int = _TAMANO_BLOQUE_CSV,
+                max_muestras: int = MAX_MUESTRAS) -> dict:
+    """
+    Valida un export de operaciones en una sola pasada por bloques, sin construir
+    el frame procesado: la memoria usada depende de `tamano_bloque`, no del archivo.
+    Las celdas se leen como texto y se comprueban por columna con operaciones vectorizadas,
+    una vez por valor distinto.
+
+    Las líneas con más campos que el encabezado (que la carga descarta) no se saltan: cuentan
+    como fila y se informan en `errores[CLAVE_CAMPOS]` con su número de campos como muestra.
+
+    Devuelve un dict con:
+    - 'filas': filas de datos leídas, incluidas las de campos de más
+    - 'formato': perfil de exportación detectado (solo si alguno encaja)
+    - 'faltantes': columnas requeridas ausentes (si hay alguna no se revisa nada más)
+    - 'errores': {columna: {'conteo', 'filas', 'muestras'}} solo para columnas con fallos;
+      'filas' son los números de fila de datos (1 = primera fila tras el encabezado)
+      y 'muestras' los valores originales, ambos limitados a `max_muestras`.
+    """
+    resultado = {'filas': 0, 'faltantes': [], 'errores': {}}
+    comprobaciones = None
+    perfil, encabezado = _perfil_archivo(ruta_archivo)
+    mapeo, moneda = {}, None
+    separador, codificacion = ';', 'utf-8'
+    if perfil is not None:
+        mapeo = {original.strip(): canonica
+                 for original, canonica in FormatosManager.columnas(perfil, encabezado).items()}
+        separador, codificacion = perfil['separador'], perfil['codificacion']
+        moneda = perfil.get('moneda')
+        resultado['formato'] = perfil['nombre']
+
+    def fallos_decimales(s):
+        return _fallos_decimales(s, moneda)
+
+    columnas = len(pd.read_csv(ruta_archivo, sep=separador, encoding=codificacion, nrows=0).columns)
+    campos_invalidos = []
+
+    def linea_invalida(campos):
+        campos_invalidos.append(len(campos))
+        return [_LINEA_INVALIDA] * columnas
+
+    def registrar(col, fallos, muestras):
+        error = resultado['errores'].setdefault(col, {'conteo': 0, 'filas': [], 'muestras': []})
+        error['conteo'] += int(fallos.sum())
+        hueco = max_muestras - len(error['filas'])
+        if hueco > 0:
+            posiciones = np.flatnonzero(fallos)[:hueco]
+            error['filas'].extend((resultado['filas'] + 1 + posiciones).tolist())
+            error['muestras'].extend(muestras(posiciones))
+
+    # Motor python: `on_bad_lines` invocable para conservar (y contar) las líneas de campos de más
+    with pd.read_csv(ruta_archivo, sep=separador, encoding=codificacion, dtype=str, keep_default_na=False,
+                     engine='python', on_bad_lines=linea_invalida, chunksize=tamano_bloque) as lector:
+        for bloque in lector:
+            invalidas = (bloque.iloc[:, 0] == _LINEA_INVALIDA).to_numpy()
+            if invalidas.any():
+                campos = campos_invalidos[:int(invalidas.sum())]
+                del campos_invalidos[:len(campos)]
+                registrar(CLAVE_CAMPOS, invalidas, lambda posiciones: [f"{n} campos" for n in campos[:len(posiciones)]])
+            bloque = bloque.loc[:, ~bloque.columns.str.match(r'^Unnamed')]
+            bloque.columns = bloque.columns.str.strip()
+            bloque = bloque.rename(columns=mapeo) if mapeo else normalizar_columnas(bloque)
+
+            if comprobaciones is None:
+                resultado['faltantes'] = [c for c in COLUMNAS_REQUERIDAS if c not in bloque.columns]
+                if resultado['faltantes']:
+                    return resultado
+                comprobaciones = (
+                    [(c, fallos_decimales) for c in COLUMNAS_DECIMALES if c in bloque.columns]
+                    + [(c, _fallos_enteros) for c in COLUMNAS_ENTERAS if c in bloque.columns]
+                    + [(c, _fallos_fecha) for c in COLUMNAS_FECHA if c in bloque.columns]
+                )
+
+            for col, comprobar in comprobaciones:
+                fallos = _por_valor_unico(bloque[col], comprobar) & ~invalidas
+                if fallos.any():
+                    registrar(col, fallos, lambda posiciones: bloque[col].iloc[posiciones].tolist())
+            resultado['filas'] += len(bloque)
+    return resultado